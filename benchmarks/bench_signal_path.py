@@ -0,0 +1,72 @@
+# bench_signal_path.py
+# Decision latency and allocations of the DataFrame signal path vs the Signal/TradeRecord path.
+# usage: python benchmarks/bench_signal_path.py [iterations]
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic import indicator_frame
+from classes.strategy_manager import StrategyManager
+from classes.position_manager import PositionManager
+
+
+class NullDataManager:
+    def execute_buy_market_price(self, ticker, amount):
+        return {}
+
+    def exectute_sell_market_price(self, ticker, amount):
+        return {}
+
+
+def frame_path(strategy_manager, position_manager, data_manager, indicators):
+    entry_data = strategy_manager.entry_condition(indicators)
+    exit_data = strategy_manager.exit_condition(entry_data)
+    trade_log = position_manager.execution_trade(data_manager, entry_data, exit_data, 1_000_000, 0.0, 2_500_000)
+    return trade_log.to_dict('records')[0]
+
+
+def record_path(strategy_manager, position_manager, data_manager, indicators):
+    signal = strategy_manager.signal(indicators)
+    trade_log = position_manager.execution_trade(data_manager, signal, None, 1_000_000, 0.0, 2_500_000)
+    return trade_log.to_dict()
+
+
+def measure(path, indicators, iterations):
+    strategy_manager, position_manager, data_manager = StrategyManager(), PositionManager(), NullDataManager()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for _ in range(50):
+            path(strategy_manager, position_manager, data_manager, indicators)
+        timings = np.empty(iterations)
+        for i in range(iterations):
+            started = time.perf_counter_ns()
+            path(strategy_manager, position_manager, data_manager, indicators)
+            timings[i] = (time.perf_counter_ns() - started) / 1e3
+
+        tracemalloc.start()
+        path(strategy_manager, position_manager, data_manager, indicators)
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        path(strategy_manager, position_manager, data_manager, indicators)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+    return {'p50_us': np.percentile(timings, 50), 'p99_us': np.percentile(timings, 99), 'peak_bytes': peak}
+
+
+def run(iterations=2000):
+    indicators = indicator_frame(300)
+    results = {'frames': measure(frame_path, indicators, iterations),
+               'records': measure(record_path, indicators, iterations)}
+    for name, result in results.items():
+        print(f"{name:8s} p50 {result['p50_us']:9.1f} us  p99 {result['p99_us']:9.1f} us  "
+              f"peak allocation {result['peak_bytes']:8d} bytes")
+    print(f"speedup p50: {results['frames']['p50_us'] / results['records']['p50_us']:.1f}x, "
+          f"allocation: {results['frames']['peak_bytes'] / results['records']['peak_bytes']:.1f}x less")
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,357 @@
+# load_test.py
+# Load test of the full bot loop at market scale. The real managers (DataManager with its cache,
+# candle buffer and rate limiter, PortfolioManager, ExecutionEngine, PositionLedger, KellySizer,
+# TradeJournal mirrored to NotionManager's outbox, SlackManager) run against local stand-ins for
+# Upbit, Notion and the Slack webhook, each behind a latency / error / rate-limit model, while the
+# symbol count and the cycle frequency are swept.
+#
+# usage (from the repository root):
+#   python benchmarks/load_test.py                              default sweep
+#   python benchmarks/load_test.py --quick                      small sweep (about a minute)
+#   python benchmarks/load_test.py --symbols 1,50,200 --slots 2,1,0.5 --cycles 20
+#   python benchmarks/load_test.py --profile degraded           slow, unreliable services
+#   python benchmarks/load_test.py --notion-rate 1 --json results.json
+#
+# Time is compressed: every slot is one 30-minute candle of the simulated market, so a 1s slot runs
+# the bot 1800x faster than live. One symbol runs main.run_bot, more run main.run_portfolio_cycle.
+# A cycle overruns when it ends after the next slot started; like CandleScheduler, the loop then waits
+# for the following slot and the ones in between are skipped.
+import os
+import sys
+import json
+import time
+import types
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stubs import Link, UpbitStandIn, WebhookStandIn, NotionStandIn
+import main
+from classes.data_manager import DataManager, UPBIT_API_URL
+from classes.candle_store import INTERVAL_SECONDS, KST_OFFSET
+from classes.candle_buffer import CandleBuffer
+from classes.indicator_manager import IndicatorManager
+from classes.strategy_manager import StrategyManager
+from classes.position_manager import PositionManager
+from classes.execution_engine import ExecutionEngine
+from classes.position_ledger import PositionLedger
+from classes.kelly_sizer import KellySizer
+from classes.trade_journal import TradeJournal
+from classes.notion_manager import NotionManager
+from classes.slack_manager import SlackManager
+from classes.metrics_manager import MetricsManager
+from classes.portfolio_manager import PortfolioManager
+from classes.simulated_exchange import SimulatedExchange
+
+INTERVAL = "minute30"
+COUNT = 300
+WEBHOOK_URL = "https://hooks.slack.com/services/load-test"
+
+# service behaviour; every value can be overridden on the command line
+PROFILES = {
+    'ideal': {
+        'upbit_latency': 0.0, 'upbit_jitter': 0.0, 'upbit_errors': 0.0, 'quotation_rate': None, 'trading_rate': None,
+        'notion_latency': 0.0, 'notion_jitter': 0.0, 'notion_errors': 0.0, 'notion_rate': None,
+        'slack_latency': 0.0, 'slack_jitter': 0.0, 'slack_errors': 0.0, 'slack_rate': None,
+    },
+    # Upbit from a nearby region (quotation 10 req/s, exchange 30 req/s), Notion's 3 req/s average
+    'nominal': {
+        'upbit_latency': 0.03, 'upbit_jitter': 0.3, 'upbit_errors': 0.001, 'quotation_rate': 10, 'trading_rate': 30,
+        'notion_latency': 0.35, 'notion_jitter': 0.4, 'notion_errors': 0.01, 'notion_rate': 3,
+        'slack_latency': 0.15, 'slack_jitter': 0.3, 'slack_errors': 0.005, 'slack_rate': 1,
+    },
+    'degraded': {
+        'upbit_latency': 0.15, 'upbit_jitter': 0.6, 'upbit_errors': 0.02, 'quotation_rate': 10, 'trading_rate': 30,
+        'notion_latency': 1.0, 'notion_jitter': 0.6, 'notion_errors': 0.1, 'notion_rate': 3,
+        'slack_latency': 0.5, 'slack_jitter': 0.6, 'slack_errors': 0.05, 'slack_rate': 1,
+    },
+}
+
+
+def market_tickers(n):
+    # run_bot trades KRW-BTC, so it always comes first
+    return ['KRW-BTC'] + [f"KRW-T{i:03d}" for i in range(1, n)]
+
+
+class Bot:
+    def __init__(self, symbols, slots, settings, directory, client_rate=8, seed=0):
+        """
+        One bot wired like main.initialize_bot, trading `symbols` markets of a simulated exchange that
+        has `slots` candles to go after the first decision.
+        """
+        self.tickers = market_tickers(symbols)
+        self.step = INTERVAL_SECONDS[INTERVAL]
+        self.exchange = SimulatedExchange.synthetic(self.tickers, days=(COUNT + slots + 2) * self.step / 86400,
+                                                    tick_seconds=60, volatility=0.001, seed=seed,
+                                                    balances={'KRW': 100_000_000})
+        s = settings
+        self.links = {
+            'quotation': Link(s['upbit_latency'], s['upbit_jitter'], s['upbit_errors'], s['quotation_rate'], seed=seed + 1),
+            'trading': Link(s['upbit_latency'], s['upbit_jitter'], s['upbit_errors'], s['trading_rate'], seed=seed + 2),
+            'notion': Link(s['notion_latency'], s['notion_jitter'], s['notion_errors'], s['notion_rate'], seed=seed + 3),
+            'slack': Link(s['slack_latency'], s['slack_jitter'], s['slack_errors'], s['slack_rate'], seed=seed + 4),
+        }
+        self.upbit = UpbitStandIn(self.exchange, self.links['quotation'], self.links['trading'])
+        self.upbit.install()
+
+        self.data_manager = DataManager(None, None, ticker=self.tickers[0], interval=INTERVAL, count=COUNT,
+                                        candle_buffer=CandleBuffer())
+        self.data_manager._get_session().mount(UPBIT_API_URL, self.upbit.adapter())
+        self.position_manager = PositionManager(execution_engine=ExecutionEngine(self.data_manager),
+                                                ledger=PositionLedger(":memory:"), sizer=KellySizer())
+        self.notion = NotionManager(outbox_path=os.path.join(directory, f"outbox-{symbols}.db"))
+        self.notion.notion = NotionStandIn(self.links['notion'])
+        self.slack = SlackManager(webhook_url=WEBHOOK_URL)
+        self.webhook = WebhookStandIn(self.links['slack'])
+        self.slack.session.mount(WEBHOOK_URL, self.webhook)
+        self.journal = TradeJournal(os.path.join(directory, f"journal-{symbols}.db"), mirror=self.notion,
+                                    clock=lambda: self.exchange.now)
+
+        main.data_manager = self.data_manager
+        main.indicator_manager = IndicatorManager(window=20, span=10, multiplier=2)
+        main.position_manager = self.position_manager
+        main.strategy_manager = StrategyManager()
+        main.journal = self.journal
+        main.slack_manager = self.slack
+        main.metrics_manager = MetricsManager(path=os.devnull, dump_interval=float('inf'))
+        # boundary is the wall-clock start of the slot, so the bot records close_to_decision
+        main.scheduler = types.SimpleNamespace(boundary=None)
+        main.startup_pending = True
+
+        self.portfolio_manager = None
+        if symbols > 1:
+            self.portfolio_manager = PortfolioManager(self.data_manager, main.indicator_manager, main.strategy_manager,
+                                                      self.position_manager, tickers=self.tickers, interval=INTERVAL,
+                                                      count=COUNT, requests_per_second=client_rate)
+        # first decision once COUNT candles have closed, one second after a candle boundary
+        first = self.exchange.start(self.tickers[0]) + COUNT * self.step
+        self.boundary = (first + KST_OFFSET) // self.step * self.step - KST_OFFSET + self.step
+
+    def cycle(self):
+        if self.portfolio_manager is None:
+            main.run_bot()
+        else:
+            main.run_portfolio_cycle(self.portfolio_manager)
+
+    def warm_up(self, attempts=20):
+        """
+        Start-up as in main_portfolio: reconcile, then one cycle that downloads the full candle window.
+        A failed start-up is retried, like a supervisor restarting the bot.
+        :return: (seconds to the first completed cycle, failed attempts)
+        """
+        self.exchange.advance(self.boundary + 1)
+        started = time.perf_counter()
+        for attempt in range(attempts):
+            try:
+                if self.portfolio_manager is not None:
+                    snapshot = self.data_manager.get_snapshot(self.tickers, candles=False)
+                    for ticker in self.tickers:
+                        self.position_manager.ledger.reconcile(ticker, snapshot.coin_balance(ticker),
+                                                               snapshot.current_price(ticker))
+                self.cycle()
+                break
+            except Exception as x:
+                print(f"start-up failed: {x.__class__.__name__}: {x}", file=sys.stderr)
+                self.data_manager.invalidate(None)
+        else:
+            raise RuntimeError(f"the bot did not start in {attempts} attempts")
+        self.boundary += self.step
+        return time.perf_counter() - started, attempt
+
+    def service_stats(self):
+        stats = {name: link.stats() for name, link in self.links.items()}
+        stats['notion']['pending'] = self.notion.outbox.pending()
+        stats['slack'].update(self.slack.stats())
+        return stats
+
+    def close(self):
+        if self.portfolio_manager is not None:
+            self.portfolio_manager.close()
+        self.position_manager.execution_engine.close()
+        # whatever Notion has not taken yet stays in the outbox; the test does not wait for it
+        self.journal.close(timeout=0.1)
+        self.slack.close(timeout=0.1)
+        if self.data_manager.executor is not None:
+            self.data_manager.executor.shutdown(wait=False)
+
+
+def run_slots(bot, slot_seconds, slots):
+    """
+    Runs the bot at one cycle per `slot_seconds` for `slots` slots; the simulated market moves one
+    candle per slot, skipped ones included.
+    :return: dict with the cycle durations, overruns, skipped slots, failed cycles and the elapsed time
+    """
+    main.metrics_manager = MetricsManager(path=os.devnull, dump_interval=float('inf'))
+    durations = []
+    overruns = skipped = failures = 0
+    start = time.monotonic()
+    wall = time.time()
+    slot = 0
+    while slot < slots:
+        delay = start + slot * slot_seconds - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        bot.exchange.advance(bot.boundary + slot * bot.step + 1)
+        # a new candle closed: nothing cached for the previous one is valid any more
+        bot.data_manager.invalidate(None)
+        main.scheduler.boundary = wall + slot * slot_seconds
+        began = time.perf_counter()
+        try:
+            with main.metrics_manager.cycle():
+                bot.cycle()
+        except Exception as x:
+            failures += 1
+            print(f"cycle failed: {x.__class__.__name__}: {x}", file=sys.stderr)
+        durations.append(time.perf_counter() - began)
+        slot += 1
+        late = time.monotonic() - (start + slot * slot_seconds)
+        if late > 0:
+            overruns += 1
+            missed = int(late // slot_seconds) + 1
+            skipped += min(missed, slots - slot)
+            slot += missed
+    elapsed = max(time.monotonic() - start, slots * slot_seconds)
+    bot.boundary += slots * bot.step
+    main.scheduler.boundary = None
+    return {'durations': durations, 'overruns': overruns, 'skipped': skipped, 'failures': failures,
+            'elapsed': elapsed, 'decision': main.metrics_manager.totals.get('close_to_decision')}
+
+
+def delta(after, before):
+    return {name: {key: value - before[name].get(key, 0) if key in ('requests', 'errors', 'throttled', 'sent_posts',
+                                                                   'sent_messages', 'failed_messages') else value
+                   for key, value in stats.items()}
+            for name, stats in after.items()}
+
+
+def sweep(symbol_counts, slot_lengths, slots, settings, client_rate=8, verbose=False):
+    """
+    Every symbol count at every slot length, slowest first, on one bot per symbol count.
+    :return: list of result dicts, one per (symbols, slot)
+    """
+    slot_lengths = sorted(slot_lengths, reverse=True)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for symbols in symbol_counts:
+            output = sys.stdout if verbose else open(os.devnull, 'w')
+            with redirect_stdout(output):
+                bot = Bot(symbols, slots * len(slot_lengths), settings, directory, client_rate)
+                warm_up, restarts = bot.warm_up()
+                for slot_seconds in slot_lengths:
+                    before = bot.service_stats()
+                    run = run_slots(bot, slot_seconds, slots)
+                    services = delta(bot.service_stats(), before)
+                    decision = run['decision']
+                    durations = np.array(run['durations'])
+                    results.append({
+                        'symbols': symbols,
+                        'loop': 'run_bot' if symbols == 1 else 'portfolio',
+                        'slot_s': slot_seconds,
+                        'target_cps': 1 / slot_seconds,
+                        # failed cycles made no decision: only completed ones count
+                        'achieved_cps': (len(durations) - run['failures']) / run['elapsed'],
+                        'cycles': len(durations),
+                        'warm_up_s': warm_up,
+                        'restarts': restarts,
+                        'cycle_p50_s': float(np.percentile(durations, 50)),
+                        'cycle_p95_s': float(np.percentile(durations, 95)),
+                        'cycle_max_s': float(durations.max()),
+                        'decision_p50_ms': decision.percentile(50) if decision else None,
+                        'decision_p95_ms': decision.percentile(95) if decision else None,
+                        'decision_p99_ms': decision.percentile(99) if decision else None,
+                        'overrun_rate': run['overruns'] / len(durations),
+                        'skipped_slots': run['skipped'],
+                        'failed_cycles': run['failures'],
+                        'orders': len(bot.exchange.orders),
+                        'services': services,
+                    })
+                    warm_up = restarts = None
+                bot.close()
+            if output is not sys.stdout:
+                output.close()
+            for result in results[-len(slot_lengths):]:
+                print_result(result)
+    return results
+
+
+def print_result(r):
+    def ms(value):
+        return f"{value:8.0f}" if value is not None else "       -"
+    upbit = r['services']['quotation']
+    notion = r['services']['notion']
+    print(f"{r['symbols']:4d} {r['loop']:9s} {r['slot_s']:6.2f}s {r['target_cps']:6.2f} {r['achieved_cps']:6.2f}  "
+          f"{r['cycle_p50_s']:7.2f} {r['cycle_p95_s']:7.2f}  {ms(r['decision_p50_ms'])} {ms(r['decision_p95_ms'])} "
+          f"{ms(r['decision_p99_ms'])}  {r['overrun_rate']:5.0%} {r['skipped_slots']:5d} {r['failed_cycles']:4d}  "
+          f"{upbit['requests']:6d} {upbit['throttled']:5d}  {notion['pending']:7d}", flush=True)
+
+
+def print_header():
+    print(f"{'sym':>4s} {'loop':9s} {'slot':>7s} {'target':>6s} {'cyc/s':>6s}  {'p50 s':>7s} {'p95 s':>7s}  "
+          f"{'dec p50':>8s} {'dec p95':>8s} {'dec p99':>8s}  {'over':>5s} {'skip':>5s} {'fail':>4s}  "
+          f"{'quote':>6s} {'429':>5s}  {'outbox':>7s}")
+    print(f"{'':33s}{'cycle':>15s}  {'decision latency (ms)':>26s}{'':19s}{'upbit requests':>14s}  {'notion':>7s}")
+
+
+def overrun_points(results, tolerance):
+    """:return: dict symbols -> the slowest slot length whose overrun rate exceeds tolerance (None if none does)"""
+    points = {}
+    for r in results:
+        points.setdefault(r['symbols'], None)
+        if points[r['symbols']] is None and r['overrun_rate'] > tolerance:
+            points[r['symbols']] = r
+    return points
+
+
+def parse_list(text, cast):
+    return [cast(value) for value in text.split(",") if value.strip()]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Load test of the full bot loop against simulated services.")
+    parser.add_argument('--quick', action='store_true', help="1, 10 and 30 symbols at 2, 1 and 0.5s slots")
+    parser.add_argument('--symbols', default="1,10,50,100,200", help="symbol counts to sweep")
+    parser.add_argument('--slots', default="4,2,1,0.5", help="slot lengths (seconds per cycle) to sweep")
+    parser.add_argument('--cycles', type=int, default=8, help="slots per configuration")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='nominal')
+    parser.add_argument('--client-rate', type=float, default=8, help="PortfolioManager requests_per_second")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="overrun rate still counted as keeping up")
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--verbose', action='store_true', help="show the bot's own output")
+    for name in PROFILES['nominal']:
+        parser.add_argument('--' + name.replace('_', '-'), type=float, dest=name, default=None)
+    args = parser.parse_args()
+
+    settings = dict(PROFILES[args.profile])
+    settings.update({name: getattr(args, name) for name in settings if getattr(args, name) is not None})
+    symbol_counts = parse_list(args.symbols, int)
+    slot_lengths = parse_list(args.slots, float)
+    cycles = args.cycles
+    if args.quick:
+        symbol_counts, slot_lengths, cycles = [1, 10, 30], [2, 1, 0.5], 6
+
+    print(f"profile {args.profile}: {settings}")
+    print_header()
+    results = sweep(symbol_counts, slot_lengths, cycles, settings, args.client_rate, args.verbose)
+
+    print()
+    for symbols, point in overrun_points(results, args.tolerance).items():
+        failed = sum(r['failed_cycles'] for r in results if r['symbols'] == symbols)
+        note = f" {failed} cycles failed on service errors." if failed else ""
+        if point is None:
+            print(f"{symbols:4d} symbols: kept up down to {min(slot_lengths)}s slots.{note}")
+        else:
+            print(f"{symbols:4d} symbols: overruns at {point['slot_s']}s slots ({point['overrun_rate']:.0%} of cycles, "
+                  f"cycle p95 {point['cycle_p95_s']:.2f}s, {point['achieved_cps']:.2f} of {point['target_cps']:.2f} "
+                  f"cycles/s).{note}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'profile': args.profile, 'settings': settings, 'results': results}, f, indent=1, default=str)
+    return results
+
+
+if __name__ == "__main__":
+    main_cli()
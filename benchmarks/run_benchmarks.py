@@ -0,0 +1,352 @@
+# run_benchmarks.py
+# Benchmark suite for the indicator, signal and decision-cycle hot paths.
+#
+# usage (from the repository root):
+#   python benchmarks/run_benchmarks.py                  run everything, compare with the baseline
+#   python benchmarks/run_benchmarks.py --quick          skip the 1M candle cases
+#   python benchmarks/run_benchmarks.py --save-baseline  store this run as the new baseline
+#   python benchmarks/run_benchmarks.py --only indicators
+#
+# Baselines are machine specific: save one on the machine you compare on, before the change.
+# The exit status is 1 when a case is slower (p50) or allocates more (peak) than the baseline
+# by more than --threshold.
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import argparse
+import datetime
+import tracemalloc
+from contextlib import redirect_stdout
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stubs import install_pyupbit_stub, StubDataManager, StubNotionManager, StubSlackManager
+from benchmarks.synthetic import ohlcv, indicator_frame
+
+install_pyupbit_stub()
+
+from classes.indicator_manager import IndicatorManager
+from classes.strategy_manager import StrategyManager
+from classes.position_manager import PositionManager
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+
+class Case:
+    def __init__(self, name, setup, repeats, items=1, unit='calls', quick=True):
+        """
+        One benchmark.
+        :param setup: function returning the zero-argument callable to time; runs once, untimed
+        :param repeats: timed calls
+        :param items: work items per call (candles, cycles, ...) used for the throughput figure
+        :param quick: included in --quick runs
+        """
+        self.name = name
+        self.setup = setup
+        self.repeats = repeats
+        self.items = items
+        self.unit = unit
+        self.quick = quick
+
+
+def indicator_case(count):
+    def setup():
+        prices = ohlcv(count)
+        indicator_manager = IndicatorManager(window=20, span=10, multiplier=2)
+        return lambda: indicator_manager.calculate_indicator(prices)
+    return setup
+
+
+def atr_case(count):
+    def setup():
+        prices = ohlcv(count)
+        strategy_manager = StrategyManager()
+        return lambda: strategy_manager.calculate_atr(prices, period=14)
+    return setup
+
+
+def fused_case(count):
+    """calculate_fused: YYL and the ATR together, as the live loop and the backtester run them."""
+    def setup():
+        prices = ohlcv(count)
+        high, low, close = (prices[field].to_numpy() for field in ('high', 'low', 'close'))
+        indicator_manager = IndicatorManager(window=20, span=10, multiplier=2)
+        return lambda: indicator_manager.calculate_fused(high, low, close, 14)
+    return setup
+
+
+def signal_frames_case():
+    indicators = indicator_frame(300)
+    strategy_manager = StrategyManager()
+
+    def decide():
+        entry_data = strategy_manager.entry_condition(indicators)
+        return strategy_manager.exit_condition(entry_data)
+    return decide
+
+
+def signal_records_case():
+    indicators = indicator_frame(300)
+    strategy_manager = StrategyManager()
+    return lambda: strategy_manager.signal(indicators)
+
+
+def aggregate_ticks_case(count=10_000):
+    """Trades folded into minute5/15/30/60/day candles by CandleAggregator."""
+    from classes.candle_aggregator import CandleAggregator
+    rng = np.random.default_rng(0)
+    timestamps = (1_704_067_200 + np.arange(count) * 10.0).tolist()
+    prices = (50_000_000 * np.exp(np.cumsum(rng.normal(0, 0.0004, count)))).tolist()
+
+    def aggregate():
+        aggregator = CandleAggregator()
+        for timestamp, price in zip(timestamps, prices):
+            aggregator.add_tick(timestamp, price, 0.01)
+        return aggregator
+    return aggregate
+
+
+def candle_frames_case(symbols=200, stored=2000, count=300):
+    """A cycle's candles for 200 symbols read as CandleStore frames: delta fetch + 300-row DataFrame each."""
+    import tempfile
+    from classes.candle_store import CandleStore
+    candles = ohlcv(stored)
+    directory = tempfile.TemporaryDirectory(prefix='bench_candles_')
+    store = CandleStore(directory.name, fetcher=lambda ticker, interval, n: candles.tail(n))
+    tickers = [f"KRW-C{i}" for i in range(symbols)]
+    for ticker in tickers:
+        store.append(ticker, 'minute30', candles.iloc[:-1])
+
+    def read():
+        return [store.get_ohlcv(ticker, 'minute30', count) for ticker in tickers]
+    # the directory is removed when the case is dropped
+    read.directory = directory
+    return read
+
+
+def candle_views_case(symbols=200, stored=2000, count=300):
+    """The same cycle read from a CandleBuffer: the delta is merged and a zero-copy view returned."""
+    from classes.candle_buffer import CandleBuffer
+    candles = ohlcv(stored)
+    delta = candles.tail(2)
+    buffer = CandleBuffer()
+    tickers = [f"KRW-C{i}" for i in range(symbols)]
+    for ticker in tickers:
+        buffer.update(ticker, 'minute30', candles)
+
+    def read():
+        views = []
+        for ticker in tickers:
+            buffer.update(ticker, 'minute30', delta)
+            views.append(buffer.view(ticker, 'minute30', count))
+        return views
+    return read
+
+
+def candle_buffer_case(symbols=200, count=10_000):
+    """200 symbols x 10k candles loaded into a float32 CandleBuffer (peak memory = what it holds)."""
+    from classes.candle_buffer import CandleBuffer
+    candles = ohlcv(count + 1)
+
+    def load():
+        buffer = CandleBuffer(capacity=count, dtype='float32')
+        for i in range(symbols):
+            buffer.update(f"KRW-C{i}", 'minute30', candles)
+        return buffer
+    return load
+
+
+def kelly_sizing_case(paths=100_000):
+    """KellySizer estimate + drawdown Monte Carlo over 100 trades for 100k paths."""
+    from classes.kelly_sizer import KellySizer
+    rng = np.random.default_rng(0)
+    returns = np.where(rng.random(200) < 0.55, rng.normal(0.03, 0.01, 200), -np.abs(rng.normal(0.02, 0.005, 200)))
+    sizer = KellySizer(paths=paths, seed=0)
+
+    def size():
+        sizer._key = None  # force a new simulation, as after every closed trade
+        return sizer.size(returns)
+    return size
+
+
+def journal_analytics_case(days=30, symbols=20):
+    """summary() and daily_pnl() over a month of 30-minute trade logs for 20 symbols."""
+    from classes.trade_journal import TradeJournal
+    from classes.signal_record import TradeRecord
+    rng = np.random.default_rng(0)
+    clock = [1_704_067_200.0]
+    journal = TradeJournal(":memory:", clock=lambda: clock[0])
+    for cycle in range(days * 48):
+        clock[0] += 1800
+        trade_type = ('long', 'short')[cycle % 2] if cycle % 10 < 2 else 'neutral'
+        for i in range(symbols):
+            price = float(100 + rng.normal())
+            journal.create_trade_log(TradeRecord(f"t{cycle}-{i}", trade_type, None, f"KRW-C{i}", price,
+                                                 0.0, 0.0, 1.0, price, fee=0.05))
+
+    def analytics():
+        return journal.summary(), journal.daily_pnl()
+    return analytics
+
+
+def run_bot_case():
+    """The polling cycle of main.py with the exchange, Notion and Slack replaced by stubs."""
+    import main
+    from classes.metrics_manager import MetricsManager
+    main.data_manager = StubDataManager()
+    main.indicator_manager = IndicatorManager(window=20, span=10, multiplier=2)
+    main.position_manager = PositionManager()
+    main.strategy_manager = StrategyManager()
+    main.journal = StubNotionManager()
+    main.slack_manager = StubSlackManager()
+    main.metrics_manager = MetricsManager(path=os.devnull, dump_interval=float('inf'))
+    return main.run_bot
+
+
+def cold_start_case():
+    """Fresh interpreter importing main, i.e. the start-up cost paid before initialize_bot."""
+    command = [sys.executable, '-c', 'import main']
+    return lambda: subprocess.run(command, cwd=ROOT, check=True)
+
+
+CASES = [
+    Case('indicators_300', indicator_case(300), repeats=200, items=300, unit='candles'),
+    Case('indicators_10k', indicator_case(10_000), repeats=50, items=10_000, unit='candles'),
+    Case('indicators_1m', indicator_case(1_000_000), repeats=5, items=1_000_000, unit='candles', quick=False),
+    Case('atr_300', atr_case(300), repeats=500, items=300, unit='candles'),
+    Case('atr_1m', atr_case(1_000_000), repeats=5, items=1_000_000, unit='candles', quick=False),
+    Case('fused_300', fused_case(300), repeats=500, items=300, unit='candles'),
+    Case('fused_1m', fused_case(1_000_000), repeats=5, items=1_000_000, unit='candles', quick=False),
+    Case('signal_frames', signal_frames_case, repeats=500, unit='decisions'),
+    Case('signal_records', signal_records_case, repeats=2000, unit='decisions'),
+    Case('aggregate_ticks', aggregate_ticks_case, repeats=10, items=10_000, unit='ticks'),
+    Case('candle_frames_200', candle_frames_case, repeats=20, items=200, unit='symbols'),
+    Case('candle_views_200', candle_views_case, repeats=20, items=200, unit='symbols'),
+    Case('buffer_200x10k', candle_buffer_case, repeats=3, items=200 * 10_000, unit='candles', quick=False),
+    Case('kelly_sizing_100k', kelly_sizing_case, repeats=20, items=100_000, unit='paths'),
+    Case('journal_analytics', journal_analytics_case, repeats=50, unit='queries'),
+    Case('run_bot_cycle', run_bot_case, repeats=100, unit='cycles'),
+    Case('cold_start', cold_start_case, repeats=5, unit='starts'),
+]
+
+
+def measure(case, warmup=3):
+    """Times case.repeats calls and measures the peak traced allocation of one extra call."""
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        fn = case.setup()
+        for _ in range(warmup):
+            fn()
+        timings = np.empty(case.repeats)
+        for i in range(case.repeats):
+            started = time.perf_counter_ns()
+            fn()
+            timings[i] = (time.perf_counter_ns() - started) / 1e6
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+
+    p50 = float(np.percentile(timings, 50))
+    return {
+        'repeats': case.repeats,
+        'mean_ms': float(timings.mean()),
+        'p50_ms': p50,
+        'p90_ms': float(np.percentile(timings, 90)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'throughput': case.items / (p50 / 1000) if p50 > 0 else float('inf'),
+        'unit': case.unit,
+        'peak_bytes': int(peak),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    :return: list of (case, metric, baseline value, current value) for every regression
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in ('p50_ms', 'peak_bytes'):
+            # ignore sub-kilobyte allocation noise
+            slack = 1024 if metric == 'peak_bytes' else 0
+            if result[metric] > previous[metric] * (1 + threshold) + slack:
+                regressions.append((name, metric, previous[metric], result[metric]))
+    return regressions
+
+
+def format_bytes(n):
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if abs(n) < 1024 or unit == 'GB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the trading bot hot paths.")
+    parser.add_argument('--quick', action='store_true', help="skip the 1M candle cases")
+    parser.add_argument('--only', help="run only cases whose name contains this text")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    parser.add_argument('--output', help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    cases = [case for case in CASES if (case.quick or not args.quick) and (not args.only or args.only in case.name)]
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get('results', {})
+
+    results = {}
+    print(f"{'case':16s} {'p50 ms':>10s} {'p90 ms':>10s} {'p99 ms':>10s} {'throughput':>20s} {'peak mem':>10s}  vs baseline")
+    for case in cases:
+        try:
+            result = measure(case)
+        except ImportError as x:
+            print(f"{case.name:16s} skipped: {x}")
+            continue
+        results[case.name] = result
+        previous = baseline.get(case.name)
+        change = f"{(result['p50_ms'] / previous['p50_ms'] - 1) * 100:+.0f}%" if previous else "-"
+        print(f"{case.name:16s} {result['p50_ms']:10.3f} {result['p90_ms']:10.3f} {result['p99_ms']:10.3f} "
+              f"{result['throughput']:12.0f} {case.unit + '/s':>7s} {format_bytes(result['peak_bytes']):>10s}  {change}")
+
+    report = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        merged = dict(baseline)
+        merged.update(results)
+        report['results'] = merged
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}.")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, metric, previous, current in regressions:
+        print(f"REGRESSION {name}: {metric} {previous:.3f} -> {current:.3f}")
+    if not baseline:
+        print("No baseline found; run with --save-baseline to create one.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
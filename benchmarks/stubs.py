@@ -0,0 +1,323 @@
+# stubs.py
+# Network-free stand-ins for the exchange, Notion and Slack: in-process stubs for the full-cycle
+# benchmark, and HTTP-level services with a latency/error/rate-limit model for the load test.
+import sys
+import json
+import time
+import types
+import uuid
+import threading
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qsl
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import BaseAdapter
+from classes.data_manager import MarketSnapshot
+from classes.candle_store import INTERVAL_SECONDS, KST_OFFSET
+from classes.rate_limiter import RateLimiter
+from benchmarks.synthetic import ohlcv
+
+
+def install_pyupbit_stub(count=300, seed=0):
+    """Replaces the pyupbit module with one that serves synthetic data and never touches the network."""
+    candles = ohlcv(count, seed)
+    module = types.ModuleType('pyupbit')
+    module.get_ohlcv = lambda ticker='KRW-BTC', interval='minute30', count=count, **kwargs: candles.tail(count).copy()
+    module.get_current_price = lambda ticker='KRW-BTC', **kwargs: float(candles['close'].iloc[-1])
+
+    class Upbit:
+        def __init__(self, access_key=None, secret_key=None):
+            pass
+
+        def get_balance(self, ticker='KRW'):
+            return 1_000_000.0 if ticker == 'KRW' else 0.0
+
+        def buy_market_order(self, ticker, price):
+            return {'uuid': 'stub', 'side': 'bid', 'price': price}
+
+        def sell_market_order(self, ticker, volume):
+            return {'uuid': 'stub', 'side': 'ask', 'volume': volume}
+
+    module.Upbit = Upbit
+    sys.modules['pyupbit'] = module
+    return module
+
+
+class StubDataManager:
+    def __init__(self, count=300, seed=0, krw_balance=1_000_000.0):
+        self.candles = ohlcv(count, seed)
+        self.krw_balance = krw_balance
+        self.orders = 0
+        self.rate_limiter = None
+
+    def get_snapshot(self, tickers, interval='minute30', count=300, candles=True):
+        price = float(self.candles['close'].iloc[-1])
+        return MarketSnapshot(
+            timestamp=time.time(),
+            balances={'KRW': self.krw_balance, **{ticker.split('-')[1]: 0.0 for ticker in tickers}},
+            prices={ticker: price for ticker in tickers},
+            candles={ticker: self.candles.tail(count) for ticker in tickers} if candles else {},
+            latency=0.0)
+
+    def get_historical_data(self, ticker, interval='minute30', count=300):
+        return self.candles.tail(count)
+
+    def execute_buy_market_price(self, ticker, amount):
+        self.orders += 1
+        return {}
+
+    def exectute_sell_market_price(self, ticker, amount):
+        self.orders += 1
+        return {}
+
+
+class StubNotionManager:
+    def __init__(self):
+        self.records = 0
+
+    def record_account_balance(self, krw_balance, symbol, coin_balance, current_price):
+        self.records += 1
+
+    def create_trade_log(self, trade_data):
+        self.records += 1
+
+    def create_position_log(self, position_data):
+        self.records += 1
+
+    def record_signal(self, symbol, signal):
+        self.records += 1
+
+    def close(self, timeout=10):
+        return True
+
+
+class StubSlackManager:
+    def __init__(self):
+        self.messages = 0
+
+    def send_message(self, message):
+        self.messages += 1
+
+    def close(self, timeout=5):
+        return True
+
+
+# load-test services: the real managers talk to these through their own HTTP sessions and clients
+
+class Link:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate=None, burst=None, seed=0):
+        """
+        Network model of one remote service: every request waits a log-normal latency and may fail.
+        :param latency: median seconds per request
+        :param jitter: log-normal sigma of the latency (0 = always `latency`)
+        :param error_rate: share of requests answered with a server error
+        :param rate: requests per second accepted before the service answers 429 (None = unlimited)
+        :param burst: requests accepted at once (defaults to rate)
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.limiter = RateLimiter(rate, burst) if rate else None
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def call(self):
+        """Waits out one request. :return: 'ok', 'error' or 'throttled'"""
+        with self.lock:
+            self.requests += 1
+            delay = self.latency * (self.rng.lognormal(0.0, self.jitter) if self.jitter else 1.0)
+            failed = self.rng.random() < self.error_rate
+        outcome = 'ok'
+        if self.limiter is not None and not self.limiter.try_acquire():
+            outcome = 'throttled'
+        elif failed:
+            outcome = 'error'
+        if outcome != 'ok':
+            with self.lock:
+                if outcome == 'throttled':
+                    self.throttled += 1
+                else:
+                    self.errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        return outcome
+
+    def stats(self):
+        with self.lock:
+            return {'requests': self.requests, 'errors': self.errors, 'throttled': self.throttled}
+
+
+def _response(request, status, payload, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.reason = HTTPStatus(status).phrase
+    response._content = json.dumps(payload).encode()
+    response.headers['Content-Type'] = 'application/json'
+    response.headers.update(headers or {})
+    response.encoding = 'utf-8'
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class UpbitStandIn:
+    def __init__(self, exchange, quotation, trading):
+        """
+        Upbit served from a SimulatedExchange: the REST endpoints DataManager calls (/candles, /ticker,
+        /accounts, /orders, /order) through a requests adapter, and pyupbit.Upbit for the auth headers.
+        :param quotation: Link of the quotation API (candles, ticker)
+        :param trading: Link of the exchange API (accounts, orders)
+        """
+        self.exchange = exchange
+        self.quotation = quotation
+        self.trading = trading
+        self.identifiers = set()
+        self.lock = threading.Lock()
+
+    def install(self):
+        """Replaces the pyupbit module with one backed by this exchange."""
+        module = types.ModuleType('pyupbit')
+        module.Upbit = lambda access_key=None, secret_key=None: self
+        sys.modules['pyupbit'] = module
+        return module
+
+    def adapter(self):
+        """requests adapter to mount on DataManager's session for UPBIT_API_URL."""
+        return _UpbitAdapter(self)
+
+    @staticmethod
+    def _request_headers(query=None):
+        return {'Authorization': 'Bearer load-test'}
+
+    def handle(self, request):
+        url = urlsplit(request.url)
+        endpoint = 'candles' if '/candles/' in url.path else url.path.rsplit('/', 1)[-1]
+        link = self.quotation if endpoint in ('candles', 'ticker') else self.trading
+        outcome = link.call()
+        if outcome == 'throttled':
+            return _response(request, 429, {'error': {'name': 'too_many_requests', 'message': "too many requests"}},
+                             {'Remaining-Req': 'group=default; min=0; sec=0'})
+        # half of the server errors happen after an order was processed: the response is lost
+        lost = outcome == 'error' and endpoint == 'orders' and link.rng.random() < 0.5
+        if outcome == 'error' and not lost:
+            return _response(request, 500, {'error': {'name': 'server_error', 'message': "internal error"}})
+        query = dict(parse_qsl(url.query))
+        with self.lock:
+            if endpoint == 'candles':
+                status, payload = 200, self._candles(url.path, query)
+            elif endpoint == 'accounts':
+                status, payload = 200, self.exchange.get_balances()
+            elif endpoint == 'ticker':
+                status, payload = 200, [{'market': ticker, 'trade_price': self.exchange.get_current_price(ticker)}
+                                        for ticker in query['markets'].split(',')]
+            elif endpoint == 'orders':
+                status, payload = self._place(json.loads(request.body))
+            elif endpoint == 'order':
+                payload = self.exchange.get_order(query.get('uuid') or query.get('identifier'))
+                status = 404 if 'error' in payload else 200
+            else:
+                status, payload = 404, {'error': {'name': 'not_found', 'message': url.path}}
+        if lost:
+            return _response(request, 500, {'error': {'name': 'server_error', 'message': "internal error"}})
+        return _response(request, status, payload)
+
+    def _candles(self, path, query):
+        """/candles page: up to `count` candles starting before `to` (UTC), newest first like Upbit."""
+        unit = path.split('/candles/', 1)[1]
+        interval = 'minute' + unit.split('/')[1] if unit.startswith('minutes/') else unit.rstrip('s')
+        count = int(query.get('count', 200))
+        df = self.exchange.get_ohlcv(query['market'], interval, count)
+        if df is None:
+            return []
+        if 'to' in query:
+            end = pd.Timestamp(query['to']) + pd.Timedelta(seconds=KST_OFFSET)
+            skip = int((df.index[-1] - end) / pd.Timedelta(seconds=INTERVAL_SECONDS[interval])) + 1
+            df = self.exchange.get_ohlcv(query['market'], interval, count + max(skip, 0))
+            df = df[df.index < end].tail(count)
+        return [{'market': query['market'],
+                 'candle_date_time_utc': (start - pd.Timedelta(seconds=KST_OFFSET)).strftime("%Y-%m-%dT%H:%M:%S"),
+                 'candle_date_time_kst': start.strftime("%Y-%m-%dT%H:%M:%S"),
+                 'opening_price': row.open, 'high_price': row.high, 'low_price': row.low, 'trade_price': row.close,
+                 'candle_acc_trade_volume': row.volume, 'candle_acc_trade_price': row.value}
+                for start, row in zip(df.index[::-1], df.iloc[::-1].itertuples())]
+
+    def _place(self, query):
+        identifier = query.get('identifier')
+        if identifier is not None and identifier in self.identifiers:
+            return 400, {'error': {'name': 'duplicate_identifier', 'message': "identifier already used"}}
+        if query['side'] == 'bid':
+            order = self.exchange.buy_market_order(query['market'], float(query['price']), identifier)
+        else:
+            order = self.exchange.sell_market_order(query['market'], float(query['volume']), identifier)
+        if 'error' in order:
+            return 400, order
+        if identifier is not None:
+            self.identifiers.add(identifier)
+        return 201, order
+
+
+class _UpbitAdapter(BaseAdapter):
+    def __init__(self, upbit):
+        super().__init__()
+        self.upbit = upbit
+
+    def send(self, request, **kwargs):
+        return self.upbit.handle(request)
+
+    def close(self):
+        pass
+
+
+class WebhookStandIn(BaseAdapter):
+    def __init__(self, link, retry_after=1):
+        """Slack incoming webhook as a requests adapter: 'ok', 500 on errors, 429 with Retry-After when throttled."""
+        super().__init__()
+        self.link = link
+        self.retry_after = retry_after
+        self.posts = 0
+
+    def send(self, request, **kwargs):
+        outcome = self.link.call()
+        if outcome == 'throttled':
+            return _response(request, 429, 'rate_limited', {'Retry-After': str(self.retry_after)})
+        if outcome == 'error':
+            return _response(request, 500, 'internal_error')
+        self.posts += 1
+        return _response(request, 200, 'ok')
+
+    def close(self):
+        pass
+
+
+class NotionStandIn:
+    def __init__(self, link, retry_after=1):
+        """notion_client.Client with pages.create and databases.query; failures raise APIResponseError like the SDK."""
+        self.link = link
+        self.retry_after = retry_after
+        self.pages_created = 0
+        self.pages = types.SimpleNamespace(create=self._create_page)
+        self.databases = types.SimpleNamespace(query=self._query)
+
+    def _call(self):
+        from notion_client import APIResponseError
+        from notion_client.errors import APIErrorCode
+        import httpx
+        outcome = self.link.call()
+        if outcome == 'throttled':
+            raise APIResponseError(APIErrorCode.RateLimited, 429, "rate limited",
+                                   httpx.Headers({'retry-after': str(self.retry_after)}), "")
+        if outcome == 'error':
+            raise APIResponseError(APIErrorCode.ServiceUnavailable, 503, "service unavailable", httpx.Headers(), "")
+
+    def _create_page(self, **kwargs):
+        self._call()
+        self.pages_created += 1
+        return {'object': 'page', 'id': str(uuid.uuid4()), 'properties': kwargs.get('properties', {})}
+
+    def _query(self, **kwargs):
+        self._call()
+        return {'object': 'list', 'results': [], 'has_more': False, 'next_cursor': None}
@@ -0,0 +1,31 @@
+# synthetic.py
+# Reproducible market data for the benchmarks.
+import numpy as np
+import pandas as pd
+
+
+def ohlcv(count, seed=0, start_price=50_000_000, volatility=0.004, freq='30min', start='2020-01-01'):
+    """
+    Geometric random walk candles with realistic high/low wicks.
+    :param count: number of candles
+    :param seed: random seed; the same seed always gives the same frame
+    :param volatility: standard deviation of the log return per candle
+    :return: DataFrame with open/high/low/close/volume on a DatetimeIndex, like pyupbit.get_ohlcv
+    """
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, count)))
+    open_ = np.empty(count)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+    wick = np.abs(rng.normal(0, volatility / 2, (2, count)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = rng.gamma(2.0, 5.0, count)
+    index = pd.date_range(start, periods=count, freq=freq)
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+
+def indicator_frame(count=300, seed=0, window=20, span=10, multiplier=2):
+    """calculate_indicator output for a synthetic history, as run_bot hands it to the strategy."""
+    from classes.indicator_manager import IndicatorManager
+    return IndicatorManager(window=window, span=span, multiplier=multiplier).calculate_indicator(ohlcv(count, seed))
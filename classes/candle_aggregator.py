@@ -0,0 +1,129 @@
+# candle_aggregator.py
+import numpy as np
+import pandas as pd
+from classes.candle_store import INTERVAL_SECONDS, KST_OFFSET
+from classes.candle_buffer import CandleColumns
+
+
+class CandleAggregator:
+    def __init__(self, intervals=('minute5', 'minute15', 'minute30', 'minute60', 'day'), capacity=500,
+                 dtype=np.float64):
+        """
+        Builds candles of several timeframes from one base feed of ticks or 1-minute candles.
+        Every incoming tick or candle updates the forming bar of each timeframe in O(1); a bar that
+        closes is appended to that timeframe's ring buffer and handed to its subscribers, so higher
+        timeframes cost no extra requests. Buckets are aligned on epoch time like Upbit's candles.
+        :param intervals: pyupbit interval names to maintain
+        :param capacity: closed candles kept per timeframe
+        :param dtype: dtype of the stored candles (float32 halves their memory)
+        """
+        self.intervals = list(intervals)
+        self.seconds = {interval: INTERVAL_SECONDS[interval] for interval in self.intervals}
+        self.rings = {interval: CandleColumns(capacity, dtype) for interval in self.intervals}
+        self.forming = {interval: None for interval in self.intervals}
+        self.subscribers = {interval: [] for interval in self.intervals}
+
+    def subscribe(self, interval, callback):
+        """
+        Calls callback(interval, candle) whenever a candle of `interval` closes.
+        candle is a dict with 'start' (epoch seconds), 'open', 'high', 'low', 'close', 'volume'.
+        """
+        self.subscribers[interval].append(callback)
+
+    def add_tick(self, timestamp, price, volume=0.0):
+        """
+        Adds one trade. Bars close when the first trade of the next bucket arrives (or on advance()).
+        :return: list of (interval, candle) that closed
+        """
+        closed = []
+        for interval in self.intervals:
+            self._merge(interval, timestamp, 0, price, price, price, price, volume, closed)
+        return closed
+
+    def add_candle(self, start, open_, high, low, close, volume=0.0, seconds=60):
+        """
+        Adds one closed base candle (1-minute by default). A bar that ends with this candle closes
+        immediately, without waiting for the next one.
+        :param start: candle start in epoch seconds
+        :param seconds: length of the incoming candle; timeframes shorter than it are not updated
+        :return: list of (interval, candle) that closed
+        """
+        closed = []
+        for interval in self.intervals:
+            if self.seconds[interval] % seconds == 0:
+                self._merge(interval, start, seconds, open_, high, low, close, volume, closed)
+        return closed
+
+    def advance(self, timestamp):
+        """Closes every forming bar whose bucket ended before `timestamp` (e.g. in a quiet market)."""
+        closed = []
+        for interval in self.intervals:
+            candle = self.forming[interval]
+            if candle is not None and candle['start'] + self.seconds[interval] <= timestamp:
+                self._close(interval, closed)
+        return closed
+
+    def _merge(self, interval, start, seconds, open_, high, low, close, volume, closed):
+        length = self.seconds[interval]
+        bucket = int(start) // length * length
+        candle = self.forming[interval]
+        if candle is not None and bucket != candle['start']:
+            if bucket < candle['start']:
+                # older than the bar being built (e.g. history overlapping the live feed)
+                return
+            self._close(interval, closed)
+            candle = None
+        if candle is None:
+            last = self.rings[interval].last_start()
+            if last is not None and bucket <= last:
+                return
+            candle = self.forming[interval] = {'start': bucket, 'open': open_, 'high': high, 'low': low,
+                                               'close': close, 'volume': volume}
+        else:
+            if high > candle['high']:
+                candle['high'] = high
+            if low < candle['low']:
+                candle['low'] = low
+            candle['close'] = close
+            candle['volume'] += volume
+        if seconds and start + seconds >= bucket + length:
+            self._close(interval, closed)
+
+    def _close(self, interval, closed):
+        candle = self.forming[interval]
+        self.forming[interval] = None
+        self.rings[interval].append(candle)
+        closed.append((interval, candle))
+        for callback in self.subscribers[interval]:
+            callback(interval, candle)
+
+    def warm_up(self, prices, interval, targets=None):
+        """
+        Seeds timeframes from a get_historical_data frame whose last row is the candle still forming.
+        Subscribers receive the closed candles, so indicator states warm up along with the buffers.
+        :param interval: interval of the frame
+        :param targets: timeframes to seed (default: every timeframe that is a multiple of `interval`)
+        """
+        seconds = INTERVAL_SECONDS[interval]
+        targets = [t for t in (targets or self.intervals) if t in self.seconds and self.seconds[t] % seconds == 0]
+        starts = prices.index.values.astype('datetime64[s]').astype(np.int64) - KST_OFFSET
+        volumes = prices['volume'] if 'volume' in prices else np.zeros(len(prices))
+        rows = zip(starts, prices['open'], prices['high'], prices['low'], prices['close'], volumes)
+        closed = []
+        for i, (start, open_, high, low, close, volume) in enumerate(rows):
+            # the last row is still forming: merge it without letting it close its bars
+            length = seconds if i < len(prices) - 1 else 0
+            for target in targets:
+                self._merge(target, int(start), length, open_, high, low, close, volume, closed)
+        return closed
+
+    def frame(self, interval, count=None, include_forming=True):
+        """Candles of one timeframe in pyupbit's get_ohlcv layout, the forming one last."""
+        df = self.rings[interval].to_frame(count)
+        candle = self.forming[interval]
+        if include_forming and candle is not None:
+            row = pd.DataFrame([[candle[field] for field in CandleColumns.fields]], columns=list(CandleColumns.fields),
+                               index=pd.DatetimeIndex(np.array([candle['start'] + KST_OFFSET], dtype='datetime64[s]')
+                                                    .astype('datetime64[ns]')))
+            df = pd.concat([df.iloc[1:] if count and len(df) >= count else df, row])
+        return df
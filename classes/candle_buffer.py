@@ -0,0 +1,226 @@
+# candle_buffer.py
+import threading
+import numpy as np
+import pandas as pd
+from classes.candle_store import KST_OFFSET
+
+
+class CandleColumns:
+    """
+    Fixed-capacity OHLCV series of one (symbol, interval) stored column by column.
+    Rows are appended to a window with some slack behind it; when the slack is used up the
+    last `capacity` rows move to fresh arrays. The last n rows are therefore always one contiguous
+    slice per field and are handed out as views, never copied. Data is never moved in place, so a view
+    keeps showing the rows it was taken on; only a forming last row is completed when its candle closes.
+    """
+    fields = ('open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, capacity=500, dtype=np.float64, slack=0.25):
+        """
+        :param capacity: closed candles kept
+        :param dtype: float64, or float32 for half the memory (7 significant digits: KRW prices up to
+                      ~16.7M stay exact, above that the rounding error stays below 1e-7 of the price)
+        :param slack: extra rows, as a share of capacity, filled before the window is moved
+        """
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        # one spare row for the candle still forming
+        self.size = capacity + max(1, int(capacity * slack)) + 1
+        self.starts, self.values = self._allocate()
+        self.first = 0
+        self.end = 0
+        self.forming = False
+
+    def _allocate(self):
+        # zeroed pages are only backed by memory once they are written
+        return np.zeros(self.size, dtype=np.int64), np.zeros((len(self.fields), self.size), dtype=self.dtype)
+
+    def __len__(self):
+        return self.end - self.first
+
+    @property
+    def nbytes(self):
+        return self.starts.nbytes + self.values.nbytes
+
+    def _reserve(self, n):
+        """Makes room for n more rows plus a forming row, moving the window to fresh arrays if needed."""
+        if self.end + n + 1 <= self.size:
+            return
+        keep = max(0, min(self.end - self.first, self.size - 1 - n))
+        starts, values = self._allocate()
+        starts[:keep] = self.starts[self.end - keep:self.end]
+        values[:, :keep] = self.values[:, self.end - keep:self.end]
+        self.starts, self.values = starts, values
+        self.first, self.end = 0, keep
+
+    def _trim(self):
+        if self.end - self.first > self.capacity:
+            self.first = self.end - self.capacity
+
+    def append(self, candle):
+        """Appends one closed candle: a dict with 'start' (epoch seconds) and the OHLCV fields."""
+        self.append_row(candle['start'], candle['open'], candle['high'], candle['low'], candle['close'],
+                        candle['volume'])
+
+    def append_row(self, start, open_, high, low, close, volume=0.0):
+        self._reserve(1)
+        row = self.end
+        self.starts[row] = start
+        values = self.values
+        values[0, row], values[1, row], values[2, row], values[3, row], values[4, row] = open_, high, low, close, volume
+        self.end += 1
+        self.forming = False
+        self._trim()
+
+    def extend(self, starts, values):
+        """
+        Appends closed candles in bulk.
+        :param starts: candle starts (epoch seconds), oldest first
+        :param values: (n, 5) open/high/low/close/volume rows
+        """
+        n = len(starts)
+        if n == 0:
+            return
+        if n > self.capacity:
+            starts, values, n = starts[-self.capacity:], values[-self.capacity:], self.capacity
+        self._reserve(n)
+        self.starts[self.end:self.end + n] = starts
+        self.values[:, self.end:self.end + n] = np.asarray(values).T
+        self.end += n
+        self.forming = False
+        self._trim()
+
+    def set_forming(self, start, open_, high, low, close, volume=0.0):
+        """Stores the candle still forming right after the closed ones (replaced on every call)."""
+        row = self.end
+        self.starts[row] = start
+        values = self.values
+        values[0, row], values[1, row], values[2, row], values[3, row], values[4, row] = open_, high, low, close, volume
+        self.forming = True
+
+    def last_start(self):
+        """Start of the last closed candle, or None."""
+        return int(self.starts[self.end - 1]) if self.end > self.first else None
+
+    def _bounds(self, n, include_forming):
+        stop = self.end + (1 if include_forming and self.forming else 0)
+        start = self.first if n is None else max(self.first, stop - n)
+        return start, stop
+
+    def column(self, field, n=None, include_forming=False):
+        """Zero-copy view of the last n values of one field, oldest first."""
+        start, stop = self._bounds(n, include_forming)
+        return self.values[self.fields.index(field), start:stop]
+
+    def arrays(self, n=None, include_forming=False):
+        """
+        The last n candles, oldest first, as views.
+        :return: (starts, values) where values is (n, 5) open/high/low/close/volume
+        """
+        start, stop = self._bounds(n, include_forming)
+        return self.starts[start:stop], self.values[:, start:stop].T
+
+    def view(self, n=None, include_forming=False):
+        """The last n candles as a read-only CandleView."""
+        start, stop = self._bounds(n, include_forming)
+        return CandleView(self.starts[start:stop],
+                          {field: self.values[i, start:stop] for i, field in enumerate(self.fields)})
+
+    def to_frame(self, n=None, include_forming=False):
+        """The last n candles in pyupbit's get_ohlcv layout (KST index); a copy."""
+        return self.view(n, include_forming).to_frame()
+
+
+class CandleView:
+    """
+    Read-only window on CandleColumns with the parts of a pyupbit frame the bot reads:
+    view['close'] is a NumPy view (no copy), len(view), view.empty and view.index, the KST
+    start times, which is only built when asked for. to_frame() makes a real DataFrame.
+    """
+    __slots__ = ('starts', 'columns', '_index')
+
+    def __init__(self, starts, columns):
+        self.starts = starts
+        for column in columns.values():
+            column.flags.writeable = False
+        self.columns = columns
+        self._index = None
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def __contains__(self, field):
+        return field in self.columns
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def empty(self):
+        return len(self.starts) == 0
+
+    @property
+    def index(self):
+        if self._index is None:
+            # nanosecond index like pyupbit's frames (pandas >= 3 would pick seconds from unit='s')
+            self._index = pd.DatetimeIndex((self.starts + KST_OFFSET).astype('datetime64[s]').astype('datetime64[ns]'))
+        return self._index
+
+    def to_frame(self):
+        return pd.DataFrame({field: np.array(column) for field, column in self.columns.items()}, index=self.index)
+
+
+class CandleBuffer:
+    def __init__(self, capacity=10_000, dtype=np.float64, slack=0.25):
+        """
+        Candles of every (symbol, interval) the bot follows, kept in CandleColumns and shared by
+        every reader: the data manager merges each delta fetch into it and strategies read
+        zero-copy views of the last `count` candles instead of a new DataFrame per cycle.
+        :param capacity: closed candles kept per series (long look-backs)
+        :param dtype: 'float64' or 'float32'
+        """
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self.slack = slack
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def columns(self, symbol, interval):
+        series = self.series.get((symbol, interval))
+        if series is None:
+            with self.lock:
+                series = self.series.get((symbol, interval))
+                if series is None:
+                    series = self.series[(symbol, interval)] = CandleColumns(self.capacity, self.dtype, self.slack)
+        return series
+
+    def update(self, symbol, interval, df):
+        """
+        Merges a get_ohlcv frame whose last row is the candle still forming: closed candles newer than
+        the stored ones are appended and the forming one replaces the previous forming candle.
+        :return: number of closed candles appended
+        """
+        if df is None or df.empty:
+            return 0
+        starts = df.index.values.astype('datetime64[s]').astype(np.int64) - KST_OFFSET
+        values = df.reindex(columns=list(CandleColumns.fields)).to_numpy(dtype=self.dtype)
+        series = self.columns(symbol, interval)
+        with self.lock:
+            last = series.last_start()
+            closed = slice(None) if last is None else np.flatnonzero(starts[:-1] > last)
+            series.extend(starts[:-1][closed], values[:-1][closed])
+            if last is None or starts[-1] > last:
+                series.set_forming(starts[-1], *values[-1])
+        return len(starts[:-1][closed])
+
+    def view(self, symbol, interval, count=None, include_forming=True):
+        """The last `count` candles (the forming one last, like get_ohlcv) as a CandleView."""
+        return self.columns(symbol, interval).view(count, include_forming)
+
+    def memory(self):
+        """:return: dict symbol -> bytes held by its series (every interval), plus 'total'"""
+        usage = {}
+        for (symbol, _), series in list(self.series.items()):
+            usage[symbol] = usage.get(symbol, 0) + series.nbytes
+        usage['total'] = sum(usage.values())
+        return usage
@@ -0,0 +1,80 @@
+# candle_scheduler.py
+import time
+import threading
+from classes.candle_store import INTERVAL_SECONDS
+
+
+class CandleScheduler:
+    def __init__(self, interval='minute30', probe=None, probe_interval=0.2, probe_timeout=15.0,
+                 metrics_manager=None):
+        """
+        Sleeps until the next candle close of `interval` and returns once that candle is final.
+        The wait is one Event.wait on a monotonic deadline (no polling loop, no drift from counting
+        sleeps, no early or late wake-up when the wall clock is stepped) and stop() ends it at once,
+        e.g. from a SIGTERM handler.
+        :param probe: function(boundary) -> True once the exchange has finalized the candle ending at
+                      boundary (epoch seconds); None trusts the clock alone
+        :param probe_interval: seconds between probes while the candle is not final yet
+        :param probe_timeout: seconds after the close to give up probing and run anyway
+        :param metrics_manager: optional MetricsManager receiving 'wake_drift' and 'close_to_final' (ms)
+        """
+        self.seconds = INTERVAL_SECONDS[interval]
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.metrics_manager = metrics_manager
+        self.stopped = threading.Event()
+        # wall-clock time of the candle close the last wait() returned for
+        self.boundary = None
+
+    def next_boundary(self, now=None):
+        """Next candle close in epoch seconds; Upbit candles are aligned on epoch time."""
+        now = time.time() if now is None else now
+        return (int(now) // self.seconds + 1) * self.seconds
+
+    def stop(self):
+        self.stopped.set()
+
+    def _sleep_until(self, boundary):
+        # the wall-clock target is turned into a monotonic deadline once; the wake-up drift the
+        # caller records shows any clock step that happened while sleeping
+        deadline = time.monotonic() + (boundary - time.time())
+        while not self.stopped.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            self.stopped.wait(remaining)
+        return False
+
+    def wait(self):
+        """
+        Blocks until the next candle is closed and final.
+        :return: the candle close (epoch seconds), or None when stop() was called
+        """
+        boundary = self.next_boundary()
+        if not self._sleep_until(boundary):
+            return None
+        drift = time.time() - boundary
+        self._record('wake_drift', drift * 1000)
+
+        if self.probe is not None:
+            deadline = time.monotonic() + self.probe_timeout
+            while not self.stopped.is_set():
+                try:
+                    if self.probe(boundary):
+                        break
+                except Exception as x:
+                    print(f"Candle probe failed ({x.__class__.__name__}: {x}); retrying.")
+                if time.monotonic() >= deadline:
+                    print(f"Candle closing at {boundary} not confirmed after {self.probe_timeout}s; running anyway.")
+                    break
+                self.stopped.wait(self.probe_interval)
+            if self.stopped.is_set():
+                return None
+        self._record('close_to_final', (time.time() - boundary) * 1000)
+        self.boundary = boundary
+        return boundary
+
+    def _record(self, name, ms):
+        if self.metrics_manager is not None:
+            self.metrics_manager.record(name, ms)
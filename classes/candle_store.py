@@ -0,0 +1,153 @@
+# candle_store.py
+import os
+import numpy as np
+import pandas as pd
+
+# candle length per pyupbit interval; week/month are only used to size delta fetches
+INTERVAL_SECONDS = {
+    'minute1': 60, 'minute3': 180, 'minute5': 300, 'minute10': 600, 'minute15': 900,
+    'minute30': 1800, 'minute60': 3600, 'minute240': 14400,
+    'day': 86400, 'week': 604800, 'month': 2678400,
+}
+# Upbit labels candles in KST; its minute240 and day candles start on UTC boundaries (09:00 KST)
+KST_OFFSET = 9 * 3600
+
+
+class CandleStore:
+    fields = ('open', 'high', 'low', 'close', 'volume', 'value')
+
+    def __init__(self, root=os.path.join("data", "candles"), fetcher=None, bootstrap_count=2000):
+        """
+        Append-only on-disk OHLCV store keyed by (ticker, interval).
+        Each series is two raw little-endian files that are read back with np.memmap:
+        time.i8 (candle start, int64 ns) and ohlcv.f8 (n x 6 float64).
+        Only closed candles are stored; the candle still forming is served from the last fetch.
+        :param root: directory holding one sub directory per ticker/interval
+        :param fetcher: function with the signature of pyupbit.get_ohlcv (injectable for tests)
+        :param bootstrap_count: number of candles fetched when a series is empty
+        """
+        self.root = root
+        self.bootstrap_count = bootstrap_count
+        self._fetcher = fetcher
+        self.forming = {}
+
+    @property
+    def fetcher(self):
+        # pyupbit is imported on first fetch so start-up does not pay for it
+        if self._fetcher is None:
+            import pyupbit
+            self._fetcher = pyupbit.get_ohlcv
+        return self._fetcher
+
+    @fetcher.setter
+    def fetcher(self, fetcher):
+        self._fetcher = fetcher
+
+    def _paths(self, ticker, interval):
+        directory = os.path.join(self.root, ticker, interval)
+        return directory, os.path.join(directory, "time.i8"), os.path.join(directory, "ohlcv.f8")
+
+    def _load(self, ticker, interval):
+        """Memory maps a series. Returns (timestamps, rows), both empty if nothing is stored."""
+        _, time_path, data_path = self._paths(ticker, interval)
+        width = len(self.fields)
+        if not os.path.exists(time_path) or not os.path.exists(data_path):
+            return np.empty(0, dtype='<i8'), np.empty((0, width), dtype='<f8')
+
+        # an append interrupted between the two files leaves one of them longer
+        n = min(os.path.getsize(time_path) // 8, os.path.getsize(data_path) // (8 * width))
+        if n == 0:
+            return np.empty(0, dtype='<i8'), np.empty((0, width), dtype='<f8')
+        timestamps = np.memmap(time_path, dtype='<i8', mode='r', shape=(n,))
+        rows = np.memmap(data_path, dtype='<f8', mode='r', shape=(n, width))
+        return timestamps, rows
+
+    def count(self, ticker, interval):
+        return len(self._load(ticker, interval)[0])
+
+    def last_timestamp(self, ticker, interval):
+        timestamps, _ = self._load(ticker, interval)
+        if len(timestamps) == 0:
+            return None
+        return pd.Timestamp(int(timestamps[-1]))
+
+    def append(self, ticker, interval, df):
+        """
+        Appends closed candles newer than the last stored one.
+        :param df: OHLCV frame indexed by candle start time (pyupbit format)
+        :return: number of candles written
+        """
+        if df is None or df.empty:
+            return 0
+        directory, time_path, data_path = self._paths(ticker, interval)
+        os.makedirs(directory, exist_ok=True)
+
+        stored, _ = self._load(ticker, interval)
+        n = len(stored)
+        # drop the tail of an interrupted append before writing
+        for path, row_size in ((time_path, 8), (data_path, 8 * len(self.fields))):
+            if os.path.exists(path) and os.path.getsize(path) != n * row_size:
+                os.truncate(path, n * row_size)
+
+        timestamps = df.index.values.astype('datetime64[ns]').astype('<i8')
+        keep = timestamps > stored[-1] if n else np.ones(len(timestamps), dtype=bool)
+        if not keep.any():
+            return 0
+        rows = df.reindex(columns=list(self.fields)).to_numpy(dtype='<f8')[keep]
+
+        # rows first: a crash between the two writes is trimmed by _load/append
+        with open(data_path, 'ab') as f:
+            f.write(np.ascontiguousarray(rows).tobytes())
+        with open(time_path, 'ab') as f:
+            f.write(timestamps[keep].tobytes())
+        return int(keep.sum())
+
+    def read(self, ticker, interval, start=None, end=None, count=None):
+        """
+        Serves stored closed candles without touching the network.
+        :param start: first candle time to include (inclusive)
+        :param end: last candle time to include (inclusive)
+        :param count: keep only the last `count` candles of the range
+        :return: OHLCV DataFrame in the pyupbit layout
+        """
+        timestamps, rows = self._load(ticker, interval)
+        lo = 0 if start is None else np.searchsorted(timestamps, pd.Timestamp(start).value, side='left')
+        hi = len(timestamps) if end is None else np.searchsorted(timestamps, pd.Timestamp(end).value, side='right')
+        if count is not None:
+            lo = max(lo, hi - count)
+        index = pd.DatetimeIndex(np.asarray(timestamps[lo:hi]).view('datetime64[ns]'))
+        return pd.DataFrame(np.array(rows[lo:hi]), index=index, columns=list(self.fields))
+
+    def update(self, ticker, interval):
+        """
+        Fetches only the candles newer than the last stored one and appends the closed ones.
+        Usually a single request for 2 candles (last closed + forming); after downtime a
+        second request sized from the gap fills the hole.
+        :return: the fetched frame (including the forming candle), or None if the fetch failed
+        """
+        last = self.last_timestamp(ticker, interval)
+        if last is None:
+            df = self.fetcher(ticker, interval, self.bootstrap_count)
+        else:
+            step = INTERVAL_SECONDS.get(interval, 60)
+            df = self.fetcher(ticker, interval, 2)
+            if df is not None and not df.empty and (df.index[0] - last).total_seconds() > step:
+                missing = int((df.index[-1] - last).total_seconds() // step) + 2
+                df = self.fetcher(ticker, interval, missing)
+
+        if df is None or df.empty:
+            return None
+        self.append(ticker, interval, df.iloc[:-1])
+        self.forming[(ticker, interval)] = df.iloc[-1:]
+        return df
+
+    def get_ohlcv(self, ticker, interval, count):
+        """
+        Drop-in replacement for pyupbit.get_ohlcv(ticker, interval, count) backed by the store:
+        the last count-1 closed candles from disk plus the forming candle from the delta fetch.
+        """
+        if self.update(ticker, interval) is None:
+            return None
+        forming = self.forming[(ticker, interval)]
+        closed = self.read(ticker, interval, count=count - 1)
+        return pd.concat([closed, forming.reindex(columns=list(self.fields))])
@@ -1,51 +1,450 @@
-#data_manager.py
-import pandas as pd
-import numpy as np
-import pyupbit
-
-class DataManager:
-    def __init__(self,access_key,secret_key,ticker='KRW-BTC',interval='minute30',count=300):
-        self.upbit = pyupbit.Upbit(access_key,secret_key)
-        self.ticker = ticker
-        self.interval = interval
-        self.count = count  
-        self.coin_data = None
-
-    def get_historical_data(self,ticker,interval,count):
-        df=pyupbit.get_ohlcv(ticker,interval,count)
-        return df
-
-
-    def get_account_balance(self):
-        account_balance = self.upbit.get_balance("KRW")
-        return account_balance
-    
-    def get_coin_balance(self):
-        balance = self.upbit.get_balance('KRW-BTC') 
-        price =pyupbit.get_current_price('KRW-BTC')
-
-        data=[]
-        data.append({'symbol':'KRW-BTC',
-                     'coin_balance':balance,
-                     'current_price':price
-                     })
-
-        # if balance is None:
-        #     balance = 0
-        self.coin_data = pd.DataFrame(data)
-        self.coin_data = self.coin_data.set_index('symbol')
-       
-        return self.coin_data
-    
-
-    def get_current_price(self,ticker):
-        current_price = pyupbit.get_current_price(ticker)
-        return current_price
-    
-    def execute_buy_market_price(self,ticker,invest_amount):
-        self.upbit.buy_market_order(ticker,invest_amount)
-
-    def exectute_sell_market_price(self,ticker,sell_amount):
-        self.upbit.sell_market_order(ticker,sell_amount)
-
-        
\ No newline at end of file
+#data_manager.py
+import time
+import asyncio
+import datetime
+from types import MappingProxyType
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from classes.ttl_cache import TTLCache
+from classes.candle_store import INTERVAL_SECONDS, KST_OFFSET
+
+UPBIT_API_URL = "https://api.upbit.com/v1"
+# seconds a response is reused: long enough to serve every read of one cycle from one request,
+# short enough that the next cycle always sees fresh data. Balances are also dropped after every order.
+CACHE_TTLS = {'accounts': 2.0, 'ticker': 1.0, 'candles': 2.0}
+# OHLCV column -> field of Upbit's /candles answer (the names pyupbit.get_ohlcv renames them to)
+CANDLE_FIELDS = {'open': 'opening_price', 'high': 'high_price', 'low': 'low_price', 'close': 'trade_price',
+                 'volume': 'candle_acc_trade_volume', 'value': 'candle_acc_trade_price'}
+
+
+class RateLimited(requests.RequestException):
+    """Upbit answered 429: the request was not processed and can be sent again after retry_after seconds."""
+    def __init__(self, message, retry_after=0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    """
+    Immutable view of everything one cycle reads from the exchange.
+    balances maps currency ('KRW', 'BTC', ...) to the available balance,
+    prices maps ticker to the last trade price and candles maps ticker to its OHLCV frame.
+    """
+    timestamp: datetime.datetime
+    balances: MappingProxyType
+    prices: MappingProxyType
+    candles: MappingProxyType
+    latency: float
+
+    @property
+    def krw_balance(self):
+        return self.balances.get('KRW', 0.0)
+
+    def coin_balance(self, ticker):
+        return self.balances.get(ticker.split('-')[-1], 0.0)
+
+    def current_price(self, ticker):
+        return self.prices.get(ticker)
+
+
+class DataManager:
+    def __init__(self,access_key,secret_key,ticker='KRW-BTC',interval='minute30',count=300,candle_store=None,
+                 timeout=5,max_workers=8,rate_limiter=None,cache_ttls=None,candle_buffer=None,
+                 max_retries=3,retry_delay=0.5):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self._upbit = None
+        self.ticker = ticker
+        self.interval = interval
+        self.count = count  
+        self.coin_data = None
+        # optional CandleStore: only candles newer than the stored ones are downloaded
+        self.candle_store = candle_store
+        if candle_store is not None and candle_store._fetcher is None:
+            # the store downloads through this manager's session rather than pyupbit's
+            candle_store.fetcher = self.fetch_ohlcv
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.session = None
+        self.executor = None
+        # optional RateLimiter shared by every thread that calls the exchange through this manager
+        self.rate_limiter = rate_limiter
+        # per-endpoint TTL cache; identical concurrent requests are sent once. {} turns caching off
+        self.cache = TTLCache(CACHE_TTLS if cache_ttls is None else cache_ttls)
+        # optional CandleBuffer: candles are merged into shared columns and read as zero-copy views
+        self.candle_buffer = candle_buffer
+        # snapshot reads retry 429/5xx answers and lost connections with exponential backoff from retry_delay
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+    @property
+    def upbit(self):
+        # pyupbit is imported on first use so start-up does not pay for it
+        if self._upbit is None:
+            import pyupbit
+            self._upbit = pyupbit.Upbit(self.access_key, self.secret_key)
+        return self._upbit
+
+    @upbit.setter
+    def upbit(self, client):
+        self._upbit = client
+
+    def _throttle(self):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+    def get_historical_data(self,ticker,interval,count):
+        if self.candle_store is not None:
+            return self.candle_store.get_ohlcv(ticker,interval,count)
+        df=self.fetch_ohlcv(ticker,interval,count)
+        return df
+
+    def fetch_ohlcv(self, ticker='KRW-BTC', interval='minute30', count=200):
+        """
+        pyupbit.get_ohlcv on the pooled session: one /candles request per 200 candles through _get, so every
+        page is rate limited and retried. Also the CandleStore's fetcher when the store was given none.
+        :return: OHLCV frame indexed by KST candle start, oldest first; None when a request still fails after the retries
+        """
+        url = _candle_url(interval)
+        pages = []
+        to = None
+        for remaining in range(max(count, 1), 0, -200):
+            params = {'market': ticker, 'count': min(remaining, 200)}
+            if to is not None:
+                params['to'] = to
+            try:
+                contents = self._get(url, params=params).json()
+            except (requests.RequestException, ValueError) as e:
+                print(f"Candle request for {ticker} {interval} failed: {e}")
+                return None
+            if not contents:
+                break
+            pages.append(contents)
+            # Upbit answers newest first; the next page ends before the oldest candle of this one (UTC)
+            to = contents[-1]['candle_date_time_utc'].replace('T', ' ')
+
+        rows = [row for page in reversed(pages) for row in reversed(page)]
+        index = pd.DatetimeIndex(pd.to_datetime([row['candle_date_time_kst'] for row in rows],
+                                                format="%Y-%m-%dT%H:%M:%S").values.astype('datetime64[ns]'))
+        return pd.DataFrame({field: [float(row[key]) for row in rows] for field, key in CANDLE_FIELDS.items()},
+                            index=index)
+
+    def get_ohlcv_block(self, tickers, interval, count):
+        """
+        Fetches OHLCV for several tickers and stacks them into aligned arrays.
+        :param tickers: list of tickers (e.g. pyupbit.get_tickers(fiat="KRW"))
+        :return: (tickers, index, high, low, close) where high/low/close are
+                 (n_tickers, n_candles) arrays aligned on the common candle index.
+                 Tickers without data are dropped; gaps are forward filled.
+        """
+        frames = {}
+        for ticker in tickers:
+            df = self.get_historical_data(ticker, interval, count)
+            if df is not None and not df.empty:
+                frames[ticker] = df
+
+        if not frames:
+            empty = np.empty((0, 0))
+            return [], pd.DatetimeIndex([]), empty, empty, empty
+
+        index = frames[next(iter(frames))].index
+        for df in frames.values():
+            index = index.union(df.index)
+        index = index[-count:]
+
+        block = {field: np.empty((len(frames), len(index))) for field in ('high', 'low', 'close')}
+        for i, df in enumerate(frames.values()):
+            aligned = df.reindex(index).ffill().bfill()
+            for field in block:
+                block[field][i] = aligned[field].to_numpy(dtype=np.float64)
+
+        return list(frames), index, block['high'], block['low'], block['close']
+
+    def get_candles(self, ticker, interval=None, count=None):
+        """
+        Cached get_historical_data (a CandleView of the candle buffer when there is one).
+        The close of the candle still forming is the last trade price, so a fresh download also
+        primes the price cache and saves the /ticker request.
+        """
+        interval = interval or self.interval
+        count = count or self.count
+
+        def load():
+            if self.candle_buffer is not None:
+                df = self._refresh_buffer(ticker, interval, count)
+            else:
+                df = self.get_historical_data(ticker, interval, count)
+            if df is not None and not df.empty:
+                self.cache.put('ticker', ticker, float(np.asarray(df['close'])[-1]))
+            return df
+        return self.cache.get('candles', (ticker, interval, count), load)
+
+    def _refresh_buffer(self, ticker, interval, count):
+        """
+        Brings the buffered series up to date with a 2-candle delta fetch (sized from the gap after a
+        pause, the full `count` window while the series is short) and returns a view of its last `count` candles.
+        """
+        series = self.candle_buffer.columns(ticker, interval)
+        last = series.last_start()
+        if last is None or len(series) < count - 1:
+            df = self.get_historical_data(ticker, interval, count)
+        else:
+            df = self.get_historical_data(ticker, interval, 2)
+            if df is not None and not df.empty:
+                step = INTERVAL_SECONDS[interval]
+                first, forming = (pd.Timestamp(t).value // 10**9 - KST_OFFSET for t in (df.index[0], df.index[-1]))
+                if first > last + step:
+                    # more than one candle closed since the last refresh: fetch what is missing
+                    df = self.get_historical_data(ticker, interval, min(count, (forming - last) // step + 1))
+        if df is None or df.empty:
+            return None
+        self.candle_buffer.update(ticker, interval, df)
+        return self.candle_buffer.view(ticker, interval, count)
+
+    def candle_closed(self, ticker, interval, boundary):
+        """
+        CandleScheduler probe: True once the exchange serves a candle starting at or after `boundary`
+        (epoch seconds), so the one before it is final. The frame stays cached for the cycle that follows.
+        """
+        self.cache.invalidate('candles')
+        df = self.get_candles(ticker, interval, self.count)
+        if df is None or df.empty:
+            return False
+        return pd.Timestamp(df.index[-1]).value // 10**9 - KST_OFFSET >= boundary
+
+    def get_balances(self):
+        """Cached balances of every currency. :return: dict currency -> available balance"""
+        return self.cache.get('accounts', None, self._fetch_balances)
+
+    def get_prices(self, tickers):
+        """
+        Cached last trade prices; tickers without a fresh price are fetched in one /ticker request.
+        :return: dict ticker -> price
+        """
+        prices = {}
+        missing = []
+        for ticker in tickers:
+            price = self.cache.lookup('ticker', ticker)
+            if price is None:
+                missing.append(ticker)
+            else:
+                prices[ticker] = price
+
+        if missing:
+            def load():
+                fetched = self._fetch_prices(missing)
+                for ticker, price in fetched.items():
+                    self.cache.put('ticker', ticker, price)
+                return fetched
+            prices.update(self.cache.get('ticker', tuple(missing), load))
+        return prices
+
+    def invalidate(self, endpoint='accounts'):
+        """Drops cached data that an order made stale (balances by default; None drops everything)."""
+        self.cache.invalidate(endpoint)
+
+    def cache_stats(self):
+        """:return: hits, misses, shared loads and errors per endpoint"""
+        return self.cache.stats()
+
+    def get_account_balance(self):
+        account_balance = self.get_balances().get("KRW", 0.0)
+        return account_balance
+    
+    def get_coin_balance(self, ticker=None):
+        ticker = ticker or self.ticker
+        balance = self.get_balances().get(ticker.split('-')[-1], 0.0)
+        price =self.get_current_price(ticker)
+
+        data=[]
+        data.append({'symbol':ticker,
+                     'coin_balance':balance,
+                     'current_price':price
+                     })
+
+        # if balance is None:
+        #     balance = 0
+        self.coin_data = pd.DataFrame(data)
+        self.coin_data = self.coin_data.set_index('symbol')
+       
+        return self.coin_data
+    
+
+    def _get_session(self):
+        # one keep-alive connection pool shared by every snapshot request
+        if self.session is None:
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.max_workers)
+            self.session.mount("https://", adapter)
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="snapshot")
+        return self.session
+
+    def _get(self, url, headers=None, **kwargs):
+        """
+        GET that retries 429 and 5xx answers and lost connections with exponential backoff; a Retry-After
+        header sets the minimum wait. Raises once the retries are used up, like raise_for_status.
+        """
+        delay = 0.0
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(delay)
+            self._throttle()
+            try:
+                # fresh headers per attempt: the JWT nonce must not be reused
+                response = self._get_session().get(url, headers=headers() if headers else None,
+                                                   timeout=self.timeout, **kwargs)
+            except (requests.Timeout, requests.ConnectionError):
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_delay * 2 ** attempt
+                continue
+            if response.status_code != 429 and response.status_code < 500:
+                break
+            delay = max(self.retry_delay * 2 ** attempt, _retry_after(response))
+            print(f"Upbit returned {response.status_code} for {url}; attempt {attempt + 1} of {self.max_retries + 1}.")
+        response.raise_for_status()
+        return response
+
+    def _fetch_balances(self):
+        # a single /accounts call returns KRW and every coin balance
+        response = self._get(f"{UPBIT_API_URL}/accounts", headers=self.upbit._request_headers)
+        return {account['currency']: float(account['balance']) for account in response.json()}
+
+    def _fetch_prices(self, tickers):
+        response = self._get(f"{UPBIT_API_URL}/ticker", params={'markets': ','.join(tickers)})
+        return {item['market']: item['trade_price'] for item in response.json()}
+
+    async def fetch_snapshot(self, tickers=None, interval=None, count=None, candles=True):
+        """
+        Fires the balance and candle requests concurrently and waits for all of them.
+        Prices come from the candles just downloaded; only tickers without one hit /ticker.
+        Everything goes through the TTL cache, so a second snapshot within the TTL sends no request.
+        :param tickers: tickers to price (and fetch candles for); defaults to [self.ticker]
+        :param candles: set to False to refresh only balances and prices (e.g. after a trade)
+        :return: MarketSnapshot
+        """
+        tickers = list(tickers or [self.ticker])
+        interval = interval or self.interval
+        count = count or self.count
+        self._get_session()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+
+        requests_ = [loop.run_in_executor(self.executor, self.get_balances)]
+        if candles:
+            requests_ += [loop.run_in_executor(self.executor, self.get_candles, ticker, interval, count)
+                          for ticker in tickers]
+        else:
+            requests_.append(loop.run_in_executor(self.executor, self.get_prices, tickers))
+        results = await asyncio.gather(*requests_)
+        if candles:
+            prices = await loop.run_in_executor(self.executor, self.get_prices, tickers)
+            frames = dict(zip(tickers, results[1:]))
+        else:
+            prices = results[1]
+            frames = {}
+
+        return MarketSnapshot(
+            timestamp=datetime.datetime.now(),
+            balances=MappingProxyType(results[0]),
+            prices=MappingProxyType(prices),
+            candles=MappingProxyType(frames),
+            latency=time.perf_counter() - started,
+        )
+
+    def get_snapshot(self, tickers=None, interval=None, count=None, candles=True):
+        """Blocking wrapper around fetch_snapshot for the synchronous bot loop."""
+        return asyncio.run(self.fetch_snapshot(tickers, interval, count, candles))
+
+    def get_current_price(self,ticker):
+        current_price = self.get_prices([ticker]).get(ticker)
+        return current_price
+    
+    def execute_buy_market_price(self,ticker,invest_amount):
+        response = self.upbit.buy_market_order(ticker,invest_amount)
+        self.invalidate('accounts')
+        return response
+
+    def exectute_sell_market_price(self,ticker,sell_amount):
+        response = self.upbit.sell_market_order(ticker,sell_amount)
+        self.invalidate('accounts')
+        return response
+
+    def place_order(self, ticker, side, ord_type, price=None, volume=None, identifier=None):
+        """
+        POST /orders with a client identifier, so a lost response can be looked up with get_order.
+        :param side: 'bid' or 'ask'
+        :param ord_type: 'price' (market buy by KRW amount), 'market' (market sell by volume) or 'limit'
+        :return: the order, or Upbit's {'error': {...}} payload when the order was rejected
+        :raise RateLimited: on 429, the order was not placed and may be sent again
+        """
+        query = {'market': ticker, 'side': side, 'ord_type': ord_type}
+        if price is not None:
+            query['price'] = _number(price)
+        if volume is not None:
+            query['volume'] = _number(volume)
+        if identifier is not None:
+            query['identifier'] = identifier
+        self._throttle()
+        headers = self.upbit._request_headers(query)
+        response = self._get_session().post(f"{UPBIT_API_URL}/orders", json=query, headers=headers,
+                                            timeout=self.timeout)
+        if response.status_code >= 500:
+            raise requests.ConnectionError(f"Upbit returned {response.status_code}")
+        if response.status_code == 429:
+            raise RateLimited("Upbit returned 429 on order", _retry_after(response))
+        # accepted or not, the cached balances can no longer be trusted
+        self.invalidate('accounts')
+        return _json(response)
+
+    def get_order(self, uuid=None, identifier=None):
+        """Looks an order up by uuid or client identifier. :return: the order with its trades, or None"""
+        query = {'uuid': uuid} if uuid is not None else {'identifier': identifier}
+        self._throttle()
+        headers = self.upbit._request_headers(query)
+        response = self._get_session().get(f"{UPBIT_API_URL}/order", params=query, headers=headers,
+                                           timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        if response.status_code >= 500:
+            raise requests.ConnectionError(f"Upbit returned {response.status_code}")
+        if response.status_code == 429:
+            raise RateLimited("Upbit returned 429 on order lookup", _retry_after(response))
+        return _json(response)
+
+        
+
+
+def _json(response):
+    """Response body as JSON; a body that is not JSON (e.g. a proxy's error page) becomes Upbit's error payload."""
+    try:
+        return response.json()
+    except ValueError:
+        return {'error': {'name': f"http_{response.status_code}", 'message': response.text[:200]}}
+
+
+def _candle_url(interval):
+    """/candles endpoint of a pyupbit interval name ('minute30', 'day', 'week', 'month'); unknown names get days."""
+    if interval.startswith('minute'):
+        return f"{UPBIT_API_URL}/candles/minutes/{interval[len('minute'):]}"
+    if interval in ('week', 'month'):
+        return f"{UPBIT_API_URL}/candles/{interval}s"
+    return f"{UPBIT_API_URL}/candles/days"
+
+
+def _retry_after(response):
+    """Seconds asked for by a Retry-After header (0 when there is none or it is not a number)."""
+    try:
+        return max(0.0, float(response.headers.get('Retry-After', 0)))
+    except ValueError:
+        return 0.0
+
+
+def _number(value):
+    """Plain decimal string for an order parameter (no exponent, at most 8 decimals)."""
+    return f"{value:.8f}".rstrip('0').rstrip('.') if isinstance(value, float) else str(value)
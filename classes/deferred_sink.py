@@ -0,0 +1,61 @@
+# deferred_sink.py
+import threading
+
+
+class DeferredSink:
+    def __init__(self, factory, name='sink'):
+        """
+        Stand-in for a journal sink (NotionManager, SlackManager) that is still connecting.
+        factory() runs on a background thread; calls made before it returns are queued and
+        replayed in order once the real sink exists, so start-up never waits for it.
+        :param factory: function returning the connected sink
+        """
+        self.name = name
+        self.sink = None
+        self.error = None
+        self.pending = []
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._connect, args=(factory,), name=f"connect-{name}", daemon=True)
+        self.thread.start()
+
+    def _connect(self, factory):
+        try:
+            sink = factory()
+        except Exception as x:
+            with self.lock:
+                self.error = x
+                dropped = len(self.pending)
+                self.pending = []
+            print(f"{self.name}: could not connect ({x.__class__.__name__}: {x}); "
+                  f"{dropped} queued calls dropped, later calls are ignored.")
+            self.ready.set()
+            return
+        with self.lock:
+            for method, args, kwargs in self.pending:
+                getattr(sink, method)(*args, **kwargs)
+            self.pending = []
+            self.sink = sink
+        self.ready.set()
+
+    def wait(self, timeout=None):
+        """Blocks until the sink is connected (or failed). Returns the sink or None."""
+        self.ready.wait(timeout)
+        return self.sink
+
+    def __getattr__(self, method):
+        def call(*args, **kwargs):
+            if self.sink is not None:
+                return getattr(self.sink, method)(*args, **kwargs)
+            with self.lock:
+                if self.sink is None:
+                    if self.error is None:
+                        self.pending.append((method, args, kwargs))
+                    return None
+            return getattr(self.sink, method)(*args, **kwargs)
+        return call
+
+    def close(self, timeout=10):
+        """Waits for the connection, then closes the real sink so queued calls get flushed."""
+        sink = self.wait(timeout)
+        return sink.close(timeout) if sink is not None else False
@@ -0,0 +1,185 @@
+# execution_engine.py
+import math
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from classes.data_manager import RateLimited
+
+MIN_ORDER_KRW = 5000
+TERMINAL_STATES = ('done', 'cancel')
+
+
+class Fill:
+    """Outcome of one buy() or sell(): what actually executed across every child order."""
+    __slots__ = ('identifier', 'ticker', 'side', 'requested', 'executed_volume', 'funds', 'avg_price',
+                 'fee', 'status', 'orders', 'errors', 'latency')
+
+    def __init__(self, identifier, ticker, side, requested):
+        self.identifier = identifier
+        self.ticker = ticker
+        self.side = side
+        self.requested = requested
+        self.executed_volume = 0.0
+        self.funds = 0.0
+        self.avg_price = None
+        self.fee = 0.0
+        self.status = 'failed'
+        self.orders = []
+        self.errors = []
+        self.latency = 0.0
+
+    def __repr__(self):
+        return (f"Fill({self.identifier}, {self.side} {self.ticker}, status={self.status}, "
+                f"volume={self.executed_volume}, avg_price={self.avg_price}, fee={self.fee})")
+
+
+class ExecutionEngine:
+    def __init__(self, data_manager, max_slice_krw=None, slice_interval=0.0, poll_interval=0.2,
+                 fill_timeout=10.0, max_retries=3, retry_delay=0.5, max_workers=4, prefix='yyl'):
+        """
+        Places market orders with client identifiers and tracks them until they are filled.
+        A submit that times out is looked up by its identifier before it is sent again, and a resend
+        reuses the identifier, which the exchange rejects as a duplicate, so a retry can never fill twice.
+        :param data_manager: DataManager (or SimulatedDataManager) providing place_order/get_order
+        :param max_slice_krw: orders larger than this are split into equal child orders; None never splits
+        :param slice_interval: seconds between child orders, so a large order walks the book more slowly
+        :param poll_interval: seconds between order status checks
+        :param fill_timeout: seconds to wait for an order to reach a final state
+        :param max_retries: submit attempts after the first one on timeouts, connection errors and 429s
+        :param prefix: start of every client identifier
+        """
+        self.data_manager = data_manager
+        self.max_slice_krw = max_slice_krw
+        self.slice_interval = slice_interval
+        self.poll_interval = poll_interval
+        self.fill_timeout = fill_timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.prefix = prefix
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="execution")
+
+    def new_identifier(self):
+        return f"{self.prefix}-{uuid.uuid4().hex[:24]}"
+
+    def buy(self, ticker, krw_amount):
+        """Market buy for `krw_amount` KRW. :return: Fill"""
+        return self._execute(ticker, 'bid', 'price', krw_amount, self._slices(krw_amount, krw_amount))
+
+    def sell(self, ticker, volume, price=None):
+        """
+        Market sell of `volume` coins.
+        :param price: current price, only used to decide how many slices the order needs
+        """
+        value = volume * price if price else None
+        return self._execute(ticker, 'ask', 'market', volume, self._slices(volume, value))
+
+    def _slices(self, quantity, value):
+        if not self.max_slice_krw or not value or value <= self.max_slice_krw:
+            return [quantity]
+        # equal slices, none of them below the exchange minimum
+        n = min(math.ceil(value / self.max_slice_krw), max(1, int(value // MIN_ORDER_KRW)))
+        size = quantity / n
+        return [size] * (n - 1) + [quantity - size * (n - 1)]
+
+    def _execute(self, ticker, side, ord_type, requested, slices):
+        started = time.perf_counter()
+        fill = Fill(self.new_identifier(), ticker, side, requested)
+        futures = []
+        for i, size in enumerate(slices):
+            if i and self.slice_interval:
+                time.sleep(self.slice_interval)
+            identifier = fill.identifier if len(slices) == 1 else f"{fill.identifier}-{i}"
+            order, error = self._submit(ticker, side, ord_type, size, identifier)
+            if order is None:
+                fill.errors.append(error)
+                break
+            # the next slice goes out while this one is still being tracked
+            futures.append(self.executor.submit(self._track, order))
+
+        for future in futures:
+            order, error = future.result()
+            if error:
+                fill.errors.append(error)
+            if order is not None:
+                fill.orders.append(order['uuid'])
+                self._add_trades(fill, order)
+
+        if fill.executed_volume > 0:
+            fill.avg_price = fill.funds / fill.executed_volume
+            done = fill.funds if side == 'bid' else fill.executed_volume
+            fill.status = 'filled' if done >= requested * 0.999 else 'partial'
+        fill.latency = time.perf_counter() - started
+        # the fills changed the balances: the next read must go to the exchange
+        if fill.orders and hasattr(self.data_manager, 'invalidate'):
+            self.data_manager.invalidate('accounts')
+        if fill.errors:
+            print(f"Execution {fill.identifier}: {fill.status} with errors {fill.errors}")
+        return fill
+
+    @staticmethod
+    def _add_trades(fill, order):
+        for trade in order.get('trades') or []:
+            fill.executed_volume += float(trade['volume'])
+            fill.funds += float(trade['funds'])
+        fill.fee += float(order.get('paid_fee') or 0.0)
+
+    def _submit(self, ticker, side, ord_type, size, identifier):
+        """:return: (order, None) once the exchange accepted the order, (None, error) otherwise"""
+        price, volume = (size, None) if side == 'bid' else (None, size)
+        error = None
+        retry_after = 0.0
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(max(retry_after, self.retry_delay * 2 ** (attempt - 1)))
+            retry_after = 0.0
+            try:
+                result = self.data_manager.place_order(ticker, side, ord_type, price=price, volume=volume,
+                                                       identifier=identifier)
+            except RateLimited as x:
+                # refused before it was processed: the same order can simply be sent again
+                error = "rate limited on submit"
+                retry_after = x.retry_after
+                continue
+            except (requests.Timeout, requests.ConnectionError) as x:
+                # the request may still have reached the exchange: find out before sending it again
+                error = f"{x.__class__.__name__} on submit"
+                existing = self._lookup(identifier)
+                if existing is not None:
+                    return existing, None
+                continue
+            if 'error' not in result:
+                return result, None
+            error = result['error'].get('name') or result['error'].get('message')
+            # a resend after a lost response is rejected as a duplicate: the first one went through
+            if attempt:
+                existing = self._lookup(identifier)
+                if existing is not None:
+                    return existing, None
+            return None, error
+        return None, error
+
+    def _lookup(self, identifier):
+        try:
+            order = self.data_manager.get_order(identifier=identifier)
+        except (requests.Timeout, requests.ConnectionError, RateLimited):
+            return None
+        return order if order and 'error' not in order else None
+
+    def _track(self, order):
+        """Polls the order until it is done or cancelled. :return: (final order, error)"""
+        deadline = time.monotonic() + self.fill_timeout
+        while order.get('state') not in TERMINAL_STATES or 'trades' not in order:
+            if time.monotonic() >= deadline:
+                return order, f"order {order['uuid']} still {order.get('state')} after {self.fill_timeout}s"
+            time.sleep(self.poll_interval)
+            try:
+                latest = self.data_manager.get_order(uuid=order['uuid'])
+            except (requests.Timeout, requests.ConnectionError, RateLimited):
+                continue
+            if latest and 'error' not in latest:
+                order = latest
+        return order, None
+
+    def close(self):
+        self.executor.shutdown(wait=True)
@@ -1,55 +1,367 @@
-# indicator_manager.py
-import pandas as pd
-import numpy as np
-import requests
-import pyupbit
-
-class IndicatorManager:
-    def __init__(self, window=20,span=10,multiplier=2):
-        self.window = window
-        self.span = span
-        self.multiplier = multiplier
-
-    
-    def calculate_indicator(self, prices):
-        prices_high = prices['high']
-        prices_low = prices['low']
-        prices_close = prices['close']
-
-        ma= prices_close.ewm(span=self.window).mean()
-        diff = (prices_close - ma)
-
-        # calculate ying yang volatility
-
-        yangvol = np.sqrt((diff**2*(diff > 0)).rolling(window=self.window).mean())
-        yingvol = np.sqrt((diff**2*(diff <=0)).rolling(window=self.window).mean())
-        totalvol = np.sqrt(yangvol**2 + yingvol**2)
-        epsilon = 1e-10
-        YYL = ((yangvol-yingvol)/(totalvol+epsilon))*100
-        YYL_slow = YYL.rolling(window=self.span).mean()
-
-        # calculate upper band and pan river band
-        upper_band = ma + self.multiplier * yangvol
-        lower_band = ma - self.multiplier * yingvol
-        pan_river_up = (ma+upper_band)/2
-        pan_river_down = (ma+lower_band)/2
-
-        # calcualte yingyang cycle
-        yingyang_cycle = (upper_band-ma)**2
-
-
-
-        indicators =pd.DataFrame({
-                        'high':prices_high,
-                        'low':prices_low,
-                        'close':prices_close,
-                        'ma':ma,
-                        'YYL':YYL,
-                        'YYL_slow':YYL_slow,
-                        'upper_band':upper_band,
-                        'lower_band':lower_band,
-                        'pan_river_up':pan_river_up,
-                        'pan_river_down':pan_river_down 
-        })
-        indicators = indicators.dropna()
-        return indicators
\ No newline at end of file
+# indicator_manager.py
+import math
+import pandas as pd
+import numpy as np
+from classes.candle_store import KST_OFFSET
+
+class IndicatorManager:
+    def __init__(self, window=20,span=10,multiplier=2):
+        self.window = window
+        self.span = span
+        self.multiplier = multiplier
+
+    
+    def calculate_indicator(self, prices):
+        prices_high = prices['high']
+        prices_low = prices['low']
+        prices_close = prices['close']
+
+        ma= prices_close.ewm(span=self.window).mean()
+        diff = (prices_close - ma)
+
+        # calculate ying yang volatility
+
+        yangvol = np.sqrt((diff**2*(diff > 0)).rolling(window=self.window).mean())
+        yingvol = np.sqrt((diff**2*(diff <=0)).rolling(window=self.window).mean())
+        totalvol = np.sqrt(yangvol**2 + yingvol**2)
+        epsilon = 1e-10
+        YYL = ((yangvol-yingvol)/(totalvol+epsilon))*100
+        YYL_slow = YYL.rolling(window=self.span).mean()
+
+        # calculate upper band and pan river band
+        upper_band = ma + self.multiplier * yangvol
+        lower_band = ma - self.multiplier * yingvol
+        pan_river_up = (ma+upper_band)/2
+        pan_river_down = (ma+lower_band)/2
+
+        # calcualte yingyang cycle
+        yingyang_cycle = (upper_band-ma)**2
+
+
+
+        indicators =pd.DataFrame({
+                        'high':prices_high,
+                        'low':prices_low,
+                        'close':prices_close,
+                        'ma':ma,
+                        'YYL':YYL,
+                        'YYL_slow':YYL_slow,
+                        'upper_band':upper_band,
+                        'lower_band':lower_band,
+                        'pan_river_up':pan_river_up,
+                        'pan_river_down':pan_river_down 
+        })
+        indicators = indicators.dropna()
+        return indicators
+
+    def calculate_indicator_batch(self, high, low, close):
+        """
+        Computes the indicators for many tickers at once.
+        :param high: (n_tickers, n_candles) array of high prices
+        :param low: (n_tickers, n_candles) array of low prices
+        :param close: (n_tickers, n_candles) array of close prices
+        :return: dict of column name -> (n_tickers, n_candles) float64 array.
+                 The first window+span-2 candles are NaN (warm-up), which is
+                 what calculate_indicator drops with dropna().
+        """
+        high = np.atleast_2d(np.asarray(high, dtype=np.float64))
+        low = np.atleast_2d(np.asarray(low, dtype=np.float64))
+        close = np.atleast_2d(np.asarray(close, dtype=np.float64))
+
+        ma = _ewm_mean(close, self.window)
+        diff = close - ma
+        sq = diff * diff
+
+        # calculate ying yang volatility
+        yangvol = _rolling_mean(np.where(diff > 0, sq, 0.0), self.window)
+        yingvol = _rolling_mean(np.where(diff <= 0, sq, 0.0), self.window)
+        np.sqrt(np.maximum(yangvol, 0.0, out=yangvol), out=yangvol)
+        np.sqrt(np.maximum(yingvol, 0.0, out=yingvol), out=yingvol)
+        totalvol = np.sqrt(yangvol**2 + yingvol**2)
+        epsilon = 1e-10
+        YYL = ((yangvol - yingvol) / (totalvol + epsilon)) * 100
+        YYL_slow = np.full_like(YYL, np.nan)
+        YYL_slow[:, self.window - 1:] = _rolling_mean(YYL[:, self.window - 1:], self.span)
+
+        # calculate upper band and pan river band
+        upper_band = ma + self.multiplier * yangvol
+        lower_band = ma - self.multiplier * yingvol
+
+        return {
+            'ma': ma,
+            'YYL': YYL,
+            'YYL_slow': YYL_slow,
+            'upper_band': upper_band,
+            'lower_band': lower_band,
+            'pan_river_up': (ma + upper_band) / 2,
+            'pan_river_down': (ma + lower_band) / 2,
+        }
+
+    def calculate_fused(self, high, low, close, atr_period=14, out=None):
+        """
+        Fused NumPy kernel for one series: ma, yangvol, yingvol, totalvol, YYL, YYL_slow and the
+        ATR in a few blocked passes over preallocated buffers, with no Series and no full-length
+        temporaries. Gives exactly the values of calculate_indicator_batch and, for the ATR, of
+        StrategyManager.calculate_atr's NumPy twin (calculate_indicator differs only by float rounding).
+        Shared by the live loop and the backtester.
+        :param high, low, close: 1-D price arrays
+        :param out: buffers from fused_buffers(len(close)) to reuse between calls
+        :return: dict column -> 1-D array (NaN while warming up) plus the high/low/close inputs,
+                 ready for StrategyManager.signal
+        """
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        out = _fused_kernel(high, low, close, self.window, self.span, atr_period,
+                            out if out is not None else fused_buffers(len(close)))
+        out.update(high=high, low=low, close=close)
+        return out
+
+    def create_state(self, prices=None):
+        """
+        Creates an incremental indicator state for one ticker.
+        :param prices: optional OHLCV frame of closed candles used to warm the state up
+        :return: IndicatorState that updates every indicator column in O(1) per candle
+        """
+        state = IndicatorState(self.window, self.span, self.multiplier)
+        if prices is not None:
+            state.warm_up(prices)
+        return state
+
+
+def _ewm_mean(x, span, out=None):
+    """
+    Vectorized equivalent of Series.ewm(span=span).mean() (adjust=True) along the last axis.
+    Works in blocks so that the (1-alpha)**-k rescaling used by the cumsum never overflows.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    decay = 1 - 2 / (span + 1)
+    out = np.empty_like(x) if out is None else out
+    if decay <= 0:
+        # span=1: alpha is 1 and the mean is x itself (the log below would fail)
+        out[...] = x
+        return out
+    block = max(1, int(500 / -math.log(decay)))
+    num = np.zeros(x.shape[:-1] + (1,))
+    den = 0.0
+    # the scale factors are the same for every block
+    k = np.arange(min(block, x.shape[-1]))
+    grows = decay ** -k
+    shrinks = decay ** k
+    for start in range(0, x.shape[-1], block):
+        chunk = x[..., start:start + block]
+        grow = grows[:chunk.shape[-1]]
+        shrink = shrinks[:chunk.shape[-1]]
+        nums = shrink * (decay * num + np.cumsum(chunk * grow, axis=-1))
+        dens = shrink * (decay * den + np.cumsum(grow))
+        out[..., start:start + block] = nums / dens
+        num = nums[..., -1:]
+        den = dens[-1]
+    return out
+
+
+def _rolling_mean(x, window, block=4096, out=None):
+    """
+    Vectorized equivalent of Series.rolling(window).mean() along the last axis.
+    The running sum is re-anchored every block so its rounding error stays bounded on long inputs.
+    Like pandas, a window holding one repeated value returns that value exactly, which keeps
+    YYL == YYL_slow ties (status 0) identical to the pandas path.
+    All temporaries are block sized; `out` may be a preallocated buffer (not x itself).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = x.shape[-1]
+    out = np.empty(x.shape) if out is None else out
+    out[..., :window - 1] = np.nan
+    zero = np.zeros(x.shape[:-1] + (1,))
+    for start in range(window - 1, n, block):
+        end = min(start + block, n)
+        chunk = x[..., start - window + 1:end]
+        csum = np.concatenate([zero, np.cumsum(chunk, axis=-1)], axis=-1)
+        means = out[..., start:end]
+        np.subtract(csum[..., window:], csum[..., :-window], out=means)
+        means /= window
+
+        # windows whose window - 1 neighbouring pairs are all equal hold one repeated value
+        same = np.concatenate([zero, np.cumsum(chunk[..., 1:] == chunk[..., :-1], axis=-1)], axis=-1)
+        constant = same[..., window - 1:] - same[..., :end - start] == window - 1
+        means[constant] = chunk[..., window - 1:][constant]
+    return out
+
+
+FUSED_COLUMNS = ('ma', 'yangvol', 'yingvol', 'totalvol', 'YYL', 'YYL_slow', 'atr')
+
+
+def fused_buffers(n):
+    """Output buffers for IndicatorManager.calculate_fused over n candles."""
+    return {column: np.empty(n) for column in FUSED_COLUMNS}
+
+
+def _fused_kernel(high, low, close, window, span, atr_period, out, block=65536):
+    n = len(close)
+    ma, yangvol, yingvol, totalvol, YYL, YYL_slow, atr = (out[column] for column in FUSED_COLUMNS)
+    _ewm_mean(close, window, out=ma)
+
+    # pass 1: squared deviations split by sign and the true range. Buffers whose final value comes
+    # later hold these inputs meanwhile: yang -> totalvol, ying -> YYL, true range -> YYL_slow
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        diff = close[start:end] - ma[start:end]
+        sq = diff * diff
+        yang_sq, ying_sq, tr = totalvol[start:end], YYL[start:end], YYL_slow[start:end]
+        yang_sq[:] = 0.0
+        np.copyto(yang_sq, sq, where=diff > 0)
+        ying_sq[:] = 0.0
+        np.copyto(ying_sq, sq, where=diff <= 0)
+
+        prev_close = close[start - 1:end - 1] if start else np.concatenate(([np.nan], close[:end - 1]))
+        np.subtract(high[start:end], low[start:end], out=tr)
+        with np.errstate(invalid='ignore'):
+            np.fmax(tr, np.abs(high[start:end] - prev_close), out=tr)
+            np.fmax(tr, np.abs(low[start:end] - prev_close), out=tr)
+
+    # pass 2: rolling means (block-sized temporaries only)
+    _rolling_mean(totalvol, window, out=yangvol)
+    _rolling_mean(YYL, window, out=yingvol)
+    _rolling_mean(YYL_slow, atr_period, out=atr)
+
+    # pass 3: volatilities and YYL, same operations and order as calculate_indicator_batch
+    epsilon = 1e-10
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        yang, ying, total, yyl = yangvol[start:end], yingvol[start:end], totalvol[start:end], YYL[start:end]
+        np.sqrt(np.maximum(yang, 0.0, out=yang), out=yang)
+        np.sqrt(np.maximum(ying, 0.0, out=ying), out=ying)
+        np.square(yang, out=total)
+        total += np.square(ying)
+        np.sqrt(total, out=total)
+        np.subtract(yang, ying, out=yyl)
+        yyl /= total + epsilon
+        yyl *= 100
+
+    YYL_slow[:window - 1] = np.nan
+    _rolling_mean(YYL[window - 1:], span, out=YYL_slow[window - 1:])
+    return out
+
+
+class RollingWindow:
+    """
+    Fixed-size ring buffer that keeps a running sum of its values.
+    The sum is recomputed exactly every time the head wraps around so that
+    add/subtract rounding never accumulates across the life of the bot, and a
+    window holding one repeated value returns it exactly, as pandas does.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.values = [0.0] * size
+        self.head = 0
+        self.count = 0
+        self.total = 0.0
+        self.last = None
+        self.run = 0
+
+    def push(self, value):
+        self.run = self.run + 1 if value == self.last else 1
+        self.last = value
+        old = self.values[self.head]
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+            old = 0.0
+
+        if self.head == 0:
+            self.total = math.fsum(self.values)
+        else:
+            self.total += value - old
+
+    def full(self):
+        return self.count == self.size
+
+    def mean(self):
+        if self.count < self.size:
+            return np.nan
+        if self.run >= self.size:
+            return self.last
+        return self.total / self.size
+
+
+class IndicatorState:
+    """
+    Running state of IndicatorManager.calculate_indicator for a single ticker.
+    Keeps the EWM numerator/denominator and the yang/ying/YYL rolling sums so
+    that pushing one closed candle updates every output column in constant time.
+    """
+    columns = ['high', 'low', 'close', 'ma', 'YYL', 'YYL_slow',
+               'upper_band', 'lower_band', 'pan_river_up', 'pan_river_down']
+
+    def __init__(self, window=20, span=10, multiplier=2):
+        self.window = window
+        self.span = span
+        self.multiplier = multiplier
+        self.decay = 1 - 2 / (window + 1)
+        self.ewm_num = 0.0
+        self.ewm_den = 0.0
+        self.yang_sq = RollingWindow(window)
+        self.ying_sq = RollingWindow(window)
+        self.yyl = RollingWindow(span)
+        self.timestamp = None
+        self.last = None
+
+    def warm_up(self, prices):
+        for timestamp, high, low, close in zip(prices.index, prices['high'], prices['low'], prices['close']):
+            self.push(timestamp, high, low, close)
+        return self.last
+
+    def push(self, timestamp, high, low, close):
+        """
+        Adds one closed candle.
+        :return: dict with the same columns as calculate_indicator, or None while warming up
+        """
+        self.ewm_num = self.ewm_num * self.decay + close
+        self.ewm_den = self.ewm_den * self.decay + 1.0
+        ma = self.ewm_num / self.ewm_den
+        diff = close - ma
+
+        self.yang_sq.push(diff * diff if diff > 0 else 0.0)
+        self.ying_sq.push(diff * diff if diff <= 0 else 0.0)
+        self.timestamp = timestamp
+        if not self.yang_sq.full():
+            self.last = None
+            return None
+
+        yangvol = math.sqrt(max(self.yang_sq.mean(), 0.0))
+        yingvol = math.sqrt(max(self.ying_sq.mean(), 0.0))
+        totalvol = math.sqrt(yangvol**2 + yingvol**2)
+        epsilon = 1e-10
+        YYL = ((yangvol - yingvol) / (totalvol + epsilon)) * 100
+        self.yyl.push(YYL)
+        if not self.yyl.full():
+            self.last = None
+            return None
+
+        upper_band = ma + self.multiplier * yangvol
+        lower_band = ma - self.multiplier * yingvol
+        self.last = {
+            'high': high,
+            'low': low,
+            'close': close,
+            'ma': ma,
+            'YYL': YYL,
+            'YYL_slow': self.yyl.mean(),
+            'upper_band': upper_band,
+            'lower_band': lower_band,
+            'pan_river_up': (ma + upper_band) / 2,
+            'pan_river_down': (ma + lower_band) / 2,
+        }
+        return self.last
+
+    def on_candle(self, interval, candle):
+        """CandleAggregator subscriber: pushes each closed candle of the subscribed timeframe."""
+        timestamp = pd.Timestamp(candle['start'] + KST_OFFSET, unit='s')
+        return self.push(timestamp, candle['high'], candle['low'], candle['close'])
+
+    def to_frame(self):
+        """Returns the latest row as a one-row frame shaped like calculate_indicator's output."""
+        if self.last is None:
+            return pd.DataFrame(columns=self.columns)
+        return pd.DataFrame([self.last], index=[self.timestamp], columns=self.columns)
@@ -0,0 +1,139 @@
+# kelly_sizer.py
+import math
+import numpy as np
+
+
+class KellySizer:
+    def __init__(self, paths=10_000, horizon=100, kelly_scale=0.5, max_drawdown=0.2, confidence=0.95,
+                 max_fraction=1.0, min_fraction=0.0, min_trades=20, lookback=200, seed=None, fee=0.0005):
+        """
+        Position size from the realized trade history: win rate and average win/loss are estimated
+        from the per-trade returns, the growth-optimal (Kelly) fraction is scaled down to fractional
+        Kelly, and a Monte Carlo of `paths` equity paths over the next `horizon` trades caps it so the
+        maximum drawdown stays below max_drawdown with the given confidence.
+        :param paths: simulated equity paths per estimate (one NumPy batch)
+        :param horizon: trades simulated per path
+        :param kelly_scale: share of the full Kelly fraction to use (0.5 = half Kelly)
+        :param max_drawdown: largest tolerated peak-to-trough equity loss over the horizon (0.2 = 20%)
+        :param confidence: share of simulated paths that must stay within max_drawdown
+        :param max_fraction: upper bound of the invested fraction (1.0 = no leverage)
+        :param min_fraction: lower bound; above 0 the bot keeps trading (and learning) with a negative edge
+        :param min_trades: closed trades needed before the history is trusted
+        :param lookback: most recent trades used for the estimate
+        :param seed: random seed; None draws new paths for every new history
+        :param fee: exchange fee rate charged on top of a buy (Upbit KRW market: 0.05%); the fraction is
+                    capped at 1 / (1 + fee) so that a buy of fraction * balance still pays its fee
+        """
+        self.paths = paths
+        self.horizon = horizon
+        self.kelly_scale = kelly_scale
+        self.max_drawdown = max_drawdown
+        self.confidence = confidence
+        self.max_fraction = max_fraction
+        self.min_fraction = min_fraction
+        self.min_trades = min_trades
+        self.lookback = lookback
+        self.seed = seed
+        self.fee = fee
+        # the simulation only reruns when the trade history changed
+        self._key = None
+        self._result = None
+
+    @staticmethod
+    def estimate(returns):
+        """
+        :param returns: realized returns per closed trade, as a fraction of the amount invested
+        :return: (win_rate, avg_win, avg_loss) with avg_loss as a positive number
+        """
+        returns = np.asarray(returns, dtype=np.float64)
+        wins = returns[returns > 0]
+        losses = returns[returns <= 0]
+        win_rate = len(wins) / len(returns) if len(returns) else 0.0
+        avg_win = float(wins.mean()) if len(wins) else 0.0
+        avg_loss = float(-losses.mean()) if len(losses) else 0.0
+        return win_rate, avg_win, avg_loss
+
+    @staticmethod
+    def kelly(win_rate, avg_win, avg_loss):
+        """
+        Fraction of equity maximizing the expected log growth when a trade returns +avg_win with
+        probability win_rate and -avg_loss otherwise: p / loss - (1 - p) / win.
+        :return: the fraction (inf without losses, 0 or negative without an edge)
+        """
+        if avg_win <= 0 or win_rate <= 0:
+            return 0.0
+        if avg_loss <= 0:
+            return math.inf
+        return win_rate / avg_loss - (1 - win_rate) / avg_win
+
+    def simulate(self, win_rate, avg_win, avg_loss, fraction, paths=None, horizon=None, seed=None):
+        """
+        Maximum drawdown of simulated equity paths investing `fraction` of equity in every trade.
+        Runs the drawdown recursion d = max(0, d - log step) one trade at a time across all paths
+        at once, so memory stays at a few arrays of `paths` floats whatever the horizon.
+        :return: float32 array of the maximum log drawdown per path (1 - exp(-d) is the equity loss)
+        """
+        paths = paths or self.paths
+        horizon = horizon or self.horizon
+        # log equity change of a win and of a loss
+        gain = np.float32(math.log1p(fraction * avg_win))
+        loss = np.float32(-math.log1p(-min(fraction * avg_loss, 1 - 1e-9)))
+        # a trade wins when a 16-bit uniform draw falls below the threshold
+        threshold = np.uint16(min(round(win_rate * 65536), 65535))
+        generator = np.random.SFC64(self.seed if seed is None else seed)
+        drawdown = np.zeros(paths, dtype=np.float32)
+        worst = np.zeros(paths, dtype=np.float32)
+        won = np.empty(paths, dtype=bool)
+        step = np.empty(paths, dtype=np.float32)
+        draws = (paths + 3) // 4
+        for _ in range(horizon):
+            np.less(generator.random_raw(draws).view(np.uint16)[:paths], threshold, out=won)
+            # +loss on every path, -(gain + loss) where the trade won
+            np.multiply(won, -(gain + loss), out=step)
+            step += loss
+            drawdown += step
+            np.maximum(drawdown, 0, out=drawdown)
+            np.maximum(worst, drawdown, out=worst)
+        return worst
+
+    def size(self, returns):
+        """
+        :param returns: realized returns per closed trade (oldest first), e.g. PositionLedger.trade_returns()
+        :return: dict with fraction (the size to use), kelly (full Kelly), win_rate, avg_win, avg_loss,
+                 payoff, trades, drawdown (equity loss at the confidence quantile) and breach_probability
+                 (share of paths losing more than max_drawdown), or None when there are fewer than
+                 min_trades returns
+        """
+        returns = np.asarray(returns, dtype=np.float64)[-self.lookback:]
+        if len(returns) < self.min_trades:
+            return None
+        key = returns.tobytes()
+        if key == self._key:
+            return self._result
+
+        win_rate, avg_win, avg_loss = self.estimate(returns)
+        kelly = self.kelly(win_rate, avg_win, avg_loss)
+        cap = min(self.max_fraction, 1 / (1 + self.fee))
+        fraction = min(self.kelly_scale * kelly, cap)
+        drawdown = breach = 0.0
+        if fraction > 0 and avg_loss > 0:
+            # the log drawdown scales with the log loss per trade: one batch at the candidate fraction,
+            # rescaled to the fraction whose confidence quantile hits max_drawdown. Smaller fractions
+            # have a slightly better win/loss ratio, so the rescaled cap errs on the safe side.
+            seed = self.seed if self.seed is not None else np.random.SeedSequence().entropy
+            worst = self.simulate(win_rate, avg_win, avg_loss, fraction, seed=seed)
+            unit = worst / np.float32(-math.log1p(-fraction * avg_loss))
+            quantile = float(np.quantile(unit, self.confidence))
+            limit = -math.log1p(-self.max_drawdown)
+            if quantile > 0:
+                fraction = min(fraction, -math.expm1(-limit / quantile) / avg_loss)
+            scale = -math.log1p(-fraction * avg_loss)
+            drawdown = -math.expm1(-quantile * scale)
+            breach = float(np.count_nonzero(unit * scale > limit)) / len(unit)
+        fraction = min(max(self.min_fraction, fraction) if kelly > 0 else self.min_fraction, cap)
+
+        self._key = key
+        self._result = {'fraction': fraction, 'kelly': kelly, 'win_rate': win_rate, 'avg_win': avg_win,
+                        'avg_loss': avg_loss, 'payoff': avg_win / avg_loss if avg_loss else math.inf,
+                        'trades': len(returns), 'drawdown': drawdown, 'breach_probability': breach}
+        return self._result
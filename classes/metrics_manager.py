@@ -0,0 +1,183 @@
+# metrics_manager.py
+import os
+import sys
+import json
+import math
+import time
+import threading
+import datetime
+from collections import Counter
+from contextlib import contextmanager
+import numpy as np
+
+
+class Histogram:
+    # log-spaced buckets: 20 per decade from 1 microsecond to 1000 seconds
+    buckets_per_decade = 20
+    min_exponent = -3
+    n_buckets = (6 - min_exponent) * buckets_per_decade + 1
+
+    def __init__(self):
+        self.counts = np.zeros(self.n_buckets, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, ms):
+        if ms > 0:
+            bucket = int((math.log10(ms) - self.min_exponent) * self.buckets_per_decade) + 1
+            bucket = min(max(bucket, 0), self.n_buckets - 1)
+        else:
+            bucket = 0
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, q):
+        """Upper edge (ms) of the bucket holding the q-th percentile; accurate to about 12%."""
+        if self.count == 0:
+            return None
+        rank = math.ceil(q / 100 * self.count)
+        bucket = int(np.searchsorted(np.cumsum(self.counts), max(rank, 1)))
+        upper = 10 ** (self.min_exponent + bucket / self.buckets_per_decade)
+        return min(upper, self.max)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else None,
+            'p50_ms': self.percentile(50),
+            'p90_ms': self.percentile(90),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max,
+        }
+
+
+class SamplingProfiler:
+    def __init__(self, thread_id=None, interval=0.005):
+        """
+        Samples the stack of one thread from a background thread at a fixed interval.
+        Unlike cProfile it adds no per-call overhead to the sampled thread.
+        """
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.samples = Counter()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        return self.samples
+
+    def _run(self):
+        while self.running:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def write(self, path):
+        """Writes the samples in collapsed-stack format (flamegraph.pl / speedscope)."""
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class MetricsManager:
+    def __init__(self, path=os.path.join("logs", "metrics.jsonl"), dump_interval=300,
+                 profile_dir=None, slow_cycle_ms=None, sample_interval=0.005):
+        """
+        Hot-path timing spans with in-memory percentile histograms.
+        :param path: JSON lines file the per-interval summaries are appended to
+        :param dump_interval: seconds between dumps (checked at the end of every cycle)
+        :param profile_dir: directory for slow-cycle profiles; profiling is off when None
+        :param slow_cycle_ms: cycles slower than this keep their sampled profile
+        :param sample_interval: seconds between profiler samples
+        """
+        self.path = path
+        self.dump_interval = dump_interval
+        self.profile_dir = profile_dir
+        self.slow_cycle_ms = slow_cycle_ms
+        self.sample_interval = sample_interval
+        self.histograms = {}
+        self.totals = {}
+        self.last_dump = time.monotonic()
+        self.lock = threading.Lock()
+
+    def record(self, name, ms):
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+                self.totals.setdefault(name, Histogram())
+            self.histograms[name].record(ms)
+            self.totals[name].record(ms)
+
+    @contextmanager
+    def span(self, name):
+        """Times the enclosed block and records it under `name` in milliseconds."""
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter_ns() - started) / 1e6)
+
+    @contextmanager
+    def cycle(self, name='cycle'):
+        """
+        Times a whole decision cycle. With profiling enabled the cycle is sampled and the
+        profile is written to profile_dir when it took longer than slow_cycle_ms.
+        """
+        profiler = None
+        if self.profile_dir is not None and self.slow_cycle_ms is not None:
+            profiler = SamplingProfiler(interval=self.sample_interval)
+            profiler.start()
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter_ns() - started) / 1e6
+            self.record(name, elapsed)
+            if profiler is not None:
+                profiler.stop()
+                if elapsed > self.slow_cycle_ms:
+                    os.makedirs(self.profile_dir, exist_ok=True)
+                    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                    profiler.write(os.path.join(self.profile_dir, f"{name}_{stamp}_{elapsed:.0f}ms.folded"))
+            self.maybe_dump()
+
+    def summary(self, cumulative=False):
+        with self.lock:
+            source = self.totals if cumulative else self.histograms
+            return {name: histogram.summary() for name, histogram in source.items()}
+
+    def maybe_dump(self):
+        if time.monotonic() - self.last_dump >= self.dump_interval:
+            self.dump()
+
+    def dump(self):
+        """Appends the spans recorded since the previous dump as one JSON line and starts a new interval."""
+        record = {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'), 'spans': self.summary()}
+        with self.lock:
+            self.histograms = {}
+        self.last_dump = time.monotonic()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+        return record
@@ -1,224 +1,323 @@
-# notion_manager.py
-import os
-import logging
-from notion_client import Client
-from datetime import datetime
-import pandas as pd
-
-class NotionManager:
-    def __init__(self):
-        
-        self.notion = Client(auth=os.getenv("NOTION_API_KEY"))
-        self.account_balance_db = os.getenv("NOTION_ACCOUNT_BALANCE_DB_ID")
-        self.coin_balance_db = os.getenv("NOTION_COIN_BALANCE_DB_ID")
-        self.trade_log_db = os.getenv("NOTION_TRADE_LOG_DB_ID")
-        self.position_log_db = os.getenv("NOTION_POSITION_LOG_DB_ID")
-        
-    def record_account_balance(self, krw_balance, symbol, coin_balance, current_price):
-        
-        #KRW balance fetch
-        response = self.notion.pages.create(
-            parent={"database_id": self.account_balance_db},
-            properties={
-                "Timestamp": {
-                    "title": [
-                        {
-                            "text": {
-                                "content": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            }
-                        }
-                    ]
-                },
-                "KRW Balance": {
-                    "number": krw_balance
-                }
-               
-            }
-        )
-        balance_page_id = response['id']
-         
-    # Record coin balance
-        self.notion.pages.create(
-            parent={"database_id": self.coin_balance_db},
-            properties={
-                "Coin Symbol": {
-                    "title": [
-                        {
-                            "text": {
-                                "content": symbol
-                            }
-                        }
-                    ]
-                },
-                "Balance": {
-                    "number": coin_balance
-                },
-                "Current Price": {
-                    "number": current_price
-                },
-                "Related Balance Record": {
-                    "relation": [{"id": balance_page_id}]
-                }
-            }
-        )
-
-    def create_trade_log(self, trade_data):
-        if isinstance(trade_data, pd.DataFrame):
-            trade_data = trade_data.to_dict('records')[0]
-
-        timestamp = trade_data.get('timestamp', datetime.now())
-        if not isinstance(timestamp, datetime):
-            timestamp = pd.to_datetime(timestamp)
-
-        properties = {
-            "Trade ID": {
-                "title": [{"text": {"content": trade_data.get('trade_id', '')}}]
-            },
-            "Type": {
-                "select": {"name": trade_data.get('type', 'Unknown')}
-            },
-            "Timestamp": {
-                "date": {"start": timestamp.isoformat()}
-            },
-            "Symbol": {
-                "rich_text": [{"text": {"content": trade_data.get('symbol', 'Unknown')}}]
-            },
-            "Price": {
-                "number": trade_data.get('price', 0)
-            },
-            "YYL":{
-                "number": trade_data.get('yyl', 0)
-            },
-            "YYL Slow": {
-                "number": trade_data.get('yyl_slow',0)        
-            },
-            "Quantity": {
-                "number": trade_data.get('quantity', 0)
-            },
-            "Total Amount": {
-                "number": trade_data.get('total_value', 0)
-            },
-            "Fee": {
-                "number": trade_data.get('fee', 0)
-            },
-            "Status": {
-                "select": {"name": trade_data.get('status', 'Unknown')}
-            },
-            "Stop Loss":{
-                "number": trade_data.get('stop_loss', 0)    
-            },
-            "Take Profit":{
-                "number": trade_data.get('take_profit', 0)
-            },
-            "Strategy": {
-                "select": {"name": trade_data.get('strategy', 'Unknown')}
-            },
-            "Notes": {
-                "rich_text": [{"text": {"content": trade_data.get('notes', '')}}]
-            }
-        }
-
-        # Add optional fields if they exist in trade_data
-        if 'related_trade_id' in trade_data:
-            properties["Related Trade ID"] = {
-                "relation": [{"id": trade_data['related_trade_id']}]
-            }
-
-        if 'profit_loss' in trade_data:
-            properties["Profit/Loss"] = {
-                "number": trade_data['profit_loss']
-            }
-
-        self.notion.pages.create(
-            parent={"database_id": self.trade_log_db},
-            properties=properties
-        )
-
-
-    def create_position_log(self, position_data):
-        if isinstance(position_data, pd.DataFrame):
-            position_data = position_data.to_dict('records')[0]
-
-        timestamp = position_data.get('timestamp', datetime.now())
-        if not isinstance(timestamp, datetime):
-            timestamp = pd.to_datetime(timestamp)
-
-        properties = {
-            "Position ID": {
-                "title": [{"text": {"content": position_data.get('position_id', '')}}]
-            },
-            "Symbol": {
-                "rich_text": [{"text": {"content": position_data.get('symbol', 'Unknown')}}]
-            },
-             "Type": {
-                "select": {"name": position_data.get('status', 'Unknown')}
-            },
-            "Entry Price": {
-                "number": position_data.get('entry_price', 0)
-            },
-            "Initial Quantity": {
-                "number": position_data.get('initial_quantity', 0)
-            },
-            "Current Quantity": {
-                "number": position_data.get('current_quantity', 0)        
-            },
-            "Realized P/L": {
-                "number": position_data.get('realized_pl', 0)
-            },
-            "Status": {
-                "select": {"name": position_data.get('status', 'Unknown')}
-            },
-            "Timestamp": {
-                "date": {"start": timestamp.isoformat()}
-            },
-              "Related Trade ID": {
-                    "relation": {"id": position_data['related_trade_id']}
-        }}
-
-        # Add optional fields if they exist in position_data
-        if 'related_trade_id' in position_data:
-            properties["Related Trade ID"] = {
-                "relation": [{"id": position_data['related_trade_id']}]
-            }
-
-        if 'unrealized_pl' in position_data:
-            properties["Unrealized P/L"] = {
-                "number": position_data['unrealized_pl']
-            }
-
-        self.notion.pages.create(
-            parent={"database_id": self.position_log_db},
-            properties=properties
-        )
-
-    def read_position_data(self, symbol):
-        """
-        Read the current balance for the given symbol from the Notion database.
-        
-        :param symbol: The symbol of the coin (e.g., 'KRW-BTC')
-        :return: The current balance of the specified coin
-        """
-        query = {
-            "database_id": self.coin_balance_db,
-            "filter": {
-                "property": "Coin Symbol",
-                "title": {
-                    "equals": symbol
-                }
-            },
-            "sorts": [
-                {
-                    "property": "Related Balance Record",
-                    "direction": "descending"
-                }
-            ],
-            "page_size": 1
-        }
-
-        response = self.notion.databases.query(**query)
-
-        if response['results']:
-            latest_record = response['results'][0]
-            return latest_record['properties']['Balance']['number']
-        else:
-            return 0  # Return 0 if no record found for the symbol
+# notion_manager.py
+import os
+import logging
+import httpx
+import numpy as np
+from notion_client import Client
+from notion_client.errors import RequestTimeoutError, HTTPResponseError
+from datetime import datetime
+import pandas as pd
+from classes.outbox_manager import OutboxManager, RetryableError
+from classes.rate_limiter import RateLimiter
+from classes.signal_record import TradeRecord
+
+class NotionManager:
+    def __init__(self, outbox_path=None, requests_per_second=3):
+        """
+        :param outbox_path: SQLite outbox file. When set, every journal call only queues the record
+                            and a background worker writes it to Notion, so the trading loop never
+                            waits on the Notion API. Records survive restarts until delivered.
+        :param requests_per_second: Notion's documented average rate limit
+        """
+        self.notion = Client(auth=os.getenv("NOTION_API_KEY"))
+        self.account_balance_db = os.getenv("NOTION_ACCOUNT_BALANCE_DB_ID")
+        self.coin_balance_db = os.getenv("NOTION_COIN_BALANCE_DB_ID")
+        self.trade_log_db = os.getenv("NOTION_TRADE_LOG_DB_ID")
+        self.position_log_db = os.getenv("NOTION_POSITION_LOG_DB_ID")
+        self.rate_limiter = RateLimiter(requests_per_second)
+
+        self.outbox = None
+        if outbox_path is not None:
+            self.outbox = OutboxManager(outbox_path, self._deliver)
+            self.outbox.start()
+
+    def close(self, timeout=10):
+        """Flushes queued records for up to `timeout` seconds. Anything left is sent on the next start."""
+        if self.outbox is not None:
+            return self.outbox.close(timeout)
+        return True
+
+    def _create_page(self, **kwargs):
+        self.rate_limiter.acquire()
+        try:
+            return self.notion.pages.create(**kwargs)
+        except HTTPResponseError as x:
+            # APIResponseError for Notion's JSON errors, UnknownHTTPResponseError for a gateway's non-JSON 502/503/504
+            if x.status == 429 or x.status >= 500:
+                retry_after = float((getattr(x, 'headers', None) or {}).get('retry-after', 0))
+                if retry_after:
+                    self.rate_limiter.penalize(retry_after)
+                raise RetryableError(f"Notion API {x.status}: {x}", retry_after=retry_after)
+            raise
+        except (RequestTimeoutError, httpx.TransportError) as x:
+            raise RetryableError(f"{x.__class__.__name__}: {x}")
+
+    @staticmethod
+    def _write_now(write, *args):
+        # without an outbox there is no later attempt: a temporary failure is logged, not raised into the bot loop
+        try:
+            write(*args)
+        except RetryableError as x:
+            print(f"Notion write failed ({x}); the record was not saved. Set outbox_path to retry failed writes.")
+
+    def _deliver(self, kind, payload, progress, save_progress):
+        if kind == 'account_balance':
+            self._write_account_balance(payload, progress, save_progress)
+        elif kind == 'trade_log':
+            self._write_trade_log(payload)
+        elif kind == 'position_log':
+            self._write_position_log(payload)
+        else:
+            raise ValueError(f"Unknown outbox record kind: {kind}")
+
+    def record_account_balance(self, krw_balance, symbol, coin_balance, current_price):
+        payload = {
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'krw_balance': krw_balance,
+            'symbol': symbol,
+            'coin_balance': coin_balance,
+            'current_price': current_price,
+        }
+        if self.outbox is not None:
+            self.outbox.enqueue('account_balance', _plain(payload))
+        else:
+            self._write_now(self._write_account_balance, payload, {}, lambda: None)
+
+    def _write_account_balance(self, payload, progress, save_progress):
+        # the coin page relates to the balance page, so the balance page is created first
+        # and its id is kept in progress to avoid creating it twice on a retry
+        if 'balance_page_id' not in progress:
+            progress['balance_page_id'] = self._create_balance_page(payload)
+            save_progress()
+        self._create_coin_page(payload, progress['balance_page_id'])
+
+    def _create_balance_page(self, payload):
+        #KRW balance fetch
+        response = self._create_page(
+            parent={"database_id": self.account_balance_db},
+            properties={
+                "Timestamp": {
+                    "title": [
+                        {
+                            "text": {
+                                "content": payload['timestamp']
+                            }
+                        }
+                    ]
+                },
+                "KRW Balance": {
+                    "number": payload['krw_balance']
+                }
+               
+            }
+        )
+        return response['id']
+
+    def _create_coin_page(self, payload, balance_page_id):
+        # Record coin balance
+        self._create_page(
+            parent={"database_id": self.coin_balance_db},
+            properties={
+                "Coin Symbol": {
+                    "title": [
+                        {
+                            "text": {
+                                "content": payload['symbol']
+                            }
+                        }
+                    ]
+                },
+                "Balance": {
+                    "number": payload['coin_balance']
+                },
+                "Current Price": {
+                    "number": payload['current_price']
+                },
+                "Related Balance Record": {
+                    "relation": [{"id": balance_page_id}]
+                }
+            }
+        )
+
+    def create_trade_log(self, trade_data):
+        if isinstance(trade_data, TradeRecord):
+            trade_data = trade_data.to_dict()
+        elif isinstance(trade_data, pd.DataFrame):
+            trade_data = trade_data.to_dict('records')[0]
+        if self.outbox is not None:
+            self.outbox.enqueue('trade_log', _plain(trade_data))
+        else:
+            self._write_now(self._write_trade_log, trade_data)
+
+    def _write_trade_log(self, trade_data):
+        timestamp = trade_data.get('timestamp', datetime.now())
+        if not isinstance(timestamp, datetime):
+            timestamp = pd.to_datetime(timestamp)
+
+        properties = {
+            "Trade ID": {
+                "title": [{"text": {"content": trade_data.get('trade_id', '')}}]
+            },
+            "Type": {
+                "select": {"name": trade_data.get('type', 'Unknown')}
+            },
+            "Timestamp": {
+                "date": {"start": timestamp.isoformat()}
+            },
+            "Symbol": {
+                "rich_text": [{"text": {"content": trade_data.get('symbol', 'Unknown')}}]
+            },
+            "Price": {
+                "number": trade_data.get('price', 0)
+            },
+            "YYL":{
+                "number": trade_data.get('yyl', 0)
+            },
+            "YYL Slow": {
+                "number": trade_data.get('yyl_slow',0)        
+            },
+            "Quantity": {
+                "number": trade_data.get('quantity', 0)
+            },
+            "Total Amount": {
+                "number": trade_data.get('total_value', 0)
+            },
+            "Fee": {
+                "number": trade_data.get('fee', 0)
+            },
+            "Status": {
+                "select": {"name": trade_data.get('status', 'Unknown')}
+            },
+            "Stop Loss":{
+                "number": trade_data.get('stop_loss', 0)    
+            },
+            "Take Profit":{
+                "number": trade_data.get('take_profit', 0)
+            },
+            "Strategy": {
+                "select": {"name": trade_data.get('strategy', 'Unknown')}
+            },
+            "Notes": {
+                "rich_text": [{"text": {"content": trade_data.get('notes', '')}}]
+            }
+        }
+
+        # Add optional fields if they exist in trade_data
+        if 'related_trade_id' in trade_data:
+            properties["Related Trade ID"] = {
+                "relation": [{"id": trade_data['related_trade_id']}]
+            }
+
+        if 'profit_loss' in trade_data:
+            properties["Profit/Loss"] = {
+                "number": trade_data['profit_loss']
+            }
+
+        self._create_page(
+            parent={"database_id": self.trade_log_db},
+            properties=properties
+        )
+
+
+    def create_position_log(self, position_data):
+        if isinstance(position_data, pd.DataFrame):
+            position_data = position_data.to_dict('records')[0]
+        if self.outbox is not None:
+            self.outbox.enqueue('position_log', _plain(position_data))
+        else:
+            self._write_now(self._write_position_log, position_data)
+
+    def _write_position_log(self, position_data):
+        timestamp = position_data.get('timestamp', datetime.now())
+        if not isinstance(timestamp, datetime):
+            timestamp = pd.to_datetime(timestamp)
+
+        properties = {
+            "Position ID": {
+                "title": [{"text": {"content": position_data.get('position_id', '')}}]
+            },
+            "Symbol": {
+                "rich_text": [{"text": {"content": position_data.get('symbol', 'Unknown')}}]
+            },
+             "Type": {
+                "select": {"name": position_data.get('status', 'Unknown')}
+            },
+            "Entry Price": {
+                "number": position_data.get('entry_price', 0)
+            },
+            "Initial Quantity": {
+                "number": position_data.get('initial_quantity', 0)
+            },
+            "Current Quantity": {
+                "number": position_data.get('current_quantity', 0)        
+            },
+            "Realized P/L": {
+                "number": position_data.get('realized_pl', 0)
+            },
+            "Status": {
+                "select": {"name": position_data.get('status', 'Unknown')}
+            },
+            "Timestamp": {
+                "date": {"start": timestamp.isoformat()}
+            }
+        }
+
+        # Add optional fields if they exist in position_data
+        if 'related_trade_id' in position_data:
+            properties["Related Trade ID"] = {
+                "relation": [{"id": position_data['related_trade_id']}]
+            }
+
+        if 'unrealized_pl' in position_data:
+            properties["Unrealized P/L"] = {
+                "number": position_data['unrealized_pl']
+            }
+
+        self._create_page(
+            parent={"database_id": self.position_log_db},
+            properties=properties
+        )
+
+    def read_position_data(self, symbol):
+        """
+        Read the current balance for the given symbol from the Notion database.
+        
+        :param symbol: The symbol of the coin (e.g., 'KRW-BTC')
+        :return: The current balance of the specified coin
+        """
+        query = {
+            "database_id": self.coin_balance_db,
+            "filter": {
+                "property": "Coin Symbol",
+                "title": {
+                    "equals": symbol
+                }
+            },
+            "sorts": [
+                {
+                    "property": "Related Balance Record",
+                    "direction": "descending"
+                }
+            ],
+            "page_size": 1
+        }
+
+        response = self.notion.databases.query(**query)
+
+        if response['results']:
+            latest_record = response['results'][0]
+            return latest_record['properties']['Balance']['number']
+        else:
+            return 0  # Return 0 if no record found for the symbol
+
+
+def _plain(record):
+    """Converts numpy scalars and timestamps so a record can be stored as JSON."""
+    plain = {}
+    for key, value in record.items():
+        if isinstance(value, (datetime, pd.Timestamp)):
+            value = value.isoformat()
+        elif isinstance(value, np.generic):
+            value = value.item()
+        plain[key] = value
+    return plain
@@ -0,0 +1,174 @@
+# optimizer_manager.py
+import os
+import json
+import random
+import itertools
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from classes.indicator_manager import IndicatorManager
+from classes.strategy_manager import StrategyManager
+
+# search space around the values currently hard-coded in main.py
+DEFAULT_SPACE = {
+    'window': [10, 14, 20, 30, 40],
+    'span': [5, 10, 15, 20],
+    'multiplier': [2],
+    'sl_multiplier': [1, 1.5, 2, 3],
+    'tp_multiplier': [2, 3, 4, 5],
+    'yyl_threshold': [50, 60, 75, 90],
+    'atr_period': [7, 14, 21],
+}
+
+# per-worker state, filled in by _init_worker
+_worker = {}
+
+
+class OptimizerManager:
+    def __init__(self, prices, results_path=os.path.join("logs", "optimizer_results.jsonl"),
+                 processes=None, metric='sharpe', backtest_kwargs=None):
+        """
+        Grid/random search over indicator and strategy parameters.
+        :param prices: OHLCV frame with high/low/close columns (e.g. a year of minute30 candles)
+        :param results_path: JSON lines file results are streamed to; rerunning skips finished combinations
+        :param processes: number of worker processes (defaults to os.cpu_count())
+        :param metric: stats column used to rank the results
+        :param backtest_kwargs: extra arguments for StrategyManager.backtest (fee, max_loss_pct, ...)
+        """
+        self.prices = prices
+        self.results_path = results_path
+        self.processes = processes or os.cpu_count()
+        self.metric = metric
+        self.backtest_kwargs = backtest_kwargs or {}
+
+    def grid(self, space=None):
+        """Every combination of the space. Indicator parameters vary slowest so workers can reuse indicators."""
+        space = space or DEFAULT_SPACE
+        keys = list(space)
+        return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+    def sample(self, n, space=None, seed=None):
+        """n distinct random combinations of the space."""
+        combos = self.grid(space)
+        rng = random.Random(seed)
+        picked = rng.sample(combos, min(n, len(combos)))
+        return sorted(picked, key=lambda p: (p['window'], p['span'], p['multiplier']))
+
+    def run(self, params_list, chunksize=None):
+        """
+        Backtests every parameter set on a process pool.
+        Prices are placed in shared memory once; workers attach to it instead of
+        receiving a pickled DataFrame per job. Each result is appended to results_path
+        as soon as it arrives, so an interrupted sweep resumes where it stopped.
+        :return: ranked results table (see results())
+        """
+        done = self._finished_keys()
+        todo = [p for p in params_list if _key(p) not in done]
+        if not todo:
+            return self.results()
+        print(f"Optimizer: {len(todo)} combinations to run ({len(params_list) - len(todo)} already done).")
+
+        columns = np.vstack([self.prices[field].to_numpy(dtype=np.float64) for field in ('high', 'low', 'close')])
+        timestamps = self.prices.index.values.astype('datetime64[ns]').astype(np.int64)
+        shm = shared_memory.SharedMemory(create=True, size=columns.nbytes + timestamps.nbytes)
+        try:
+            np.ndarray(columns.shape, dtype=np.float64, buffer=shm.buf)[:] = columns
+            np.ndarray(timestamps.shape, dtype=np.int64, buffer=shm.buf, offset=columns.nbytes)[:] = timestamps
+
+            if chunksize is None:
+                chunksize = max(1, min(64, len(todo) // (self.processes * 8)))
+            directory = os.path.dirname(self.results_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._trim_partial_line()
+
+            initargs = (shm.name, len(timestamps), self.backtest_kwargs)
+            with mp.Pool(self.processes, initializer=_init_worker, initargs=initargs) as pool, \
+                    open(self.results_path, 'a') as out:
+                for i, result in enumerate(pool.imap_unordered(_run_job, todo, chunksize), 1):
+                    out.write(json.dumps(result) + "\n")
+                    out.flush()
+                    if i % 500 == 0:
+                        print(f"Optimizer: {i}/{len(todo)} done.")
+        finally:
+            shm.close()
+            shm.unlink()
+
+        return self.results()
+
+    def results(self):
+        """All finished combinations as a DataFrame ranked by the metric (best first)."""
+        if not os.path.exists(self.results_path):
+            return pd.DataFrame()
+        table = pd.DataFrame(list(self._read_results()))
+        if self.metric in table:
+            table = table.sort_values(self.metric, ascending=False, na_position='last')
+        return table.reset_index(drop=True)
+
+    def _read_results(self):
+        with open(self.results_path) as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by an interruption
+                if isinstance(row, dict) and 'key' in row:
+                    yield row
+
+    def _finished_keys(self):
+        if not os.path.exists(self.results_path):
+            return set()
+        return {row['key'] for row in self._read_results()}
+
+    def _trim_partial_line(self):
+        """Drops a line cut short by an interruption so the next result starts on a line of its own."""
+        if not os.path.exists(self.results_path):
+            return
+        with open(self.results_path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+
+def _key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def _init_worker(name, n, backtest_kwargs):
+    # pool workers share the parent's resource tracker, so attaching does not take ownership
+    shm = shared_memory.SharedMemory(name=name)
+    columns = np.ndarray((3, n), dtype=np.float64, buffer=shm.buf)
+    timestamps = np.ndarray((n,), dtype=np.int64, buffer=shm.buf, offset=columns.nbytes)
+    _worker['shm'] = shm
+    _worker['prices'] = pd.DataFrame({'high': columns[0], 'low': columns[1], 'close': columns[2]},
+                                     index=pd.DatetimeIndex(timestamps.view('datetime64[ns]')), copy=False)
+    _worker['columns'] = columns
+    _worker['backtest_kwargs'] = backtest_kwargs
+    _worker['indicators'] = {}
+
+
+def _run_job(params):
+    indicator_manager = IndicatorManager(window=params['window'], span=params['span'],
+                                         multiplier=params['multiplier'])
+    strategy_manager = StrategyManager(sl__multiplier=params['sl_multiplier'], tp_multiplier=params['tp_multiplier'],
+                                       yyl_threshold=params['yyl_threshold'], atr_period=params['atr_period'])
+
+    # jobs arrive grouped by indicator parameters, so a small cache avoids recomputing them
+    cache = _worker['indicators']
+    indicator_key = (params['window'], params['span'], params['multiplier'])
+    if indicator_key not in cache:
+        if len(cache) >= 4:
+            cache.pop(next(iter(cache)))
+        high, low, close = _worker['columns']
+        cache[indicator_key] = indicator_manager.calculate_indicator_batch(high, low, close)
+
+    result = {'key': _key(params), **params}
+    try:
+        backtest = strategy_manager.backtest(_worker['prices'], indicator_manager=indicator_manager,
+                                             indicators=cache[indicator_key], **_worker['backtest_kwargs'])
+        result.update({k: float(v) for k, v in backtest['stats'].items()})
+    except Exception as x:
+        result['error'] = f"{x.__class__.__name__}: {x}"
+    return result
@@ -0,0 +1,164 @@
+# outbox_manager.py
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+class RetryableError(Exception):
+    """Raised by an outbox handler when a record should be retried later."""
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class OutboxManager:
+    def __init__(self, path, handler, batch_size=50, max_retries=8, base_delay=1.0, max_delay=300.0):
+        """
+        Durable FIFO outbox in SQLite drained by a background worker thread.
+        enqueue() is a single WAL insert, so callers on the trading thread never wait for the network.
+        Records are delivered strictly in insertion order; a failing record is retried with
+        exponential backoff and blocks the ones behind it until it succeeds or runs out of retries.
+        :param path: SQLite file; undelivered records survive restarts
+        :param handler: function(kind, payload, progress, save_progress) that delivers one record.
+                        progress is a dict persisted through save_progress() so a multi-step record
+                        does not repeat finished steps after a retry or restart.
+        :param batch_size: records read from the outbox per round trip to SQLite
+        :param max_retries: attempts before a record is parked with state 'failed'
+        """
+        self.path = path
+        self.handler = handler
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = self._connect()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                progress TEXT NOT NULL DEFAULT '{}',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                state TEXT NOT NULL DEFAULT 'pending',
+                error TEXT,
+                created REAL NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS outbox_state ON outbox (state, id)")
+        self.lock = threading.Lock()
+
+        self.wakeup = threading.Event()
+        self.idle = threading.Event()
+        self.running = False
+        self.worker = None
+        self.delivered = 0
+        self.failed = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives process crashes; only an OS crash can lose the last commits
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.worker = threading.Thread(target=self._run, name=f"outbox-{os.path.basename(self.path)}", daemon=True)
+        self.worker.start()
+
+    def enqueue(self, kind, payload):
+        """Persists one record and wakes the worker. payload must be JSON serializable."""
+        data = json.dumps(payload, default=str)
+        with self.lock:
+            self.conn.execute("INSERT INTO outbox (kind, payload, created) VALUES (?, ?, ?)",
+                              (kind, data, time.time()))
+        self.wakeup.set()
+
+    def pending(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox WHERE state = 'pending'").fetchone()[0]
+
+    def flush(self, timeout=None):
+        """Waits until every pending record was delivered (or parked). Returns True if drained."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.wakeup.set()
+        while self.pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self.idle.wait(0.05)
+        return True
+
+    def close(self, timeout=10):
+        """Flushes for up to `timeout` seconds and stops the worker. Leftovers are sent after a restart."""
+        drained = self.flush(timeout) if self.running else self.pending() == 0
+        self.running = False
+        self.wakeup.set()
+        if self.worker is not None:
+            self.worker.join(timeout=1)
+        return drained
+
+    def _run(self):
+        conn = self._connect()
+        while self.running:
+            rows = conn.execute(
+                "SELECT id, kind, payload, progress, attempts, next_attempt FROM outbox "
+                "WHERE state = 'pending' ORDER BY id LIMIT ?", (self.batch_size,)).fetchall()
+            if not rows:
+                self.idle.set()
+                self.wakeup.wait()
+                self.wakeup.clear()
+                self.idle.clear()
+                continue
+
+            for record_id, kind, payload, progress, attempts, next_attempt in rows:
+                wait = next_attempt - time.time()
+                if wait > 0:
+                    # head of the queue is backing off; wake early only for close()
+                    self.wakeup.wait(wait)
+                    self.wakeup.clear()
+                    break
+                if not self._deliver(conn, record_id, kind, payload, progress, attempts):
+                    break
+        conn.close()
+
+    def _deliver(self, conn, record_id, kind, payload, progress, attempts):
+        progress = json.loads(progress)
+
+        def save_progress():
+            conn.execute("UPDATE outbox SET progress = ? WHERE id = ?", (json.dumps(progress), record_id))
+
+        try:
+            self.handler(kind, json.loads(payload), progress, save_progress)
+        except RetryableError as x:
+            attempts += 1
+            if attempts >= self.max_retries:
+                self._park(conn, record_id, attempts, x)
+                return True
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+            if x.retry_after:
+                delay = max(delay, x.retry_after)
+            conn.execute("UPDATE outbox SET attempts = ?, next_attempt = ?, error = ? WHERE id = ?",
+                         (attempts, time.time() + delay, str(x), record_id))
+            print(f"Outbox: {kind} #{record_id} failed ({x}), retry {attempts} in {delay:.1f}s.")
+            return False
+        except Exception as x:
+            self._park(conn, record_id, attempts + 1, x)
+            return True
+
+        conn.execute("DELETE FROM outbox WHERE id = ?", (record_id,))
+        self.delivered += 1
+        return True
+
+    def _park(self, conn, record_id, attempts, error):
+        conn.execute("UPDATE outbox SET state = 'failed', attempts = ?, error = ? WHERE id = ?",
+                     (attempts, f"{error.__class__.__name__}: {error}", record_id))
+        self.failed += 1
+        print(f"Outbox: record #{record_id} parked as failed ({error}).")
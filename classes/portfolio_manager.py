@@ -0,0 +1,111 @@
+# portfolio_manager.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+from classes.rate_limiter import RateLimiter
+
+
+class PortfolioManager:
+    def __init__(self, data_manager, indicator_manager, strategy_manager, position_manager, tickers,
+                 interval='minute30', count=300, max_loss_pct=0.05, max_workers=16, requests_per_second=8):
+        """
+        Runs the YYL strategy over several tickers per cycle.
+        Candle fetches and signal evaluation run on a thread pool; every worker draws from one
+        shared RateLimiter, and balances/prices come from one account snapshot per cycle.
+        :param tickers: list of markets, e.g. ['KRW-BTC', 'KRW-ETH']
+        :param requests_per_second: exchange request budget shared by all workers
+                                    (Upbit allows 10/s for quotation requests)
+        """
+        self.data_manager = data_manager
+        self.indicator_manager = indicator_manager
+        self.strategy_manager = strategy_manager
+        self.position_manager = position_manager
+        self.tickers = list(tickers)
+        self.interval = interval
+        self.count = count
+        self.max_loss_pct = max_loss_pct
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="portfolio")
+        if data_manager.rate_limiter is None:
+            data_manager.rate_limiter = RateLimiter(requests_per_second)
+        for ticker in self.tickers:
+            position_manager.balances.setdefault(ticker, 0)
+        self.last_cycle = {}
+
+    def _evaluate(self, ticker):
+        # cached: a ticker evaluated again within the candle TTL does not hit the exchange twice
+        prices = self.data_manager.get_candles(ticker, self.interval, self.count)
+        if prices is None or len(prices) < self.count // 2:
+            return None
+        indicators = self.indicator_manager.calculate_fused(prices['high'], prices['low'], prices['close'],
+                                                            self.strategy_manager.atr_period)
+        # signal() keeps no state on the StrategyManager, so workers can share it
+        return self.strategy_manager.signal(indicators, index=prices.index)
+
+    def allocate(self, krw_balance, signals):
+        """
+        Splits the KRW balance equally across the tickers with a long signal and sizes each share
+        with that ticker's own kelly fraction.
+        :param signals: dict ticker -> entry signal ('long', 'short', 'neutral')
+        :return: dict ticker -> KRW amount to invest
+        """
+        longs = [ticker for ticker, entry in signals.items() if entry == 'long']
+        share = krw_balance / len(longs) if longs else 0.0
+        return {ticker: share * self.position_manager.kelly_fraction(ticker) if ticker in longs else 0.0
+                for ticker in signals}
+
+    def run_cycle(self):
+        """
+        Evaluates every ticker and executes the resulting trades.
+        :return: dict ticker -> TradeRecord from PositionManager.execution_trade
+        """
+        started = time.perf_counter()
+        snapshot_future = self.executor.submit(self.data_manager.get_snapshot, self.tickers, candles=False)
+        futures = {ticker: self.executor.submit(self._evaluate, ticker) for ticker in self.tickers}
+
+        evaluations = {}
+        for ticker, future in futures.items():
+            try:
+                result = future.result()
+            except Exception as x:
+                print(f"{ticker}: evaluation failed ({x.__class__.__name__}: {x})")
+                continue
+            if result is not None:
+                evaluations[ticker] = result
+        snapshot = snapshot_future.result()
+        evaluated = time.perf_counter()
+        decided_at = time.time()
+
+        signals = {ticker: signal.entry for ticker, signal in evaluations.items()}
+        allocation = self.allocate(snapshot.krw_balance, signals)
+
+        # orders go out one by one from this thread; PositionManager is not shared across threads
+        trade_logs = {}
+        changed = []
+        for ticker, signal in evaluations.items():
+            current_price = snapshot.current_price(ticker)
+            if current_price is None:
+                continue
+            trade_logs[ticker] = self.position_manager.execution_trade(
+                self.data_manager, signal, None, allocation[ticker],
+                self.position_manager.holding(ticker, snapshot),
+                self.position_manager.max_loss_price(ticker, self.max_loss_pct), ticker=ticker)
+            # position_changed only describes the last execution_trade call, so keep it per ticker
+            if self.position_manager.position_changed:
+                changed.append(ticker)
+
+        self.last_cycle = {
+            'tickers': len(self.tickers),
+            'evaluated': len(evaluations),
+            'evaluation_seconds': evaluated - started,
+            # wall-clock time the signals were known, for the close-to-decision latency
+            'decided_at': decided_at,
+            'cycle_seconds': time.perf_counter() - started,
+            'snapshot': snapshot,
+            'signals': signals,
+            'evaluations': evaluations,
+            # tickers whose ledger position changed with a fill this cycle
+            'changed': changed,
+        }
+        return trade_logs
+
+    def close(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,317 @@
+# position_ledger.py
+import os
+import time
+import sqlite3
+import threading
+import datetime
+import numpy as np
+
+
+class Position:
+    """Open (or closed) holding of one symbol, kept in memory and mirrored to SQLite."""
+    __slots__ = ('symbol', 'quantity', 'entry_price', 'initial_quantity', 'realized_pnl', 'fees',
+                 'stop_loss', 'take_profit', 'opened_at', 'updated_at', 'last_price', 'position_id')
+
+    def __init__(self, symbol, quantity=0.0, entry_price=0.0, initial_quantity=0.0, realized_pnl=0.0, fees=0.0,
+                 stop_loss=None, take_profit=None, opened_at=None, updated_at=None, position_id=None):
+        self.symbol = symbol
+        self.quantity = quantity
+        self.entry_price = entry_price
+        self.initial_quantity = initial_quantity
+        self.realized_pnl = realized_pnl
+        self.fees = fees
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.opened_at = opened_at
+        self.updated_at = updated_at
+        self.last_price = None
+        self.position_id = position_id
+
+    @property
+    def is_open(self):
+        return self.quantity > 0
+
+    def unrealized_pnl(self, price=None):
+        price = price if price is not None else self.last_price
+        if price is None or not self.is_open:
+            return 0.0
+        return (price - self.entry_price) * self.quantity
+
+    def __repr__(self):
+        return (f"Position({self.symbol}, quantity={self.quantity}, entry_price={self.entry_price}, "
+                f"realized_pnl={self.realized_pnl}, stop_loss={self.stop_loss}, take_profit={self.take_profit})")
+
+    def to_log(self):
+        """Record in the shape NotionManager.create_position_log expects."""
+        return {
+            'position_id': self.position_id or '',
+            'symbol': self.symbol,
+            'status': 'open' if self.is_open else 'closed',
+            'entry_price': self.entry_price,
+            'initial_quantity': self.initial_quantity,
+            'current_quantity': self.quantity,
+            'realized_pl': self.realized_pnl,
+            'unrealized_pl': self.unrealized_pnl(),
+            'timestamp': datetime.datetime.fromtimestamp(self.updated_at or time.time()),
+        }
+
+
+class PositionLedger:
+    def __init__(self, path=os.path.join("data", "positions.db")):
+        """
+        Local source of truth for what the bot holds.
+        Every fill is appended to the `fills` table and the resulting position is upserted in the
+        same transaction, so the `positions` table is always consistent with the log. Reads come
+        from an in-memory dict loaded at start-up, so the hot path never waits on disk or network.
+        :param path: SQLite file (WAL); survives crashes and restarts
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS fills (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                trade_id TEXT UNIQUE,
+                symbol TEXT NOT NULL,
+                side TEXT NOT NULL,
+                quantity REAL NOT NULL,
+                price REAL NOT NULL,
+                fee REAL NOT NULL DEFAULT 0,
+                timestamp REAL NOT NULL
+            )""")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS positions (
+                symbol TEXT PRIMARY KEY,
+                position_id TEXT,
+                quantity REAL NOT NULL,
+                entry_price REAL NOT NULL,
+                initial_quantity REAL NOT NULL,
+                realized_pnl REAL NOT NULL,
+                fees REAL NOT NULL,
+                stop_loss REAL,
+                take_profit REAL,
+                opened_at REAL,
+                updated_at REAL,
+                last_fill INTEGER NOT NULL DEFAULT 0
+            )""")
+        self.lock = threading.Lock()
+        self.positions = {}
+        # symbol (None for all) -> per-trade returns, dropped whenever a fill is recorded
+        self._returns = {}
+        self.load()
+
+    def load(self):
+        """Loads the position snapshot and replays any fill the snapshot has not seen yet."""
+        columns = ('symbol', 'position_id', 'quantity', 'entry_price', 'initial_quantity', 'realized_pnl', 'fees',
+                   'stop_loss', 'take_profit', 'opened_at', 'updated_at', 'last_fill')
+        self.positions = {}
+        self._returns = {}
+        last_fills = {}
+        for row in self.conn.execute(f"SELECT {', '.join(columns)} FROM positions"):
+            values = dict(zip(columns, row))
+            last_fills[values['symbol']] = values.pop('last_fill')
+            self.positions[values['symbol']] = Position(**values)
+        rows = self.conn.execute("SELECT id, symbol, side, quantity, price, fee, timestamp FROM fills "
+                                 "ORDER BY id").fetchall()
+        replayed = 0
+        for fill_id, symbol, side, quantity, price, fee, timestamp in rows:
+            if fill_id > last_fills.get(symbol, 0):
+                self._apply(self._position(symbol), side, quantity, price, fee, timestamp, fill_id)
+                self._save(self.positions[symbol], fill_id)
+                replayed += 1
+        if replayed:
+            print(f"Position ledger: replayed {replayed} fills missing from the snapshot.")
+        return self.positions
+
+    def rebuild(self):
+        """Recomputes every position from the fill log alone (stop/target levels are kept)."""
+        levels = {symbol: (p.stop_loss, p.take_profit) for symbol, p in self.positions.items()}
+        with self.lock:
+            self.conn.execute("DELETE FROM positions")
+            self.positions = {}
+        self.load()
+        for symbol, (stop_loss, take_profit) in levels.items():
+            if symbol in self.positions:
+                self.set_levels(symbol, stop_loss, take_profit)
+        return self.positions
+
+    def _position(self, symbol):
+        position = self.positions.get(symbol)
+        if position is None:
+            position = self.positions[symbol] = Position(symbol)
+        return position
+
+    @staticmethod
+    def _apply(position, side, quantity, price, fee, timestamp, fill_id):
+        """Average-cost accounting; fees are charged to realized P&L when paid."""
+        if side == 'bid':
+            if not position.is_open:
+                position.entry_price = 0.0
+                position.initial_quantity = 0.0
+                position.opened_at = timestamp
+                position.position_id = f"psn_{int(timestamp)}_{fill_id}"
+            total = position.quantity + quantity
+            position.entry_price = (position.entry_price * position.quantity + price * quantity) / total
+            position.quantity = total
+            position.initial_quantity += quantity
+        else:
+            quantity = min(quantity, position.quantity)
+            position.realized_pnl += (price - position.entry_price) * quantity
+            position.quantity -= quantity
+            if position.quantity <= position.initial_quantity * 1e-9:
+                position.quantity = 0.0
+                position.stop_loss = None
+                position.take_profit = None
+        position.realized_pnl -= fee
+        position.fees += fee
+        position.updated_at = timestamp
+        position.last_price = price
+
+    def _save(self, position, fill_id):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO positions (symbol, position_id, quantity, entry_price, initial_quantity, "
+            "realized_pnl, fees, stop_loss, take_profit, opened_at, updated_at, last_fill) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (position.symbol, position.position_id, position.quantity, position.entry_price,
+             position.initial_quantity, position.realized_pnl, position.fees, position.stop_loss,
+             position.take_profit, position.opened_at, position.updated_at, fill_id))
+
+    def record_fill(self, symbol, side, quantity, price, fee=0.0, trade_id=None, timestamp=None):
+        """
+        Applies one executed fill. A trade_id that was already recorded is ignored, so a fill
+        reported twice (e.g. after a retry) cannot be counted twice.
+        :param side: 'bid' (buy) or 'ask' (sell)
+        :return: the updated Position
+        """
+        timestamp = timestamp or time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO fills (trade_id, symbol, side, quantity, price, fee, timestamp) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", (trade_id, symbol, side, quantity, price, fee, timestamp))
+                if cursor.rowcount == 0:
+                    self.conn.execute("ROLLBACK")
+                    return self.positions.get(symbol)
+                position = self._position(symbol)
+                self._apply(position, side, quantity, price, fee, timestamp, cursor.lastrowid)
+                self._save(position, cursor.lastrowid)
+                self.conn.execute("COMMIT")
+                self._returns = {}
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                self.load()
+                raise
+        return position
+
+    def set_levels(self, symbol, stop_loss=None, take_profit=None):
+        """Stores the active stop-loss/take-profit of an open position."""
+        position = self.positions.get(symbol)
+        if position is None:
+            return None
+        with self.lock:
+            position.stop_loss = stop_loss
+            position.take_profit = take_profit
+            self.conn.execute("UPDATE positions SET stop_loss = ?, take_profit = ? WHERE symbol = ?",
+                              (stop_loss, take_profit, symbol))
+        return position
+
+    def reconcile(self, symbol, exchange_quantity, price, tolerance=1e-8):
+        """
+        Aligns the ledger with the exchange balance, e.g. at start-up after manual trades.
+        The difference is booked as a fill at `price`. :return: the quantity difference that was booked
+        """
+        held = self.quantity(symbol)
+        difference = exchange_quantity - held
+        if abs(difference) <= tolerance:
+            return 0.0
+        print(f"Position ledger: {symbol} holds {held} but the exchange reports {exchange_quantity}; adjusting.")
+        side = 'bid' if difference > 0 else 'ask'
+        self.record_fill(symbol, side, abs(difference), price, trade_id=f"reconcile_{time.time_ns()}")
+        return difference
+
+    # hot path reads: dictionary lookups only
+
+    def position(self, symbol):
+        return self.positions.get(symbol)
+
+    def quantity(self, symbol):
+        position = self.positions.get(symbol)
+        return position.quantity if position is not None else 0.0
+
+    def mark(self, symbol, price):
+        """Updates the price used for unrealized P&L (memory only)."""
+        position = self.positions.get(symbol)
+        if position is not None:
+            position.last_price = price
+        return position
+
+    def open_positions(self):
+        return [position for position in self.positions.values() if position.is_open]
+
+    def realized_pnl(self, symbol=None):
+        if symbol is not None:
+            position = self.positions.get(symbol)
+            return position.realized_pnl if position is not None else 0.0
+        return sum(position.realized_pnl for position in self.positions.values())
+
+    def unrealized_pnl(self, symbol=None):
+        if symbol is not None:
+            position = self.positions.get(symbol)
+            return position.unrealized_pnl() if position is not None else 0.0
+        return sum(position.unrealized_pnl() for position in self.positions.values())
+
+    def fills(self, symbol=None, limit=100):
+        query = "SELECT trade_id, symbol, side, quantity, price, fee, timestamp FROM fills"
+        params = ()
+        if symbol is not None:
+            query += " WHERE symbol = ?"
+            params = (symbol,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self.lock:
+            return self.conn.execute(query, params + (limit,)).fetchall()
+
+    def trade_returns(self, symbol=None):
+        """
+        Realized return of every sell, as a fraction of the average cost of what was sold, net of the
+        sell fee and of the matching share of the buy fees. Reconciliation fills move holdings but
+        are not trades, so they produce no return.
+        :return: numpy array, oldest first (cached until the next fill)
+        """
+        returns = self._returns.get(symbol)
+        if returns is not None:
+            return returns
+        query = "SELECT trade_id, symbol, side, quantity, price, fee FROM fills"
+        params = ()
+        if symbol is not None:
+            query += " WHERE symbol = ?"
+            params = (symbol,)
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY id", params).fetchall()
+        held = {}
+        returns = []
+        for trade_id, fill_symbol, side, quantity, price, fee in rows:
+            quantity_held, cost, fees = held.get(fill_symbol, (0.0, 0.0, 0.0))
+            if side == 'bid':
+                total = quantity_held + quantity
+                held[fill_symbol] = (total, (cost * quantity_held + price * quantity) / total, fees + fee)
+                continue
+            sold = min(quantity, quantity_held)
+            if sold <= 0:
+                continue
+            buy_fees = fees * sold / quantity_held
+            if not (trade_id or '').startswith('reconcile_') and cost > 0:
+                returns.append(((price - cost) * sold - fee - buy_fees) / (cost * sold))
+            remaining = quantity_held - sold
+            held[fill_symbol] = (remaining, cost, fees - buy_fees) if remaining > quantity_held * 1e-9 else (0.0, 0.0, 0.0)
+        returns = np.array(returns)
+        self._returns[symbol] = returns
+        return returns
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,129 +1,222 @@
-# position_manager.py
-import pandas as pd
-import numpy as np
-import time
-import datetime
-
-
-class PositionManager:
-    def __init__(self, initial_capital=10000000, win_probability=0.6, net_odds=2):
-        self.initial_capital = initial_capital
-        self.win_probability = win_probability
-        self.net_odds = net_odds
-        self.execution_data = None
-        self.balances = {'KRW-BTC': 0}  # Initialize with 0 balance for KRW-BTC
-        self.trade_id=None
-        self.position_data = None
-
-    # 켈리 값을 계산한다.
-    def kelly_fraction(self):
-        """Calculate the investment amount using the Kelly fraction formula."""
-        if self.win_probability <= 0 or self.win_probability >= 1:
-            raise ValueError("Win probability must be between 0 and 1")
-        if self.net_odds <= 0:
-            raise ValueError("Net odds must be greater than 0")
-        
-        kelly = (self.win_probability * (self.net_odds + 1) - 1) / self.net_odds
-        return max(0, kelly)  # Ensure we don't return a negative fraction
-
-    # 초기원화발란스에 켈리값을 적요해서 베팅 금액을 설정한다. 
-    def calculate_position_size(self, capital, kelly_fraction):
-        """Calculate the position size based on the capital and Kelly fraction."""
-        investment = capital * kelly_fraction
-        return investment
-    
-    # def record_position_data(self, trade_id, executed_price,buy_quantity,sell_quantity,type):
-       
-    #     data = []
-
-    #     if type == 'long':
-    #         data.append({
-    #             'position_id':f"psn_{int(time.time())}",  # Replace with actual trade ID
-    #             'type': 'long',  # Replace with actual trade type,
-    #             'symbol': 'KRW-BTC',
-    #             'entry_price': executed_price,  # Reflect actual entry price
-    #             'buy_quantity': buy_quantity,
-    #             'sell_quantity': 0,
-    #             'status': 'open'
-    #         })
-    #     elif type == 'short':
-    #          data.append({
-    #             'position_id':f"psn_{int(time.time())}",  # Replace with actual trade ID
-    #             'type': 'short',  # Replace with actual trade type,
-    #             'symbol': 'KRW-BTC',
-    #             'entry_price':executed_price,  # Reflect actual entry price
-    #             'buy_quantity': 0,
-    #             'sell_quantity': sell_quantity,
-    #             'status': 'close'
-    #         })
-        
-    #     self.position_data = pd.DataFrame(data)
-    #     return self.position_data
-
-    
-    def execution_trade(self, data_manager, entry_data, exit_data, invested_amount, coin_balance, max_loss):
-        current_signal = entry_data.loc[entry_data.index[-1], 'entry']
-        current_price = exit_data.loc[exit_data.index[-1], 'current_price']
-        stop_loss = entry_data.loc[entry_data.index[-1], 'stop_loss']
-        take_profit = entry_data.loc[entry_data.index[-1], 'take_profit']
-        yyl = entry_data.loc[entry_data.index[-1], 'YYL']
-        yyl_slow = entry_data.loc[entry_data.index[-1], 'YYL_slow']
-        invested_amt = invested_amount
-        quantity = invested_amt / current_price
-        loss_threshold = max_loss
-
-        #set trading log ID
-         # Replace with actual trade ID
-        self.trade_id=f"log_{int(time.time())}"
-        
-        if current_signal == 'long':
-            print("Executing buy at market price")
-            data_manager.execute_buy_market_price(invested_amt)
-           # self.record_position_data(self.trade_id,current_price,invested_amt,quantity,coin_balance,current_signal)
-
-        elif current_signal == 'short' or current_price <= stop_loss or current_price >= take_profit or current_price <= loss_threshold:
-            print("Executing sell at market price")
-            if coin_balance > 0:
-                data_manager.execute_sell_market_price(coin_balance)
-            elif coin_balance==0:
-                print("No coin balance to sell.")
-            #self.record_position_data(self.trade_id,current_price,invested_amt,quantity,coin_balance,current_signal)
-
-        else:
-            print("No execution as signal is neutral.")
-
-        data = []
-    
-        data.append({
-            'trade_id':self.trade_id,  # Replace with actual trade ID
-            'type': current_signal,
-            'timestamp': entry_data.index[-1],
-            'symbol': 'KRW-BTC',
-            'price': current_price,
-            'yyl':yyl,
-            'yyl_slow':yyl_slow,
-            'quantity': quantity,
-            'total_value': invested_amt,  # Reflect actual value
-            'fee': 0.0,  # Reflect actual fees
-            'status': 'successful',
-            'stop_loss': stop_loss,
-            'take_profit': take_profit,
-            'strategy': 'YingYangVolatility',
-            'notes': 'Trade execution log.'
-        })
-        self.execution_data = pd.DataFrame(data)
-        return self.execution_data
-
-    def read_positon_data(self, symbol):
-        """Read the current balance for the given symbol."""
-        if symbol in self.balances:
-            return self.balances[symbol]
-        else:
-            raise ValueError(f"No balance information for symbol: {symbol}")
-
-    # You may want to add a method to update balances after trades
-    def update_balance(self, symbol, new_balance):
-        """Update the balance for a given symbol."""
-        self.balances[symbol] = new_balance
-
+# position_manager.py
+import pandas as pd
+import numpy as np
+import time
+import datetime
+from classes.signal_record import Signal, TradeRecord
+from classes.execution_engine import MIN_ORDER_KRW
+
+
+class PositionManager:
+    def __init__(self, initial_capital=10000000, win_probability=0.6, net_odds=2, tickers=('KRW-BTC',),
+                 execution_engine=None, ledger=None, sizer=None):
+        self.initial_capital = initial_capital
+        self.win_probability = win_probability
+        self.net_odds = net_odds
+        self.execution_data = None
+        self.balances = {ticker: 0 for ticker in tickers}  # Initialize with 0 balance for every traded ticker
+        self.trade_id=None
+        self.position_data = None
+        # optional ExecutionEngine: orders are tracked to their fills and the log records what executed
+        self.execution_engine = execution_engine
+        # optional PositionLedger: local source of truth for holdings, entry price and P&L
+        self.ledger = ledger
+        self.position_changed = False
+        # optional KellySizer: sizes from the ledger's realized trades instead of the fixed odds above
+        self.sizer = sizer
+        self.sizing = None
+
+    # 켈리 값을 계산한다.
+    def kelly_fraction(self, symbol=None):
+        """
+        Calculate the investment fraction. With a sizer and a ledger, it comes from the Monte Carlo
+        sizing of the realized trades of `symbol` (all symbols when it has too few, or symbol is None);
+        otherwise, and until there are enough trades, from the fixed Kelly formula.
+        The last sizing result is kept in self.sizing.
+        """
+        if self.sizer is not None and self.ledger is not None:
+            returns = self.ledger.trade_returns(symbol)
+            if symbol is not None and len(returns) < self.sizer.min_trades:
+                returns = self.ledger.trade_returns()
+            self.sizing = self.sizer.size(returns)
+            if self.sizing is not None:
+                return self.sizing['fraction']
+
+        if self.win_probability <= 0 or self.win_probability >= 1:
+            raise ValueError("Win probability must be between 0 and 1")
+        if self.net_odds <= 0:
+            raise ValueError("Net odds must be greater than 0")
+
+        kelly = (self.win_probability * (self.net_odds + 1) - 1) / self.net_odds
+        return max(0, kelly)  # Ensure we don't return a negative fraction
+
+    # 초기원화발란스에 켈리값을 적요해서 베팅 금액을 설정한다. 
+    def calculate_position_size(self, capital, kelly_fraction):
+        """Calculate the position size based on the capital and Kelly fraction."""
+        investment = capital * kelly_fraction
+        return investment
+    
+    # def record_position_data(self, trade_id, executed_price,buy_quantity,sell_quantity,type):
+       
+    #     data = []
+
+    #     if type == 'long':
+    #         data.append({
+    #             'position_id':f"psn_{int(time.time())}",  # Replace with actual trade ID
+    #             'type': 'long',  # Replace with actual trade type,
+    #             'symbol': 'KRW-BTC',
+    #             'entry_price': executed_price,  # Reflect actual entry price
+    #             'buy_quantity': buy_quantity,
+    #             'sell_quantity': 0,
+    #             'status': 'open'
+    #         })
+    #     elif type == 'short':
+    #          data.append({
+    #             'position_id':f"psn_{int(time.time())}",  # Replace with actual trade ID
+    #             'type': 'short',  # Replace with actual trade type,
+    #             'symbol': 'KRW-BTC',
+    #             'entry_price':executed_price,  # Reflect actual entry price
+    #             'buy_quantity': 0,
+    #             'sell_quantity': sell_quantity,
+    #             'status': 'close'
+    #         })
+
+    #     self.position_data = pd.DataFrame(data)
+    #     return self.position_data
+
+    
+    def execution_trade(self, data_manager, entry_data, exit_data, invested_amount, coin_balance, max_loss, ticker='KRW-BTC'):
+        """
+        Places the order for the current signal and returns its trade log.
+        :param entry_data: Signal from StrategyManager.signal(), or the entry_condition frame
+        :param exit_data: exit_condition frame (ignored when entry_data is a Signal)
+        :param max_loss: price at or below which an open position is sold, see max_loss_price
+        :return: TradeRecord for a Signal, the one-row trade log DataFrame for frames
+        """
+        if isinstance(entry_data, Signal):
+            current_signal = entry_data.entry
+            current_price = entry_data.close
+            stop_loss = entry_data.stop_loss
+            take_profit = entry_data.take_profit
+            yyl = entry_data.yyl
+            yyl_slow = entry_data.yyl_slow
+            timestamp = entry_data.timestamp
+        else:
+            current_signal = entry_data.loc[entry_data.index[-1], 'entry']
+            current_price = exit_data.loc[exit_data.index[-1], 'current_price']
+            stop_loss = entry_data.loc[entry_data.index[-1], 'stop_loss']
+            take_profit = entry_data.loc[entry_data.index[-1], 'take_profit']
+            yyl = entry_data.loc[entry_data.index[-1], 'YYL']
+            yyl_slow = entry_data.loc[entry_data.index[-1], 'YYL_slow']
+            timestamp = entry_data.index[-1]
+        invested_amt = invested_amount
+        quantity = invested_amt / current_price
+        loss_threshold = max_loss
+
+        #set trading log ID
+         # Replace with actual trade ID
+        self.trade_id=f"log_{int(time.time())}"
+        fill = None
+        side = None
+        status = 'successful'
+
+        if current_signal == 'long' and invested_amt < MIN_ORDER_KRW:
+            # no edge (a Kelly fraction of 0) or too little KRW: the exchange would reject the order
+            print(f"No buy: {invested_amt:,.0f} KRW is below the {MIN_ORDER_KRW} KRW minimum order.")
+            status = 'skipped'
+            quantity = 0.0
+
+        elif current_signal == 'long':
+            print("Executing buy at market price")
+            if self.execution_engine is not None:
+                fill = self.execution_engine.buy(ticker, invested_amt)
+            else:
+                data_manager.execute_buy_market_price(ticker, invested_amt)
+                side = 'bid'
+           # self.record_position_data(self.trade_id,current_price,invested_amt,quantity,coin_balance,current_signal)
+
+        elif current_signal == 'short' or current_price <= stop_loss or current_price >= take_profit or current_price <= loss_threshold:
+            print("Executing sell at market price")
+            if coin_balance > 0 and self.execution_engine is not None:
+                fill = self.execution_engine.sell(ticker, coin_balance, current_price)
+            elif coin_balance > 0:
+                data_manager.exectute_sell_market_price(ticker, coin_balance)
+                side = 'ask'
+                quantity = coin_balance
+                invested_amt = coin_balance * current_price
+            elif coin_balance==0:
+                print("No coin balance to sell.")
+            #self.record_position_data(self.trade_id,current_price,invested_amt,quantity,coin_balance,current_signal)
+
+        else:
+            print("No execution as signal is neutral.")
+
+        fee = 0.0
+        self.position_changed = False
+        if fill is not None:
+            self.record_fill(ticker, fill, stop_loss, take_profit)
+        if fill is not None:
+            # log what actually executed instead of what was asked for
+            self.trade_id = fill.identifier
+            status = fill.status
+            side = fill.side if fill.executed_volume > 0 else None
+            fee = fill.fee
+            quantity = fill.executed_volume
+            invested_amt = fill.funds
+            if fill.avg_price is not None:
+                current_price = fill.avg_price
+
+        record = TradeRecord(self.trade_id, current_signal, timestamp, ticker, current_price, yyl, yyl_slow,
+                             quantity, invested_amt, fee=fee, status=status,
+                             stop_loss=stop_loss, take_profit=take_profit, side=side)
+        self.execution_data = record if isinstance(entry_data, Signal) else record.to_frame()
+        return self.execution_data
+
+    def record_fill(self, ticker, fill, stop_loss=None, take_profit=None):
+        """
+        Books an executed Fill in the ledger; a buy also stores the stop-loss/take-profit it was opened with.
+        Shared by execution_trade and StreamManager so the ledger and the sizer see every trade.
+        :return: True when the ledger position changed (also kept in self.position_changed)
+        """
+        self.position_changed = False
+        if fill.executed_volume > 0 and self.ledger is not None:
+            self.ledger.record_fill(ticker, fill.side, fill.executed_volume, fill.avg_price, fill.fee,
+                                    trade_id=fill.identifier)
+            if fill.side == 'bid':
+                self.ledger.set_levels(ticker, stop_loss, take_profit)
+            self.balances[ticker] = self.ledger.quantity(ticker)
+            self.position_changed = True
+        return self.position_changed
+
+    def max_loss_price(self, symbol, max_loss_pct):
+        """
+        Price at which the open position has lost max_loss_pct of its entry price, the `max_loss`
+        threshold of execution_trade (as in StrategyManager.backtest and StreamManager).
+        :return: the price, or 0 (never reached) without a ledger or an open position
+        """
+        position = self.ledger.position(symbol) if self.ledger is not None else None
+        if position is None or not position.is_open:
+            return 0
+        return position.entry_price * (1 - max_loss_pct)
+
+    def holding(self, symbol, snapshot):
+        """Coin quantity held: from the ledger when there is one, otherwise from the exchange snapshot."""
+        if self.ledger is not None:
+            return self.ledger.quantity(symbol)
+        return snapshot.coin_balance(symbol)
+
+    def read_positon_data(self, symbol):
+        """Read the current balance for the given symbol."""
+        if self.ledger is not None:
+            return self.ledger.quantity(symbol)
+        if symbol in self.balances:
+            return self.balances[symbol]
+        else:
+            raise ValueError(f"No balance information for symbol: {symbol}")
+
+    # You may want to add a method to update balances after trades
+    def update_balance(self, symbol, new_balance):
+        """Update the balance for a given symbol."""
+        self.balances[symbol] = new_balance
+
     
\ No newline at end of file
@@ -0,0 +1,56 @@
+# rate_limiter.py
+import time
+import threading
+
+
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        """
+        Thread-safe token bucket.
+        :param rate: tokens added per second (sustained requests per second)
+        :param burst: bucket size (defaults to rate)
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Takes tokens if available without waiting. Returns True on success."""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Blocks until tokens are available.
+        :param timeout: maximum seconds to wait, None waits forever
+        :return: True if the tokens were taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+    def penalize(self, seconds):
+        """Empties the bucket for `seconds`, e.g. after an HTTP 429 with Retry-After."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
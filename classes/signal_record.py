@@ -0,0 +1,115 @@
+# signal_record.py
+import pandas as pd
+import numpy as np
+
+
+class Signal:
+    """
+    Entry/exit decision for the last candle, produced by StrategyManager.signal().
+    A plain __slots__ object so the per-cycle decision needs no DataFrame; to_frame() and
+    exit_frame() rebuild the entry_condition / exit_condition frames when they are wanted.
+    """
+    __slots__ = ('timestamp', 'prev_timestamp', 'close', 'prev_close', 'yyl', 'prev_yyl',
+                 'yyl_slow', 'prev_yyl_slow', 'status', 'prev_status', 'signal', 'entry',
+                 'stop_loss', 'take_profit', 'atr')
+
+    def __init__(self, timestamp, prev_timestamp, close, prev_close, yyl, prev_yyl, yyl_slow, prev_yyl_slow,
+                 status, prev_status, signal, entry, stop_loss, take_profit, atr):
+        self.timestamp = timestamp
+        self.prev_timestamp = prev_timestamp
+        self.close = close
+        self.prev_close = prev_close
+        self.yyl = yyl
+        self.prev_yyl = prev_yyl
+        self.yyl_slow = yyl_slow
+        self.prev_yyl_slow = prev_yyl_slow
+        self.status = status
+        self.prev_status = prev_status
+        self.signal = signal
+        self.entry = entry
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.atr = atr
+
+    @property
+    def current_price(self):
+        return self.close
+
+    def __repr__(self):
+        return (f"Signal({self.timestamp}, entry={self.entry!r}, signal={self.signal}, close={self.close}, "
+                f"stop_loss={self.stop_loss}, take_profit={self.take_profit})")
+
+    def to_frame(self):
+        """The two-row frame entry_condition returns."""
+        index = [self.prev_timestamp, self.timestamp]
+        return pd.DataFrame({
+            'close': [self.prev_close, self.close],
+            'YYL': [self.prev_yyl, self.yyl],
+            'YYL_slow': [self.prev_yyl_slow, self.yyl_slow],
+            'status': [self.prev_status, self.status],
+            'signal': [np.nan, float(self.signal)],
+            'entry': [np.nan, self.entry],
+            'stop_loss': [np.nan, self.stop_loss],
+            'take_profit': [np.nan, self.take_profit],
+        }, index=index)
+
+    def exit_frame(self):
+        """The one-row frame exit_condition returns."""
+        return pd.DataFrame({
+            'current_price': [self.close],
+            'signal': [float(self.signal)],
+            'stop_loss': [self.stop_loss],
+            'take_profit': [self.take_profit],
+        }, index=[self.timestamp])
+
+
+class TradeRecord:
+    """
+    One trade log entry as produced by PositionManager.execution_trade.
+    Supports record['field'] and to_dict() so it can go straight to the Notion journal.
+    type is the signal ('long', 'short', 'neutral'); side is the order that executed ('bid', 'ask'),
+    so a stop-loss or take-profit exit on a neutral signal is still a sell. side is None without an order.
+    """
+    __slots__ = ('trade_id', 'type', 'timestamp', 'symbol', 'price', 'yyl', 'yyl_slow', 'quantity',
+                 'total_value', 'fee', 'status', 'stop_loss', 'take_profit', 'strategy', 'notes', 'side')
+
+    def __init__(self, trade_id, type, timestamp, symbol, price, yyl, yyl_slow, quantity, total_value,
+                 fee=0.0, status='successful', stop_loss=None, take_profit=None,
+                 strategy='YingYangVolatility', notes='Trade execution log.', side=None):
+        self.trade_id = trade_id
+        self.type = type
+        self.timestamp = timestamp
+        self.symbol = symbol
+        self.price = price
+        self.yyl = yyl
+        self.yyl_slow = yyl_slow
+        self.quantity = quantity
+        self.total_value = total_value
+        self.fee = fee
+        self.status = status
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.strategy = strategy
+        self.notes = notes
+        self.side = side
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    @property
+    def executed(self):
+        """True when an order went through: 'successful' without an ExecutionEngine, 'filled' or 'partial' with one."""
+        return self.side is not None and self.status in ('successful', 'filled', 'partial')
+
+    def __repr__(self):
+        return f"TradeRecord({self.trade_id}, {self.type}, {self.symbol}, price={self.price}, quantity={self.quantity})"
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_frame(self):
+        """The one-row frame execution_trade used to return."""
+        return pd.DataFrame([self.to_dict()])
@@ -0,0 +1,323 @@
+# simulated_exchange.py
+import uuid
+import datetime
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+from classes.candle_store import INTERVAL_SECONDS, KST_OFFSET
+from classes.data_manager import DataManager, MarketSnapshot
+from classes.execution_engine import MIN_ORDER_KRW
+from classes.signal_record import TradeRecord
+
+
+class SimulatedExchange:
+    def __init__(self, ticks, balances=None, fee=0.0005, slippage=0.0002, impact=0.0):
+        """
+        Local stand-in for pyupbit.Upbit driven by recorded or synthetic ticks.
+        Nothing happens on its own: advance() moves the simulated clock, and balances, prices,
+        candles and fills are whatever the ticks up to that moment say.
+        :param ticks: dict ticker -> DataFrame with 'timestamp' (epoch seconds), 'price' and 'volume'
+                      columns, or a DatetimeIndex (KST) and 'price'/'volume' columns
+        :param balances: starting balances by currency, e.g. {'KRW': 10_000_000}
+        :param fee: fee rate charged on every fill (Upbit KRW market: 0.05%)
+        :param slippage: fill price penalty as a fraction of the last price
+        :param impact: extra penalty per 100M KRW of order value, for large orders
+        """
+        self.fee = fee
+        self.slippage = slippage
+        self.impact = impact
+        self.ticks = {ticker: self._tick_arrays(frame) for ticker, frame in ticks.items()}
+        self.accounts = {}
+        for currency, balance in (balances or {'KRW': 10_000_000}).items():
+            self.accounts[currency] = {'balance': float(balance), 'avg_buy_price': 0.0}
+        self.orders = {}
+        self.candles = {}
+        self.now = min(arrays[0][0] for arrays in self.ticks.values())
+
+    @staticmethod
+    def _tick_arrays(frame):
+        if 'timestamp' in frame:
+            timestamps = frame['timestamp'].to_numpy(dtype=np.float64)
+        else:
+            timestamps = frame.index.values.astype('datetime64[ns]').astype(np.int64) / 1e9 - KST_OFFSET
+        volumes = frame['volume'].to_numpy(dtype=np.float64) if 'volume' in frame else np.zeros(len(frame))
+        order = np.argsort(timestamps, kind='stable')
+        return timestamps[order], frame['price'].to_numpy(dtype=np.float64)[order], volumes[order]
+
+    @classmethod
+    def from_csv(cls, path, ticker='KRW-BTC', **kwargs):
+        """Loads recorded ticks from a CSV with timestamp (epoch seconds), price and volume columns."""
+        return cls({ticker: pd.read_csv(path)}, **kwargs)
+
+    @classmethod
+    def synthetic(cls, tickers=('KRW-BTC',), days=30, start='2024-01-01', tick_seconds=10, seed=0,
+                  start_price=50_000_000, volatility=0.0004, **kwargs):
+        """
+        Exchange over a geometric random walk, one tick every tick_seconds.
+        The same seed always produces the same ticks.
+        """
+        rng = np.random.default_rng(seed)
+        first = pd.Timestamp(start).value / 1e9 - KST_OFFSET
+        n = int(days * 86400 / tick_seconds)
+        timestamps = first + np.arange(n) * float(tick_seconds)
+        ticks = {}
+        for ticker in tickers:
+            prices = start_price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+            ticks[ticker] = pd.DataFrame({'timestamp': timestamps, 'price': prices,
+                                          'volume': rng.gamma(2.0, 0.01, n)})
+        return cls(ticks, **kwargs)
+
+    # clock
+
+    def advance(self, timestamp):
+        """Moves the simulated clock forward to `timestamp` (epoch seconds)."""
+        self.now = max(self.now, float(timestamp))
+
+    def datetime(self):
+        return datetime.datetime.fromtimestamp(self.now + KST_OFFSET, datetime.timezone.utc).replace(tzinfo=None)
+
+    def start(self, ticker):
+        return self.ticks[ticker][0][0]
+
+    def end(self, ticker):
+        return self.ticks[ticker][0][-1]
+
+    def _last_tick(self, ticker):
+        timestamps = self.ticks[ticker][0]
+        return int(np.searchsorted(timestamps, self.now, side='right')) - 1
+
+    # market data
+
+    def get_current_price(self, ticker):
+        i = self._last_tick(ticker)
+        return float(self.ticks[ticker][1][i]) if i >= 0 else None
+
+    def _candle_arrays(self, ticker, interval):
+        # every candle of the whole tick history, built once per ticker and interval
+        key = (ticker, interval)
+        if key not in self.candles:
+            timestamps, prices, volumes = self.ticks[ticker]
+            seconds = INTERVAL_SECONDS[interval]
+            buckets = ((timestamps + KST_OFFSET) // seconds).astype(np.int64)
+            starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+            ends = np.r_[starts[1:], len(prices)]
+            self.candles[key] = {
+                'bucket': buckets[starts],
+                'first': starts,
+                'open': prices[starts],
+                'high': np.maximum.reduceat(prices, starts),
+                'low': np.minimum.reduceat(prices, starts),
+                'close': prices[ends - 1],
+                'volume': np.add.reduceat(volumes, starts),
+                'value': np.add.reduceat(prices * volumes, starts),
+            }
+        return self.candles[key]
+
+    def get_ohlcv(self, ticker='KRW-BTC', interval='minute30', count=200):
+        """Same frame pyupbit.get_ohlcv returns: closed candles plus the one forming at self.now."""
+        last = self._last_tick(ticker)
+        if last < 0:
+            return None
+        candles = self._candle_arrays(ticker, interval)
+        current = int(np.searchsorted(candles['first'], last, side='right')) - 1
+        first = max(0, current - count + 1)
+        rows = slice(first, current + 1)
+        frame = {field: candles[field][rows].copy() for field in ('open', 'high', 'low', 'close', 'volume', 'value')}
+
+        # the forming candle only holds the ticks seen so far
+        timestamps, prices, volumes = self.ticks[ticker]
+        start = candles['first'][current]
+        seen = slice(start, last + 1)
+        frame['high'][-1] = prices[seen].max()
+        frame['low'][-1] = prices[seen].min()
+        frame['close'][-1] = prices[last]
+        frame['volume'][-1] = volumes[seen].sum()
+        frame['value'][-1] = (prices[seen] * volumes[seen]).sum()
+
+        seconds = INTERVAL_SECONDS[interval]
+        index = pd.to_datetime(candles['bucket'][rows] * seconds, unit='s')
+        return pd.DataFrame(frame, index=index)
+
+    # account
+
+    def _account(self, currency):
+        return self.accounts.setdefault(currency, {'balance': 0.0, 'avg_buy_price': 0.0})
+
+    def get_balance(self, ticker='KRW'):
+        return self._account(ticker.split('-')[-1])['balance']
+
+    def get_balances(self):
+        """Same records as the /accounts endpoint."""
+        return [{'currency': currency, 'balance': str(account['balance']), 'locked': '0.0',
+                 'avg_buy_price': str(account['avg_buy_price']), 'avg_buy_price_modified': False,
+                 'unit_currency': 'KRW'}
+                for currency, account in self.accounts.items() if account['balance'] > 0]
+
+    def _fill_price(self, ticker, side, value):
+        price = self.get_current_price(ticker)
+        penalty = self.slippage + self.impact * value / 1e8
+        return price * (1 + penalty) if side == 'bid' else price * (1 - penalty)
+
+    def _order(self, ticker, side, ord_type, price, volume, fill_price, fee, identifier=None):
+        order = {
+            'uuid': str(uuid.uuid4()),
+            'side': side,
+            'ord_type': ord_type,
+            'price': None if price is None else str(price),
+            'state': 'done',
+            'market': ticker,
+            'created_at': self.datetime().isoformat() + '+09:00',
+            'volume': None if volume is None else str(volume),
+            'remaining_volume': '0.0',
+            'executed_volume': str(volume if volume is not None else price / fill_price),
+            'paid_fee': str(fee),
+            'trades_count': 1,
+            'trades': [{'market': ticker, 'price': str(fill_price),
+                        'volume': str(volume if volume is not None else price / fill_price),
+                        'funds': str(price if price is not None else volume * fill_price), 'side': side}],
+        }
+        if identifier is not None:
+            order['identifier'] = identifier
+        self.orders[order['uuid']] = order
+        return order
+
+    @staticmethod
+    def _error(name, message):
+        return {'error': {'name': name, 'message': message}}
+
+    def buy_market_order(self, ticker, price, identifier=None):
+        """Spends `price` KRW on `ticker` at the last price plus slippage; the fee is charged on top."""
+        price = float(price)
+        if price < MIN_ORDER_KRW:
+            return self._error('under_min_total_bid', f"minimum order is {MIN_ORDER_KRW} KRW")
+        fee = price * self.fee
+        krw = self._account('KRW')
+        if krw['balance'] < price + fee:
+            return self._error('insufficient_funds_bid', "insufficient KRW balance")
+        fill_price = self._fill_price(ticker, 'bid', price)
+        volume = price / fill_price
+        coin = self._account(ticker.split('-')[-1])
+        coin['avg_buy_price'] = (coin['avg_buy_price'] * coin['balance'] + price) / (coin['balance'] + volume)
+        coin['balance'] += volume
+        krw['balance'] -= price + fee
+        return self._order(ticker, 'bid', 'price', price, None, fill_price, fee, identifier)
+
+    def sell_market_order(self, ticker, volume, identifier=None):
+        """Sells `volume` coins at the last price minus slippage; the fee is taken from the proceeds."""
+        volume = float(volume)
+        coin = self._account(ticker.split('-')[-1])
+        if volume <= 0 or coin['balance'] < volume * (1 - 1e-12):
+            return self._error('insufficient_funds_ask', "insufficient coin balance")
+        volume = min(volume, coin['balance'])
+        fill_price = self._fill_price(ticker, 'ask', volume * self.get_current_price(ticker))
+        funds = volume * fill_price
+        if funds < MIN_ORDER_KRW:
+            return self._error('under_min_total_ask', f"minimum order is {MIN_ORDER_KRW} KRW")
+        fee = funds * self.fee
+        coin['balance'] -= volume
+        if coin['balance'] <= volume * 1e-12:
+            coin['balance'] = 0.0
+            coin['avg_buy_price'] = 0.0
+        self._account('KRW')['balance'] += funds - fee
+        return self._order(ticker, 'ask', 'market', None, volume, fill_price, fee, identifier)
+
+    def get_order(self, uuid_or_identifier):
+        order = self.orders.get(uuid_or_identifier)
+        if order is None:
+            order = next((o for o in self.orders.values() if o.get('identifier') == uuid_or_identifier), None)
+        return order if order is not None else self._error('order_not_found', "order not found")
+
+    def equity(self):
+        """KRW plus every coin at the last price."""
+        total = self.accounts.get('KRW', {'balance': 0.0})['balance']
+        for ticker in self.ticks:
+            total += self.get_balance(ticker) * (self.get_current_price(ticker) or 0.0)
+        return total
+
+
+class SimulatedDataManager(DataManager):
+    def __init__(self, exchange, ticker='KRW-BTC', interval='minute30', count=300, rate_limiter=None,
+                 candle_buffer=None):
+        """DataManager that reads from and trades on a SimulatedExchange instead of Upbit."""
+        # no TTL cache: simulated time moves faster than the wall clock the TTLs are measured in
+        super().__init__(None, None, ticker=ticker, interval=interval, count=count, rate_limiter=rate_limiter,
+                         cache_ttls={}, candle_buffer=candle_buffer)
+        self.upbit = exchange
+        self.exchange = exchange
+        self.identifiers = set()
+
+    def get_historical_data(self, ticker, interval, count):
+        return self.exchange.get_ohlcv(ticker, interval, count)
+
+    def get_current_price(self, ticker):
+        return self.exchange.get_current_price(ticker)
+
+    def _fetch_balances(self):
+        return {account['currency']: float(account['balance']) for account in self.exchange.get_balances()}
+
+    def _fetch_prices(self, tickers):
+        return {ticker: self.exchange.get_current_price(ticker) for ticker in tickers}
+
+    def place_order(self, ticker, side, ord_type, price=None, volume=None, identifier=None):
+        if identifier is not None and identifier in self.identifiers:
+            return {'error': {'name': 'duplicate_identifier', 'message': "identifier already used"}}
+        if side == 'bid':
+            order = self.exchange.buy_market_order(ticker, price, identifier=identifier)
+        else:
+            order = self.exchange.sell_market_order(ticker, volume, identifier=identifier)
+        if identifier is not None and 'error' not in order:
+            self.identifiers.add(identifier)
+        return order
+
+    def get_order(self, uuid=None, identifier=None):
+        order = self.exchange.get_order(uuid if uuid is not None else identifier)
+        return None if 'error' in order else order
+
+    async def fetch_snapshot(self, tickers=None, interval=None, count=None, candles=True):
+        return self.get_snapshot(tickers, interval, count, candles)
+
+    def get_snapshot(self, tickers=None, interval=None, count=None, candles=True):
+        """Same MarketSnapshot as DataManager.get_snapshot, built synchronously at the simulated time."""
+        tickers = list(tickers or [self.ticker])
+        interval = interval or self.interval
+        count = count or self.count
+        return MarketSnapshot(
+            timestamp=self.exchange.datetime(),
+            balances=MappingProxyType(self._fetch_balances()),
+            prices=MappingProxyType(self._fetch_prices(tickers)),
+            candles=MappingProxyType({ticker: self.get_candles(ticker, interval, count)
+                                      for ticker in tickers} if candles else {}),
+            latency=0.0,
+        )
+
+
+class PaperJournal:
+    def __init__(self, verbose=False):
+        """Collects what would go to Notion and Slack during a simulation."""
+        self.verbose = verbose
+        self.trades = []
+        self.balances = []
+        self.positions = []
+        self.messages = []
+
+    def record_account_balance(self, krw_balance, symbol, coin_balance, current_price):
+        self.balances.append({'krw_balance': krw_balance, 'symbol': symbol,
+                              'coin_balance': coin_balance, 'current_price': current_price})
+
+    def create_trade_log(self, trade_data):
+        if isinstance(trade_data, TradeRecord):
+            trade_data = trade_data.to_dict()
+        elif isinstance(trade_data, pd.DataFrame):
+            trade_data = trade_data.to_dict('records')[0]
+        self.trades.append(dict(trade_data))
+
+    def create_position_log(self, position_data):
+        self.positions.append(position_data)
+
+    def send_message(self, message):
+        self.messages.append(message)
+        if self.verbose:
+            print(message)
+
+    def close(self, timeout=None):
+        return True
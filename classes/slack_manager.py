@@ -1,26 +1,159 @@
-# slack_manager.py
-# classes/slack_notifier.py
-import requests
-
-
-class SlackManager:
-    def __init__(self, webhook_url):
-        """
-        Initializes the SlackNotifier class.
-        :param webhook_url: Slack Webhook URL
-        """
-        self.webhook_url = webhook_url
-        if not self.webhook_url:
-            raise ValueError("Slack webhook URL must be provided.")
-       
-
-    def send_message(self, message):
-        """
-        Sends a message to Slack.
-        :param message: Message content to send
-        """
-        payload = {
-            "text": message
-        }
-        response = requests.post(self.webhook_url, json=payload)
-          
\ No newline at end of file
+# slack_manager.py
+# classes/slack_notifier.py
+import time
+import queue
+import threading
+import numpy as np
+import requests
+from classes.rate_limiter import RateLimiter
+
+
+class SlackManager:
+    def __init__(self, webhook_url, asynchronous=True, digest_window=2.0, requests_per_second=1,
+                 max_retries=3, timeout=5, max_queue=1000, max_digest=30):
+        """
+        Initializes the SlackNotifier class.
+        :param webhook_url: Slack Webhook URL
+        :param asynchronous: queue messages and post them from a background thread
+        :param digest_window: seconds to wait for more messages before posting one digest
+        :param requests_per_second: webhook rate limit (Slack allows about one message per second)
+        :param max_retries: retries per post after the first attempt
+        :param timeout: HTTP timeout in seconds, so a hung webhook cannot hold the worker forever
+        :param max_queue: queued messages beyond this are dropped (and counted) instead of blocking
+        :param max_digest: maximum number of messages merged into one post
+        """
+        self.webhook_url = webhook_url
+        if not self.webhook_url:
+            raise ValueError("Slack webhook URL must be provided.")
+        self.asynchronous = asynchronous
+        self.digest_window = digest_window
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_digest = max_digest
+        self.rate_limiter = RateLimiter(requests_per_second)
+        # keep-alive connection reused by every post
+        self.session = requests.Session()
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.sent_messages = 0
+        self.sent_posts = 0
+        self.failed_messages = 0
+        self.dropped_messages = 0
+        self.latencies = []
+        self.worker = None
+        if asynchronous:
+            self.worker = threading.Thread(target=self._run, name="slack-notifier", daemon=True)
+            self.worker.start()
+
+    def send_message(self, message):
+        """
+        Sends a message to Slack.
+        :param message: Message content to send
+        """
+        if not self.asynchronous:
+            if self._post(message):
+                self.sent_messages += 1
+            else:
+                self.failed_messages += 1
+            return
+        try:
+            self.queue.put_nowait((time.perf_counter(), message))
+        except queue.Full:
+            self.dropped_messages += 1
+
+    def flush(self, timeout=5):
+        """Waits until every queued message was posted (or gave up). Returns True if the queue drained."""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=5):
+        """Flushes pending messages on shutdown and stops the worker."""
+        drained = self.flush(timeout) if self.worker is not None else True
+        if self.worker is not None:
+            try:
+                self.queue.put_nowait(None)
+            except queue.Full:
+                pass
+            self.worker.join(timeout=1)
+        self.session.close()
+        return drained
+
+    def stats(self):
+        """Throughput and enqueue-to-post latency (seconds) of the notifier."""
+        stats = {
+            'sent_messages': self.sent_messages,
+            'sent_posts': self.sent_posts,
+            'failed_messages': self.failed_messages,
+            'dropped_messages': self.dropped_messages,
+            'queued': self.queue.qsize(),
+        }
+        if self.latencies:
+            values = np.array(self.latencies[-1000:])
+            stats.update({'latency_p50': np.percentile(values, 50), 'latency_p95': np.percentile(values, 95),
+                          'latency_max': values.max()})
+        return stats
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            batch = [item]
+
+            # coalesce whatever arrives within the digest window into one post
+            deadline = time.perf_counter() + self.digest_window
+            stop = False
+            while len(batch) < self.max_digest:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            text = "\n".join(message for _, message in batch)
+            self.rate_limiter.acquire()
+            ok = self._post(text)
+            posted = time.perf_counter()
+            if ok:
+                self.sent_posts += 1
+                self.sent_messages += len(batch)
+                self.latencies.extend(posted - enqueued for enqueued, _ in batch)
+                del self.latencies[:-1000]
+            else:
+                self.failed_messages += len(batch)
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                self.queue.task_done()
+                return
+
+    def _post(self, text):
+        payload = {
+            "text": text
+        }
+        for attempt in range(self.max_retries + 1):
+            delay = 0.5 * 2 ** attempt
+            try:
+                response = self.session.post(self.webhook_url, json=payload, timeout=self.timeout)
+                if response.status_code < 400:
+                    return True
+                if response.status_code != 429 and response.status_code < 500:
+                    print(f"Slack webhook rejected the message: {response.status_code} {response.text}")
+                    return False
+                delay = max(delay, float(response.headers.get('Retry-After', 0)))
+            except requests.RequestException as x:
+                print(f"Slack webhook error: {x.__class__.__name__}")
+            if attempt < self.max_retries:
+                time.sleep(delay)
+        return False
@@ -1,90 +1,294 @@
-# strategy_manager.py
-import pandas as pd
-import numpy as np
-import pyupbit
-
-class StrategyManager:
-    def __init__(self, sl__multiplier=2, tp_multiplier=3):
-        self.current_signal = None
-        self.exit_signal = None
-        self.sl_multiplier = sl__multiplier  
-        self.tp_multiplier = tp_multiplier
-        self.exit_signal = None
-
-    
-    def calculate_atr(self, df, period=14):
-        high = df['high']
-        low = df['low']
-        close = df['close']
-        
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        
-        atr = tr.rolling(window=period).mean()
-        return atr
-
-
-    def entry_condition(self, indicators_data):
-        df = pd.DataFrame(index=indicators_data.index, data=indicators_data.values, columns=indicators_data.keys())
-
-        # focus only on the last two candles to check the signals.
-        last_two = df.loc[df.index[-2:], ['close','YYL', 'YYL_slow']]
-        status_prev  = 1 if last_two.loc[last_two.index[0], 'YYL'] > last_two.loc[last_two.index[0], 'YYL_slow'] else (-1 if last_two.loc[last_two.index[0], 'YYL'] < last_two.loc[last_two.index[0], 'YYL_slow'] else 0)
-        status_current = 1 if last_two.loc[last_two.index[1],'YYL'] > last_two.loc[last_two.index[1], 'YYL_slow'] else (-1 if last_two.loc[last_two.index[1], 'YYL'] < last_two.loc[last_two.index[1], 'YYL_slow'] else 0)
-        add_row = pd.DataFrame({'status': [status_prev, status_current]}, index=last_two.index)
-        last_two = pd.concat([last_two, add_row], axis=1)
-
-        # set default signal ==0    
-        entry = 'neutral'
-
-        # Buy signal condition: signal_diff == 1 or 2 and YYL <= -75
-        signal_diff = status_current - status_prev
-        if (signal_diff in [1, 2]) and (last_two.loc[last_two.index[1], 'YYL'] <= -75):
-            entry = 'long'
-        
-        elif (signal_diff in [-1, -2]) and (last_two.loc[last_two.index[1], 'YYL'] >= 75):
-            entry = 'short'
-
-        
-        atr = self.calculate_atr(df, period=14)
-        latest_atr = atr.loc[atr.index[-1]]
-
-        # 현제캔들에서 스탑과 익절 레벨은 이전 캔들 클로즈 가격에 ATR을 적용한다
-        current_price = df['close'].loc[df.index[-2]]
-        stop_loss = current_price - (latest_atr * self.sl_multiplier)
-        take_profit = current_price + (latest_atr * self.tp_multiplier)
-        
-        signals =pd.DataFrame({'signal':[signal_diff],'entry': [entry],'stop_loss':[stop_loss],'take_profit':[take_profit]}, index=[last_two.index[1]])
-        
-        
-        last_two = pd.concat([last_two, signals], axis=1)
-        self.current_signal = last_two
-        
-        return self.current_signal
-    
-
-
-    def exit_condition(self,entry_data):
-        df = pd.DataFrame(index=entry_data.index, data=entry_data.values, columns=entry_data.keys())
-        self.exit_signal = pd.DataFrame({
-                            'current_price': [df['close'].loc[df.index[-1]]],
-                            'signal': [df['signal'].loc[df.index[-1]]],
-                            'stop_loss': [df['stop_loss'].loc[df.index[-1]]],
-                            'take_profit': [df['take_profit'].loc[df.index[-1]]],
-                            
-        }, index=[df.index[-1]])
-
-        return self.exit_signal
-
-    def backtest():
-        pass
-
-
-
-
-
-
-
-
+# strategy_manager.py
+import pandas as pd
+import numpy as np
+from classes.indicator_manager import IndicatorManager, _rolling_mean
+from classes.signal_record import Signal
+
+class StrategyManager:
+    def __init__(self, sl__multiplier=2, tp_multiplier=3, yyl_threshold=75, atr_period=14):
+        self.current_signal = None
+        self.exit_signal = None
+        self.sl_multiplier = sl__multiplier  
+        self.tp_multiplier = tp_multiplier
+        self.yyl_threshold = yyl_threshold
+        self.atr_period = atr_period
+        self.exit_signal = None
+
+    
+    def calculate_atr(self, df, period=14):
+        high = df['high']
+        low = df['low']
+        close = df['close']
+        
+        tr1 = high - low
+        tr2 = abs(high - close.shift())
+        tr3 = abs(low - close.shift())
+        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+        
+        atr = tr.rolling(window=period).mean()
+        return atr
+
+
+    def signal(self, indicators, index=None):
+        """
+        Entry signal and ATR stop-loss/take-profit levels for the last candle, without building DataFrames.
+        Same rules as entry_condition; only the last atr_period + 1 rows are read.
+        :param indicators: calculate_indicator frame, or a mapping of column -> array
+                           (close, high, low, YYL, YYL_slow; the 'atr' column of calculate_fused is used if present)
+        :param index: timestamps of the rows when indicators is not a frame
+        :return: Signal
+        """
+        if index is None:
+            index = indicators.index
+        tail = self.atr_period + 1
+        close = np.asarray(indicators['close'], dtype=np.float64)[-tail:]
+        high = np.asarray(indicators['high'], dtype=np.float64)[-tail:]
+        low = np.asarray(indicators['low'], dtype=np.float64)[-tail:]
+        yyl = np.asarray(indicators['YYL'], dtype=np.float64)[-2:]
+        yyl_slow = np.asarray(indicators['YYL_slow'], dtype=np.float64)[-2:]
+        prev_yyl, last_yyl = float(yyl[0]), float(yyl[1])
+        prev_yyl_slow, last_yyl_slow = float(yyl_slow[0]), float(yyl_slow[1])
+
+        status_prev = 1 if prev_yyl > prev_yyl_slow else (-1 if prev_yyl < prev_yyl_slow else 0)
+        status_current = 1 if last_yyl > last_yyl_slow else (-1 if last_yyl < last_yyl_slow else 0)
+        signal_diff = status_current - status_prev
+
+        entry = 'neutral'
+        if signal_diff in (1, 2) and last_yyl <= -self.yyl_threshold:
+            entry = 'long'
+        elif signal_diff in (-1, -2) and last_yyl >= self.yyl_threshold:
+            entry = 'short'
+
+        if 'atr' in indicators:
+            latest_atr = float(indicators['atr'][-1])
+        else:
+            # ATR of the last candle; the first row of the frame has no previous close (high - low only)
+            prev = close[:-1]
+            tr = np.maximum(high[1:] - low[1:], np.maximum(np.abs(high[1:] - prev), np.abs(low[1:] - prev)))
+            if len(close) < tail:
+                tr = np.concatenate(([high[0] - low[0]], tr))
+            latest_atr = float(tr[-self.atr_period:].mean()) if len(tr) >= self.atr_period else np.nan
+
+        # stop and take profit for the current candle apply the ATR to the previous close
+        previous_close = float(close[-2])
+        return Signal(index[-1], index[-2], float(close[-1]), previous_close, last_yyl, prev_yyl,
+                      last_yyl_slow, prev_yyl_slow, status_current, status_prev, signal_diff, entry,
+                      previous_close - latest_atr * self.sl_multiplier,
+                      previous_close + latest_atr * self.tp_multiplier, latest_atr)
+
+    def entry_condition(self, indicators_data):
+        """DataFrame view of signal(): the last two candles with status, signal and stop/take-profit levels."""
+        self.current_signal = self.signal(indicators_data).to_frame()
+        return self.current_signal
+
+    def exit_condition(self, entry_data):
+        if isinstance(entry_data, Signal):
+            self.exit_signal = entry_data.exit_frame()
+            return self.exit_signal
+        df = pd.DataFrame(index=entry_data.index, data=entry_data.values, columns=entry_data.keys())
+        self.exit_signal = pd.DataFrame({
+                            'current_price': [df['close'].loc[df.index[-1]]],
+                            'signal': [df['signal'].loc[df.index[-1]]],
+                            'stop_loss': [df['stop_loss'].loc[df.index[-1]]],
+                            'take_profit': [df['take_profit'].loc[df.index[-1]]],
+                            
+        }, index=[df.index[-1]])
+
+        return self.exit_signal
+
+    def backtest(self, prices, indicator_manager=None, initial_capital=10000000, fee=0.0005,
+                 max_loss_pct=0.05, position_fraction=1.0, indicators=None):
+        """
+        Vectorized backtest of the YYL crossover strategy over a long OHLCV history.
+        Signals, ATR stop-loss/take-profit levels and exits follow entry_condition and
+        PositionManager.execution_trade bar by bar: a long signal opens a position at the
+        close, and a short signal, close <= stop_loss, close >= take_profit or a drop of
+        max_loss_pct below the entry price closes it.
+        :param prices: OHLCV frame with high/low/close columns
+        :param indicator_manager: IndicatorManager to use (defaults to IndicatorManager())
+        :param fee: fee rate charged on both entry and exit
+        :param position_fraction: fraction of equity invested per trade (e.g. the kelly fraction)
+        :param indicators: precomputed calculate_fused (or calculate_indicator_batch) output for these prices
+        :return: dict with 'signals', 'trades', 'equity' and 'stats'
+        """
+        if indicator_manager is None:
+            indicator_manager = IndicatorManager()
+
+        high = prices['high'].to_numpy(dtype=np.float64)
+        low = prices['low'].to_numpy(dtype=np.float64)
+        close = prices['close'].to_numpy(dtype=np.float64)
+        index = prices.index
+        n = len(close)
+
+        if indicators is None:
+            indicators = indicator_manager.calculate_fused(high, low, close, self.atr_period)
+        # calculate_indicator_batch rows are tickers
+        yyl = np.asarray(indicators['YYL']).reshape(-1)
+        yyl_slow = np.asarray(indicators['YYL_slow']).reshape(-1)
+
+        start = indicator_manager.window + indicator_manager.span - 2
+        if 'atr' in indicators:
+            # same ATR as the live loop, which reads it from calculate_fused
+            atr = np.array(indicators['atr'])
+            atr[:start] = np.nan
+        else:
+            atr = np.full(n, np.nan)
+            atr[start:] = _atr(high[start:], low[start:], close[start:], self.atr_period)
+
+        status = np.sign(yyl - yyl_slow)
+        status[np.isnan(status)] = 0
+        signal = np.zeros(n)
+        signal[start + 1:] = status[start + 1:] - status[start:-1]
+
+        prev_close = np.empty(n)
+        prev_close[0] = np.nan
+        prev_close[1:] = close[:-1]
+        stop_loss = prev_close - atr * self.sl_multiplier
+        take_profit = prev_close + atr * self.tp_multiplier
+
+        with np.errstate(invalid='ignore'):
+            long = (signal >= 1) & (yyl <= -self.yyl_threshold)
+            short = (signal <= -1) & (yyl >= self.yyl_threshold)
+            hit_stop = close <= stop_loss
+            hit_target = close >= take_profit
+        # execution_trade checks the long signal first, so it wins over any exit on the same bar
+        exits = (short | hit_stop | hit_target) & ~long
+
+        entries, closes, reasons = self._walk_trades(close, long, short, hit_stop, exits, max_loss_pct)
+
+        entry_price = close[entries]
+        exit_price = close[closes]
+        returns = exit_price / entry_price * (1 - fee) ** 2 - 1
+        equity_after = initial_capital * np.cumprod(1 + position_fraction * returns)
+        equity_before = np.concatenate([[initial_capital], equity_after[:-1]])
+
+        # mark open positions to market bar by bar
+        equity = np.full(n, float(initial_capital))
+        if len(entries):
+            bars = np.arange(n)
+            trade = np.searchsorted(entries, bars, side='right') - 1
+            traded = trade >= 0
+            k = trade[traded]
+            held = bars[traded] < closes[k]
+            marked = equity_before[k] * (1 - position_fraction
+                                         + position_fraction * (1 - fee) * close[traded] / entry_price[k])
+            equity[traded] = np.where(held, marked, equity_after[k])
+
+        signals = pd.DataFrame({
+            'YYL': yyl,
+            'YYL_slow': yyl_slow,
+            'signal': signal,
+            'entry': long.astype(np.int8) - short.astype(np.int8),
+            'stop_loss': stop_loss,
+            'take_profit': take_profit,
+        }, index=index)
+
+        trades = pd.DataFrame({
+            'entry_time': index[entries],
+            'exit_time': index[closes],
+            'entry_price': entry_price,
+            'exit_price': exit_price,
+            'stop_loss': stop_loss[entries],
+            'take_profit': take_profit[entries],
+            'return': returns,
+            'pnl': equity_after - equity_before,
+            'exit_reason': reasons,
+        })
+
+        equity = pd.Series(equity, index=index, name='equity')
+        return {
+            'signals': signals,
+            'trades': trades,
+            'equity': equity,
+            'stats': self._backtest_stats(equity, returns, initial_capital),
+        }
+
+    def _walk_trades(self, close, long, short, hit_stop, exits, max_loss_pct):
+        """
+        Pairs every entry with its exit. Only the max-loss exit depends on the entry price,
+        so the walk jumps from trade to trade with searchsorted instead of visiting every bar.
+        """
+        n = len(close)
+        long_idx = np.flatnonzero(long)
+        exit_idx = np.flatnonzero(exits)
+        entries, closes, reasons = [], [], []
+
+        cursor = 0
+        while True:
+            j = np.searchsorted(long_idx, cursor)
+            if j == len(long_idx):
+                break
+            entry = long_idx[j]
+
+            k = np.searchsorted(exit_idx, entry + 1)
+            end = exit_idx[k] if k < len(exit_idx) else n - 1
+            if short[end]:
+                reason = 'short'
+            elif hit_stop[end]:
+                reason = 'stop_loss'
+            elif k < len(exit_idx):
+                reason = 'take_profit'
+            else:
+                reason = 'open'
+
+            window = slice(entry + 1, end + 1)
+            hits = np.flatnonzero((close[window] <= close[entry] * (1 - max_loss_pct)) & ~long[window])
+            if len(hits):
+                end = entry + 1 + hits[0]
+                reason = 'max_loss'
+
+            entries.append(entry)
+            closes.append(end)
+            reasons.append(reason)
+            cursor = end + 1
+
+        return np.array(entries, dtype=np.int64), np.array(closes, dtype=np.int64), reasons
+
+    def _backtest_stats(self, equity, returns, initial_capital):
+        values = equity.to_numpy()
+        peak = np.maximum.accumulate(values)
+        drawdown = values / peak - 1
+        bar_returns = np.diff(values) / values[:-1]
+
+        # annualize with the median bar spacing of the history
+        if len(equity.index) > 1 and isinstance(equity.index, pd.DatetimeIndex):
+            spacing = np.diff(equity.index.values).astype('timedelta64[ns]').astype(np.int64)
+            bar_seconds = np.median(spacing) / 1e9
+            periods_per_year = 365 * 24 * 3600 / bar_seconds if bar_seconds > 0 else np.nan
+        else:
+            periods_per_year = np.nan
+        std = bar_returns.std() if len(bar_returns) else 0.0
+        sharpe = bar_returns.mean() / std * np.sqrt(periods_per_year) if std > 0 else np.nan
+
+        wins = returns[returns > 0]
+        losses = returns[returns <= 0]
+        return {
+            'total_return': values[-1] / initial_capital - 1 if len(values) else 0.0,
+            'final_equity': values[-1] if len(values) else initial_capital,
+            'n_trades': len(returns),
+            'win_rate': len(wins) / len(returns) if len(returns) else np.nan,
+            'avg_return': returns.mean() if len(returns) else np.nan,
+            'profit_factor': wins.sum() / -losses.sum() if losses.sum() < 0 else np.nan,
+            'max_drawdown': drawdown.min() if len(values) else 0.0,
+            'sharpe': sharpe,
+        }
+
+
+def _atr(high, low, close, period=14):
+    """NumPy version of StrategyManager.calculate_atr."""
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    tr = high - low
+    with np.errstate(invalid='ignore'):
+        np.fmax(tr, np.abs(high - prev_close), out=tr)
+        np.fmax(tr, np.abs(low - prev_close), out=tr)
+    return _rolling_mean(tr, period)
+
+
+
+
+
+
+
+
@@ -0,0 +1,314 @@
+# stream_manager.py
+import json
+import time
+import uuid
+from collections import deque
+import numpy as np
+import pandas as pd
+from classes.candle_aggregator import CandleAggregator, KST_OFFSET
+from classes.execution_engine import MIN_ORDER_KRW
+
+UPBIT_WEBSOCKET_URL = "wss://api.upbit.com/websocket/v1"
+
+
+class ReplayFeed:
+    def __init__(self, ticks, speed=None):
+        """
+        Local tick feed for testing the streaming mode.
+        :param ticks: iterable of dicts with 'timestamp' (epoch seconds), 'price' and 'volume'
+        :param speed: replay speed relative to real time (e.g. 60 = one minute per second);
+                      None replays as fast as possible
+        """
+        self.ticks = ticks
+        self.speed = speed
+
+    @classmethod
+    def from_frame(cls, df, speed=None):
+        """Builds a feed from a frame with a DatetimeIndex and price/volume columns."""
+        timestamps = df.index.values.astype('datetime64[ns]').astype(np.int64) / 1e9
+        volumes = df['volume'] if 'volume' in df else np.zeros(len(df))
+        ticks = [{'timestamp': t, 'price': p, 'volume': v}
+                 for t, p, v in zip(timestamps, df['price'], volumes)]
+        return cls(ticks, speed)
+
+    def __iter__(self):
+        first_tick = None
+        started = time.monotonic()
+        for tick in self.ticks:
+            if self.speed:
+                if first_tick is None:
+                    first_tick = tick['timestamp']
+                delay = (tick['timestamp'] - first_tick) / self.speed - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            yield tick
+
+
+class UpbitTradeFeed:
+    def __init__(self, ticker, reconnect_delay=1.0):
+        """
+        Upbit trade stream over a websocket, read in the calling thread so a tick reaches
+        the strategy without an extra process or queue hop.
+        """
+        self.ticker = ticker
+        self.reconnect_delay = reconnect_delay
+        self.running = True
+
+    def __iter__(self):
+        from websockets.sync.client import connect
+        from websockets.exceptions import ConnectionClosed
+
+        request = json.dumps([{"ticket": str(uuid.uuid4())[:8]},
+                              {"type": "trade", "codes": [self.ticker], "isOnlyRealtime": True}])
+        while self.running:
+            try:
+                with connect(UPBIT_WEBSOCKET_URL, ping_interval=60) as websocket:
+                    websocket.send(request)
+                    for message in websocket:
+                        data = json.loads(message)
+                        yield {'timestamp': data['trade_timestamp'] / 1000,
+                               'price': data['trade_price'],
+                               'volume': data['trade_volume']}
+                        if not self.running:
+                            return
+            except (ConnectionClosed, OSError) as x:
+                print(f"Websocket disconnected ({x.__class__.__name__}), reconnecting.")
+                time.sleep(self.reconnect_delay)
+
+    def stop(self):
+        self.running = False
+
+
+class StreamManager:
+    def __init__(self, data_manager, indicator_manager, strategy_manager, position_manager,
+                 ticker='KRW-BTC', interval='minute30', max_loss_pct=0.05, on_trade=None, history=64,
+                 confirm_interval=None):
+        """
+        Event-driven execution: stop-loss, take-profit and max-loss are checked on every tick,
+        the full YYL signal only when a candle closes.
+        :param on_trade: callback receiving each trade log dict after the order was sent
+                         (journal/notification I/O belongs there, off the tick path)
+        :param history: number of indicator rows kept for the signal/ATR
+        :param confirm_interval: optional higher timeframe (e.g. 'minute60') built from the same trades;
+                                 a long entry then also needs YYL above YYL_slow on that timeframe
+        """
+        self.data_manager = data_manager
+        self.indicator_manager = indicator_manager
+        self.strategy_manager = strategy_manager
+        self.position_manager = position_manager
+        self.ticker = ticker
+        self.interval = interval
+        self.max_loss_pct = max_loss_pct
+        self.on_trade = on_trade
+
+        self.confirm_interval = confirm_interval
+        self.candles = CandleAggregator([interval] + ([confirm_interval] if confirm_interval else []))
+        self.candles.subscribe(interval, self._on_candle)
+        self.state = indicator_manager.create_state()
+        self.confirm_state = None
+        if confirm_interval:
+            self.confirm_state = indicator_manager.create_state()
+            self.candles.subscribe(confirm_interval, self.confirm_state.on_candle)
+        self.rows = deque(maxlen=history)
+        self.index = deque(maxlen=history)
+
+        self.krw_balance = 0.0
+        self.coin_balance = 0.0
+        self.entry_price = None
+        self.stop_loss = None
+        self.take_profit = None
+        self.signal = 'neutral'
+        self.yyl = 0
+        self.yyl_slow = 0
+        self.latencies = []
+        self.running = True
+
+    def warm_up(self, prices, snapshot=None, confirm_prices=None):
+        """
+        Seeds the indicator states and the forming candles from get_historical_data frames.
+        :param prices: OHLCV frame whose last row is the candle still forming (pyupbit layout)
+        :param snapshot: MarketSnapshot to take the KRW and coin balances from
+        :param confirm_prices: same for confirm_interval; without it the confirmation timeframe
+                               is built from `prices`, which only covers a few higher-timeframe candles
+        """
+        targets = [self.interval]
+        if self.confirm_interval:
+            if confirm_prices is not None:
+                self.candles.warm_up(confirm_prices, self.confirm_interval, targets=[self.confirm_interval])
+            else:
+                targets.append(self.confirm_interval)
+        self.candles.warm_up(prices, self.interval, targets=targets)
+        if self.confirm_state is not None and self.confirm_state.last is None:
+            print(f"Not enough {self.confirm_interval} candles yet; entries are not confirmed until there are.")
+        if snapshot is not None:
+            self.krw_balance = snapshot.krw_balance
+            self.coin_balance = self.position_manager.holding(self.ticker, snapshot)
+        self._restore_position()
+        self._evaluate(None)
+
+    def _restore_position(self):
+        """After a restart, takes the entry price and levels of an open position from the ledger."""
+        ledger = self.position_manager.ledger
+        position = ledger.position(self.ticker) if ledger is not None else None
+        if position is None or not position.is_open:
+            return
+        self.entry_price = position.entry_price
+        # the next closed candle moves the levels on, as in the polling loop
+        self.stop_loss = position.stop_loss
+        self.take_profit = position.take_profit
+
+    def run(self, feed):
+        """Consumes a tick feed until it ends or stop() is called."""
+        for tick in feed:
+            received = time.perf_counter()
+            self.on_tick(tick['timestamp'], tick['price'], tick.get('volume', 0.0), received)
+            if not self.running:
+                break
+
+    def stop(self):
+        self.running = False
+
+    def on_tick(self, timestamp, price, volume=0.0, received=None):
+        received = received or time.perf_counter()
+        closed = self.candles.add_tick(timestamp, price, volume)
+        # subscribers have already pushed every closed candle, so the confirmation is current too
+        if any(interval == self.interval for interval, _ in closed):
+            self._evaluate(received)
+
+        if self.coin_balance > 0:
+            reason = self._exit_reason(price)
+            if reason is not None:
+                self._sell(price, reason, received)
+
+    def _on_candle(self, interval, candle):
+        # candles are indexed by local (KST) start time like pyupbit's frames
+        start = pd.Timestamp(candle['start'] + KST_OFFSET, unit='s')
+        self._push_candle(start, candle['high'], candle['low'], candle['close'])
+
+    def _push_candle(self, timestamp, high, low, close):
+        row = self.state.push(timestamp, high, low, close)
+        if row is not None:
+            self.rows.append(row)
+            self.index.append(timestamp)
+
+    def _exit_reason(self, price):
+        if self.stop_loss is not None and price <= self.stop_loss:
+            return 'stop_loss'
+        if self.take_profit is not None and price >= self.take_profit:
+            return 'take_profit'
+        if self.entry_price is not None and price <= self.entry_price * (1 - self.max_loss_pct):
+            return 'max_loss'
+        return None
+
+    def _evaluate(self, received):
+        """Full signal evaluation on a closed candle, same rules as the polling loop."""
+        if len(self.rows) < self.strategy_manager.atr_period + 1:
+            return
+        rows = list(self.rows)[-(self.strategy_manager.atr_period + 1):]
+        columns = {name: np.fromiter((row[name] for row in rows), dtype=np.float64, count=len(rows))
+                   for name in ('high', 'low', 'close', 'YYL', 'YYL_slow')}
+        signal = self.strategy_manager.signal(columns, index=self.index)
+        self.signal = signal.entry
+        if self.signal == 'long' and not self._confirmed():
+            self.signal = 'neutral'
+
+        # levels for the candle that starts now: last closed close -/+ ATR multiples
+        close = signal.close
+        self.stop_loss = close - signal.atr * self.strategy_manager.sl_multiplier
+        self.take_profit = close + signal.atr * self.strategy_manager.tp_multiplier
+        self.yyl = signal.yyl
+        self.yyl_slow = signal.yyl_slow
+
+        if received is None:
+            return
+        if self.signal == 'long':
+            self._buy(close, received)
+        elif self.signal == 'short' and self.coin_balance > 0:
+            self._sell(close, 'short', received)
+
+    def _confirmed(self):
+        """Higher-timeframe check for long entries; passes while that timeframe is still warming up."""
+        if self.confirm_state is None or self.confirm_state.last is None:
+            return True
+        return self.confirm_state.last['YYL'] > self.confirm_state.last['YYL_slow']
+
+    def _buy(self, price, received):
+        amount = self.krw_balance * self.position_manager.kelly_fraction(self.ticker)
+        if amount < MIN_ORDER_KRW:
+            return
+        engine = self.position_manager.execution_engine
+        fee, status = 0.0, 'successful'
+        if engine is not None:
+            fill = engine.buy(self.ticker, amount)
+            self.latencies.append((time.perf_counter() - received) * 1000)
+            if fill.executed_volume <= 0:
+                print(f"Stream buy failed: {fill.errors}")
+                return
+            price, quantity, amount, fee, status = fill.avg_price, fill.executed_volume, fill.funds, fill.fee, fill.status
+            self.position_manager.record_fill(self.ticker, fill, self.stop_loss, self.take_profit)
+        else:
+            self.data_manager.execute_buy_market_price(self.ticker, amount)
+            self.latencies.append((time.perf_counter() - received) * 1000)
+            quantity = amount / price
+        self.krw_balance -= amount + fee
+        self.coin_balance += quantity
+        self.entry_price = self._entry_price(price)
+        self._record('long', price, quantity, amount, 'YYL long signal on candle close.', fee, status)
+
+    def _sell(self, price, reason, received):
+        quantity = self.coin_balance
+        engine = self.position_manager.execution_engine
+        fee, status = 0.0, 'successful'
+        if engine is not None:
+            fill = engine.sell(self.ticker, quantity, price)
+            self.latencies.append((time.perf_counter() - received) * 1000)
+            if fill.executed_volume <= 0:
+                print(f"Stream sell failed: {fill.errors}")
+                return
+            price, quantity, fee, status = fill.avg_price, fill.executed_volume, fill.fee, fill.status
+            self.position_manager.record_fill(self.ticker, fill)
+        else:
+            self.data_manager.exectute_sell_market_price(self.ticker, quantity)
+            self.latencies.append((time.perf_counter() - received) * 1000)
+        self.krw_balance += quantity * price - fee
+        self.coin_balance -= quantity
+        if self.coin_balance <= 0:
+            self.coin_balance = 0.0
+            self.entry_price = None
+        self._record('short', price, quantity, quantity * price, f"Stream exit ({reason}).", fee, status)
+
+    def _entry_price(self, price):
+        # average cost of the whole position when the ledger tracks it, else the last fill price
+        ledger = self.position_manager.ledger
+        position = ledger.position(self.ticker) if ledger is not None else None
+        return position.entry_price if position is not None and position.is_open else price
+
+    def _record(self, trade_type, price, quantity, total_value, notes, fee=0.0, status='successful'):
+        if self.on_trade is None:
+            return
+        self.on_trade({
+            'trade_id': f"log_{int(time.time() * 1000)}",
+            'type': trade_type,
+            'side': 'bid' if trade_type == 'long' else 'ask',
+            'timestamp': pd.Timestamp.now(),
+            'symbol': self.ticker,
+            'price': price,
+            'yyl': self.yyl,
+            'yyl_slow': self.yyl_slow,
+            'quantity': quantity,
+            'total_value': total_value,
+            'fee': fee,
+            'status': status,
+            'stop_loss': self.stop_loss,
+            'take_profit': self.take_profit,
+            'strategy': 'YingYangVolatility',
+            'notes': notes,
+        })
+
+    def latency_stats(self):
+        """Tick-to-order latency percentiles in milliseconds."""
+        if not self.latencies:
+            return {}
+        values = np.array(self.latencies)
+        return {'count': len(values), 'p50': np.percentile(values, 50), 'p95': np.percentile(values, 95),
+                'p99': np.percentile(values, 99), 'max': values.max()}
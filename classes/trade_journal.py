@@ -0,0 +1,222 @@
+# trade_journal.py
+import os
+import time
+import sqlite3
+import threading
+import datetime
+import numpy as np
+import pandas as pd
+from classes.candle_store import KST_OFFSET
+from classes.signal_record import TradeRecord
+
+# order side of trade logs that do not carry one (stream trades, older journals)
+SIDES = {'long': 'bid', 'short': 'ask'}
+
+TABLES = {
+    'trades': ('ts', 'trade_id', 'type', 'side', 'candle_time', 'symbol', 'price', 'yyl', 'yyl_slow', 'quantity',
+               'total_value', 'fee', 'status', 'stop_loss', 'take_profit', 'strategy', 'notes', 'realized_pnl'),
+    'balances': ('ts', 'symbol', 'krw_balance', 'coin_balance', 'current_price'),
+    'positions': ('ts', 'position_id', 'symbol', 'status', 'entry_price', 'initial_quantity', 'current_quantity',
+                  'realized_pl', 'unrealized_pl'),
+    'signals': ('ts', 'symbol', 'candle_time', 'entry', 'close', 'yyl', 'yyl_slow', 'yyl_status', 'crossover',
+                'stop_loss', 'take_profit', 'atr'),
+}
+TEXT_COLUMNS = ('trade_id', 'type', 'side', 'candle_time', 'symbol', 'status', 'strategy', 'notes', 'position_id', 'entry')
+
+
+class TradeJournal:
+    def __init__(self, path=os.path.join("data", "journal.db"), mirror=None, clock=time.time):
+        """
+        Append-only local journal of trade logs, balance snapshots, position logs and signals.
+        Every table is indexed by (symbol, time), so range scans and the P&L / win rate / fee
+        aggregations run in SQLite instead of through paginated Notion queries.
+        Takes the same calls as NotionManager and can replace it in the bot loop.
+        :param path: SQLite file (WAL); ":memory:" for a throwaway journal
+        :param mirror: optional downstream sink (e.g. NotionManager) that receives every trade,
+                       balance and position record after it was stored locally
+        :param clock: function returning the epoch time rows are stamped with (simulated time in a replay)
+        """
+        self.path = path
+        self.mirror = mirror
+        self.clock = clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        for table, columns in TABLES.items():
+            definitions = ", ".join(f"{column} {'TEXT' if column in TEXT_COLUMNS else 'REAL'}" for column in columns)
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, {definitions})")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_symbol_ts ON {table} (symbol, ts)")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_ts ON {table} (ts)")
+        if 'side' not in {row[1] for row in self.conn.execute("PRAGMA table_info(trades)")}:
+            # journals from before the side column: every long was a buy, every short a sell
+            self.conn.execute("ALTER TABLE trades ADD COLUMN side TEXT")
+            self.conn.execute("UPDATE trades SET side = CASE type WHEN 'long' THEN 'bid' WHEN 'short' THEN 'ask' END")
+        self.lock = threading.Lock()
+        # symbol -> (quantity, average cost), so every trade is stored with the P&L it realized
+        self.holdings = {}
+        for symbol, side, price, quantity in self.conn.execute(
+                "SELECT symbol, side, price, quantity FROM trades WHERE side IS NOT NULL "
+                "AND status != 'failed' ORDER BY id"):
+            self._realize(symbol, side, price, quantity, 0.0)
+
+    def _realize(self, symbol, side, price, quantity, fee):
+        """
+        Average-cost accounting like PositionLedger: fees are charged when paid, a sell realizes
+        (price - average cost) * quantity. A sell of more than is held (e.g. a short signal while
+        flat) only realizes what was held.
+        :param side: 'bid' or 'ask', the order that executed (a stop-loss exit is an 'ask' on a neutral signal)
+        :return: realized P&L, or None when nothing was traded
+        """
+        held, cost = self.holdings.get(symbol, (0.0, 0.0))
+        quantity = quantity or 0.0
+        if side == 'bid':
+            if quantity <= 0:
+                return None
+            self.holdings[symbol] = (held + quantity, (cost * held + price * quantity) / (held + quantity))
+            return -fee
+        sold = min(quantity, held)
+        if sold <= 0:
+            return None
+        remaining = held - sold
+        self.holdings[symbol] = (remaining, cost) if remaining > held * 1e-9 else (0.0, 0.0)
+        return (price - cost) * sold - fee
+
+    def _insert(self, table, record):
+        columns = TABLES[table]
+        with self.lock:
+            self.conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                              [_value(record.get(column)) for column in columns])
+
+    # writes: same signatures as NotionManager
+
+    def record_account_balance(self, krw_balance, symbol, coin_balance, current_price):
+        self._insert('balances', {'ts': self.clock(), 'symbol': symbol, 'krw_balance': krw_balance,
+                                  'coin_balance': coin_balance, 'current_price': current_price})
+        if self.mirror is not None:
+            self.mirror.record_account_balance(krw_balance, symbol, coin_balance, current_price)
+
+    def create_trade_log(self, trade_data):
+        if trade_data is None:
+            return
+        record = trade_data.to_dict() if isinstance(trade_data, TradeRecord) else (
+            trade_data.to_dict('records')[0] if isinstance(trade_data, pd.DataFrame) else dict(trade_data))
+        # a TradeRecord always has a side (None when no order executed); only records without one fall back to the type
+        side = record['side'] if 'side' in record else SIDES.get(record.get('type'))
+        with self.lock:
+            realized = None
+            if side is not None and record.get('status') != 'failed':
+                realized = self._realize(record['symbol'], side, record.get('price') or 0.0,
+                                         record.get('quantity'), record.get('fee') or 0.0)
+        self._insert('trades', dict(record, side=side, ts=self.clock(), candle_time=record.get('timestamp'),
+                                    realized_pnl=realized))
+        if self.mirror is not None:
+            self.mirror.create_trade_log(trade_data)
+
+    def create_position_log(self, position_data):
+        record = position_data.to_dict('records')[0] if isinstance(position_data, pd.DataFrame) else position_data
+        self._insert('positions', dict(record, ts=self.clock()))
+        if self.mirror is not None:
+            self.mirror.create_position_log(position_data)
+
+    def record_signal(self, symbol, signal):
+        """Stores one StrategyManager.signal() decision (local only, not mirrored)."""
+        self._insert('signals', {'ts': self.clock(), 'symbol': symbol, 'candle_time': signal.timestamp,
+                                 'entry': signal.entry, 'close': signal.close, 'yyl': signal.yyl,
+                                 'yyl_slow': signal.yyl_slow, 'yyl_status': signal.status, 'crossover': signal.signal,
+                                 'stop_loss': signal.stop_loss, 'take_profit': signal.take_profit,
+                                 'atr': signal.atr})
+
+    def close(self, timeout=10):
+        delivered = self.mirror.close(timeout) if self.mirror is not None else True
+        with self.lock:
+            self.conn.close()
+        return delivered
+
+    # queries
+
+    @staticmethod
+    def _where(symbol, start, end, extra=()):
+        clauses, params = list(extra), []
+        if symbol is not None:
+            clauses.append("symbol = ?")
+            params.append(symbol)
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(_epoch(start))
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(_epoch(end))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, table, symbol=None, start=None, end=None, limit=None):
+        """
+        Range scan of one table, oldest first.
+        :param start, end: epoch seconds, datetimes or date strings (naive ones are KST); end is exclusive
+        :param limit: keep only the most recent `limit` rows
+        :return: DataFrame with a 'time' column (KST) next to the stored columns
+        """
+        where, params = self._where(symbol, start, end)
+        sql = f"SELECT {', '.join(TABLES[table])} FROM {table}{where} ORDER BY ts DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        df = pd.DataFrame(rows[::-1], columns=list(TABLES[table]))
+        df.insert(0, 'time', pd.to_datetime(df['ts'] + KST_OFFSET, unit='s'))
+        return df
+
+    def daily_pnl(self, symbol=None, start=None, end=None):
+        """:return: DataFrame per KST day with realized P&L (after fees), fees, executed trades, closing sells and wins"""
+        where, params = self._where(symbol, start, end, ["realized_pnl IS NOT NULL"])
+        sql = (f"SELECT date(ts + {KST_OFFSET}, 'unixepoch') AS day, SUM(realized_pnl), SUM(fee), COUNT(*), "
+               "SUM(side = 'ask'), SUM(side = 'ask' AND realized_pnl > 0) "
+               f"FROM trades{where} GROUP BY day ORDER BY day")
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=['day', 'realized_pnl', 'fees', 'trades', 'closed', 'wins']).set_index('day')
+
+    def summary(self, symbol=None, start=None, end=None):
+        """
+        Aggregates over executed trades (signals without a fill are left out).
+        :return: dict with trades, closed (sells), wins, win_rate, realized_pnl (after fees),
+                 fees, bought and sold (KRW)
+        """
+        where, params = self._where(symbol, start, end, ["realized_pnl IS NOT NULL"])
+        sql = ("SELECT COUNT(*), COALESCE(SUM(side = 'ask'), 0), COALESCE(SUM(side = 'ask' AND realized_pnl > 0), 0), "
+               "COALESCE(SUM(realized_pnl), 0), COALESCE(SUM(fee), 0), "
+               "COALESCE(SUM(CASE WHEN side = 'bid' THEN total_value END), 0), "
+               "COALESCE(SUM(CASE WHEN side = 'ask' THEN total_value END), 0) "
+               f"FROM trades{where}")
+        with self.lock:
+            trades, closed, wins, pnl, fees, bought, sold = self.conn.execute(sql, params).fetchone()
+        return {'trades': trades, 'closed': closed, 'wins': wins, 'win_rate': wins / closed if closed else None,
+                'realized_pnl': pnl, 'fees': fees, 'bought': bought, 'sold': sold}
+
+    def latest_balance(self, symbol):
+        """Last recorded coin balance of a symbol (the local counterpart of NotionManager.read_position_data)."""
+        with self.lock:
+            row = self.conn.execute("SELECT coin_balance FROM balances WHERE symbol = ? ORDER BY ts DESC LIMIT 1",
+                                    (symbol,)).fetchone()
+        return row[0] if row else 0
+
+
+def _value(value):
+    """SQLite-storable value: timestamps as ISO text, numpy scalars as Python numbers."""
+    if isinstance(value, (datetime.datetime, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _epoch(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('Asia/Seoul')
+    return timestamp.timestamp()
@@ -0,0 +1,116 @@
+# ttl_cache.py
+import time
+import threading
+from concurrent.futures import Future
+
+
+class TTLCache:
+    def __init__(self, ttls=None, default_ttl=0.0):
+        """
+        Per-endpoint TTL cache with single-flight loading.
+        Concurrent requests for the same (endpoint, key) share one load: the first caller runs
+        the loader and the others wait for its result instead of sending the same request again.
+        Failed loads are not cached; every waiting caller gets the exception.
+        :param ttls: dict endpoint -> seconds a value stays fresh
+        :param default_ttl: TTL for endpoints not listed in ttls (0 keeps nothing, only de-duplicates)
+        """
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.values = {}
+        self.in_flight = {}
+        self.generations = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def ttl(self, endpoint):
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def _count(self, endpoint, counter):
+        counts = self.counters.get(endpoint)
+        if counts is None:
+            counts = self.counters[endpoint] = {'hits': 0, 'misses': 0, 'shared': 0, 'errors': 0}
+        counts[counter] += 1
+
+    def _store(self, endpoint, key, value):
+        ttl = self.ttl(endpoint)
+        if ttl > 0:
+            self.values[(endpoint, key)] = (value, time.monotonic() + ttl)
+
+    def lookup(self, endpoint, key):
+        """Fresh cached value (counted as a hit) or None, without loading anything."""
+        with self.lock:
+            entry = self.values.get((endpoint, key))
+            if entry is not None and entry[1] > time.monotonic():
+                self._count(endpoint, 'hits')
+                return entry[0]
+        return None
+
+    def put(self, endpoint, key, value):
+        with self.lock:
+            self._store(endpoint, key, value)
+
+    def get(self, endpoint, key, loader):
+        """
+        Returns the cached value for (endpoint, key), or loads it with loader().
+        :param loader: function without arguments doing the actual request
+        :return: the value
+        """
+        cache_key = (endpoint, key)
+        with self.lock:
+            entry = self.values.get(cache_key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._count(endpoint, 'hits')
+                return entry[0]
+            future = self.in_flight.get(cache_key)
+            owner = future is None
+            if owner:
+                self._count(endpoint, 'misses')
+                future = self.in_flight[cache_key] = Future()
+                generation = self.generations.get(endpoint, 0)
+            else:
+                self._count(endpoint, 'shared')
+        if not owner:
+            # someone is already loading this: wait for that request instead of sending another
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as x:
+            with self.lock:
+                self._count(endpoint, 'errors')
+                if self.in_flight.get(cache_key) is future:
+                    del self.in_flight[cache_key]
+            future.set_exception(x)
+            raise
+        with self.lock:
+            # a load that started before an invalidation may hold pre-fill data: hand it to the
+            # callers that were waiting for it, but do not keep it
+            if self.generations.get(endpoint, 0) == generation:
+                self._store(endpoint, key, value)
+            if self.in_flight.get(cache_key) is future:
+                del self.in_flight[cache_key]
+        future.set_result(value)
+        return value
+
+    def invalidate(self, endpoint=None):
+        """Drops the cached values of one endpoint (or all of them); loads in flight are not reused."""
+        with self.lock:
+            endpoints = [endpoint] if endpoint is not None else {k[0] for k in self.values} | {k[0] for k in self.in_flight}
+            for name in endpoints:
+                self.generations[name] = self.generations.get(name, 0) + 1
+            for cache_key in [k for k in self.values if endpoint is None or k[0] == endpoint]:
+                del self.values[cache_key]
+            for cache_key in [k for k in self.in_flight if endpoint is None or k[0] == endpoint]:
+                del self.in_flight[cache_key]
+
+    def stats(self):
+        """
+        :return: dict endpoint -> hits, misses (requests sent), shared (callers that joined a request
+                 already in flight), errors and hit_rate (share of calls that sent no request)
+        """
+        with self.lock:
+            stats = {endpoint: dict(counts) for endpoint, counts in self.counters.items()}
+        for counts in stats.values():
+            calls = counts['hits'] + counts['misses'] + counts['shared']
+            counts['hit_rate'] = round((counts['hits'] + counts['shared']) / calls, 3) if calls else None
+        return stats
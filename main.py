@@ -1,139 +1,370 @@
-# main.py 
-import pandas as pd
-import numpy as np  
-import pyupbit
-import time 
-import datetime
-import schedule
-import os
-import signal
-from dotenv import load_dotenv
-from classes.data_manager import DataManager
-from classes.position_manager import PositionManager    
-from classes.strategy_manager import StrategyManager
-from classes.indicator_manager import IndicatorManager
-from classes.notion_manager import NotionManager
-from classes.slack_manager import SlackManager
-
-# Global variable to control the bot's execution
-running = True
-
-# Global variables for manager instances
-data_manager = None
-indicator_manager = None
-position_manager = None
-strategy_manager = None
-notion_manager = None
-slack_manager = None
-
-def signal_handler(signum, frame):
-    global running
-    print("Received termination signal. Stopping the bot...")
-    running = False
-
-def initialize_bot():
-    global data_manager, indicator_manager, position_manager, strategy_manager, notion_manager, slack_manager
-
-    # load sensitive api stored in the env file for the further process
-    load_dotenv(dotenv_path=os.path.join("config",".env"))
-    access_key = os.getenv("ACCESS_KEY")
-    secret_key = os.getenv("SECRET_KEY")
-    ticker = "KRW-BTC"
-    interval = "minute30"
-    count = 300
-    max_loss_pct = 0.05
-
-    # assign class function and ready to use method in the classes
-    data_manager = DataManager(access_key=access_key, secret_key=secret_key,ticker=ticker,interval=interval,count=count)
-    indicator_manager = IndicatorManager(window=20,span=10,multiplier=2)
-    position_manager = PositionManager()
-    strategy_manager = StrategyManager() 
-    notion_manager = NotionManager()
-    slack_manager = SlackManager(
-        webhook_url=os.getenv("SLACK_WEBHOOK_URL")
-    )
-
-    # Record initial account balance
-    initial_balance = data_manager.get_account_balance()
-    initial_coins = data_manager.get_coin_balance()
-    coin_balance = int(initial_coins.loc[initial_coins.index[0], 'coin_balance'])
-    current_price = int(initial_coins.loc[initial_coins.index[0], 'current_price'])
-    notion_manager.record_account_balance(int(initial_balance), initial_coins.index[0], coin_balance, current_price)
-
-    print(f"Bot initialized at {datetime.datetime.now()}.")
-    slack_manager.send_message(f"Bot initialized at {datetime.datetime.now()}. Initial balance: {initial_balance} KRW, Current price: {current_price} KRW.")
-
-def run_bot():
-    global data_manager, indicator_manager, position_manager, strategy_manager, notion_manager, slack_manager
-
-    ticker = "KRW-BTC"
-    interval = "minute30"
-    count = 300
-    max_loss_pct = 0.05
-
-    # get historical data per input arguments
-    prices = data_manager.get_historical_data(ticker,interval,count)
-    # Calculate indicators
-    indicators = indicator_manager.calculate_indicator(prices)
-    # Calculate Kelly value and initial investment amount
-    kelly = position_manager.kelly_fraction()
-    initial_balance = data_manager.get_account_balance()
-    initial_coins = data_manager.get_coin_balance()
-    invested_amount = initial_balance * kelly
-    entry_data = strategy_manager.entry_condition(indicators) 
-    exit_data = strategy_manager.exit_condition(entry_data)
-        
-    coin_balance = int(initial_coins.loc[initial_coins.index[0], 'coin_balance'])
-    current_price = int(initial_coins.loc[initial_coins.index[0], 'current_price'])
-    max_loss = int(current_price*max_loss_pct)
-
-    # execution trades
-    trade_log = position_manager.execution_trade(data_manager,entry_data,exit_data,invested_amount,coin_balance,max_loss)
-    
-    # Check if a new position (long or short) was opened and update Notion
-    if isinstance(trade_log, pd.DataFrame) and not trade_log.empty:
-        trade_type = trade_log['type'].iloc[0]
-        if trade_type in ['long', 'short']:
-            updated_balance = data_manager.get_account_balance()
-            updated_coins = data_manager.get_coin_balance()
-            updated_coin_balance = int(updated_coins.loc[updated_coins.index[0], 'coin_balance'])
-            updated_current_price = int(updated_coins.loc[updated_coins.index[0], 'current_price'])
-            notion_manager.record_account_balance(int(updated_balance), updated_coins.index[0], updated_coin_balance, updated_current_price)
-            print(f"New {trade_type} position opened. Updated Notion with new account balance.")
-    
-    # Create trade log in Notion
-    notion_manager.create_trade_log(trade_log)
-    
-    slack_manager.send_message(f"Bot running completed at {datetime.datetime.now()}. Current price: {current_price} KRW, Invested amount: {invested_amount} KRW.")
-
-def time_until_next_30min():
-    now = datetime.datetime.now()
-    minutes_to_next = 30 - (now.minute % 30)
-    seconds_to_next = minutes_to_next * 60 - now.second
-    return seconds_to_next
-
-def main():
-    global running
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-
-    print("Bot starting. Press Ctrl+C to stop.")
-    
-    initialize_bot()
-
-    while running:
-        run_bot()
-        wait_time = time_until_next_30min()
-        minutes, seconds = divmod(wait_time, 60)
-        
-        print(f"Waiting for {minutes} minutes and {seconds} seconds until next execution. Current time: {datetime.datetime.now()}")
-        
-        for _ in range(wait_time):
-            if not running:
-                break
-            time.sleep(1)  # Sleep for 1 second, check running status every second
-
-    print("Bot terminated.")
-
-if __name__ == "__main__":
-    main()
+# main.py 
+import time 
+# reference point for the time-to-first-decision report
+STARTED = time.perf_counter()
+import datetime
+import os
+import signal
+import sys
+from dotenv import load_dotenv
+from classes.data_manager import DataManager
+from classes.position_manager import PositionManager    
+from classes.strategy_manager import StrategyManager
+from classes.indicator_manager import IndicatorManager
+from classes.candle_store import CandleStore, INTERVAL_SECONDS, KST_OFFSET
+from classes.candle_buffer import CandleBuffer
+from classes.metrics_manager import MetricsManager
+from classes.execution_engine import ExecutionEngine
+from classes.position_ledger import PositionLedger
+from classes.kelly_sizer import KellySizer
+from classes.deferred_sink import DeferredSink
+from classes.trade_journal import TradeJournal
+from classes.candle_scheduler import CandleScheduler
+# NotionManager, SlackManager and the stream/portfolio/replay modules are imported where they are used
+
+# Global variable to control the bot's execution
+running = True
+
+# Global variables for manager instances
+data_manager = None
+indicator_manager = None
+position_manager = None
+strategy_manager = None
+journal = None
+slack_manager = None
+stream_manager = None
+metrics_manager = None
+scheduler = None
+# set once the first decision has been made and the start-up records were written
+startup_pending = True
+
+def signal_handler(signum, frame):
+    global running
+    print("Received termination signal. Stopping the bot...")
+    running = False
+    if stream_manager is not None:
+        stream_manager.stop()
+    if scheduler is not None:
+        scheduler.stop()
+
+def initialize_bot():
+    global data_manager, indicator_manager, position_manager, strategy_manager, journal, slack_manager, metrics_manager
+
+    # load sensitive api stored in the env file for the further process
+    load_dotenv(dotenv_path=os.path.join("config",".env"))
+    access_key = os.getenv("ACCESS_KEY")
+    secret_key = os.getenv("SECRET_KEY")
+    ticker = "KRW-BTC"
+    interval = "minute30"
+    count = 300
+    max_loss_pct = 0.05
+
+    # assign class function and ready to use method in the classes
+    # candles are kept in shared columns and read as views; CANDLE_DTYPE=float32 halves their memory
+    data_manager = DataManager(access_key=access_key, secret_key=secret_key,ticker=ticker,interval=interval,count=count,
+                               candle_store=CandleStore(os.path.join("data","candles")),
+                               candle_buffer=CandleBuffer(dtype=os.getenv("CANDLE_DTYPE", "float64")))
+    indicator_manager = IndicatorManager(window=20,span=10,multiplier=2)
+    # MAX_ORDER_KRW splits larger orders into slices to limit slippage
+    max_order_krw = os.getenv("MAX_ORDER_KRW")
+    position_manager = PositionManager(execution_engine=ExecutionEngine(
+        data_manager, max_slice_krw=float(max_order_krw) if max_order_krw else None),
+        ledger=PositionLedger(os.path.join("data","positions.db")), sizer=KellySizer())
+    strategy_manager = StrategyManager() 
+    # trades, balances and signals go to the local journal; Notion (when configured) is a mirror of it.
+    # remote sinks connect in the background; calls made before they are ready are queued
+    journal = TradeJournal(os.path.join("data","journal.db"),
+                           mirror=DeferredSink(connect_notion, "notion") if os.getenv("NOTION_API_KEY") else None)
+    slack_manager = DeferredSink(connect_slack, "slack")
+    # set PROFILE_SLOW_CYCLE_MS to keep a sampled profile of every cycle slower than that
+    slow_cycle_ms = os.getenv("PROFILE_SLOW_CYCLE_MS")
+    metrics_manager = MetricsManager(path=os.path.join("logs","metrics.jsonl"),
+                                     profile_dir=os.path.join("logs","profiles") if slow_cycle_ms else None,
+                                     slow_cycle_ms=float(slow_cycle_ms) if slow_cycle_ms else None)
+
+    # candles come back from the local CandleStore and positions from the ledger, so the first
+    # decision only needs one snapshot request; the initial balance is recorded from that snapshot
+    open_positions = position_manager.ledger.open_positions()
+    print(f"Bot initialized at {datetime.datetime.now()} ({time.perf_counter() - STARTED:.2f}s after start), "
+          f"{len(open_positions)} open positions restored from the ledger.")
+
+def connect_notion():
+    from classes.notion_manager import NotionManager
+    return NotionManager(outbox_path=os.path.join("data","notion_outbox.db"))
+
+def connect_slack():
+    from classes.slack_manager import SlackManager
+    return SlackManager(webhook_url=os.getenv("SLACK_WEBHOOK_URL"))
+
+def record_startup(snapshot, ticker):
+    # start-up records, written after the first decision from the snapshot that decision used
+    global startup_pending
+    startup_pending = False
+    first_decision = time.perf_counter() - STARTED
+    metrics_manager.record("time_to_first_decision", first_decision * 1000)
+    initial_balance = snapshot.krw_balance
+    coin_balance = snapshot.coin_balance(ticker)
+    current_price = int(snapshot.current_price(ticker))
+    journal.record_account_balance(int(initial_balance), ticker, coin_balance, current_price)
+    print(f"First decision made {first_decision:.2f}s after start.")
+    slack_manager.send_message(f"Bot initialized at {datetime.datetime.now()}. Initial balance: {initial_balance} KRW, Current price: {current_price} KRW. First decision {first_decision:.2f}s after start.")
+
+def run_bot():
+    global data_manager, indicator_manager, position_manager, strategy_manager, journal, slack_manager, metrics_manager
+
+    ticker = "KRW-BTC"
+    interval = "minute30"
+    count = 300
+    max_loss_pct = 0.05
+
+    # candles, balances and the current price are fetched concurrently in one snapshot
+    with metrics_manager.span("fetch"):
+        snapshot = data_manager.get_snapshot([ticker], interval, count)
+        prices = snapshot.candles[ticker]
+    if startup_pending and position_manager.ledger is not None:
+        # the ledger is the source of truth for holdings; align it with the exchange once at start-up
+        position_manager.ledger.reconcile(ticker, snapshot.coin_balance(ticker), snapshot.current_price(ticker))
+    # Calculate indicators (fused NumPy kernel shared with the backtester, ATR included)
+    with metrics_manager.span("indicators"):
+        indicators = indicator_manager.calculate_fused(prices['high'], prices['low'], prices['close'],
+                                                       strategy_manager.atr_period)
+    # Calculate Kelly value and initial investment amount
+    kelly = position_manager.kelly_fraction(ticker)
+    initial_balance = snapshot.krw_balance
+    invested_amount = initial_balance * kelly
+    with metrics_manager.span("signals"):
+        signal = strategy_manager.signal(indicators, index=prices.index)
+    if scheduler is not None and scheduler.boundary is not None:
+        metrics_manager.record("close_to_decision", (time.time() - scheduler.boundary) * 1000)
+        
+    coin_balance = position_manager.holding(ticker, snapshot)
+    current_price = int(snapshot.current_price(ticker))
+    # max-loss exit: the position is max_loss_pct below its entry price (same rule as the backtest)
+    max_loss = position_manager.max_loss_price(ticker, max_loss_pct)
+
+    # execution trades
+    with metrics_manager.span("execution"):
+        trade_log = position_manager.execution_trade(data_manager,signal,None,invested_amount,coin_balance,max_loss)
+    if startup_pending:
+        record_startup(snapshot, ticker)
+    
+    # Check if a new position (long or short) was opened and update the journal
+    with metrics_manager.span("journal"):
+        # only an order that executed changes the balances; skipped and rejected ones do not
+        if trade_log is not None and trade_log.executed:
+            # the fill invalidated the cached balances; the price is still served from the cache
+            updated = data_manager.get_snapshot([ticker], candles=False)
+            updated_balance = updated.krw_balance
+            updated_coin_balance = updated.coin_balance(ticker)
+            updated_current_price = int(updated.current_price(ticker))
+            journal.record_account_balance(int(updated_balance), ticker, updated_coin_balance, updated_current_price)
+            action = "New long position opened" if trade_log.side == 'bid' else "Position sold"
+            print(f"{action}. Journaled the new account balance.")
+    
+        # Create trade log (and the signal behind it) in the journal
+        journal.record_signal(ticker, signal)
+        journal.create_trade_log(trade_log)
+        if position_manager.position_changed:
+            position = position_manager.ledger.position(ticker)
+            position_manager.ledger.mark(ticker, current_price)
+            journal.create_position_log(position.to_log())
+    
+    with metrics_manager.span("notify"):
+        slack_manager.send_message(f"Bot running completed at {datetime.datetime.now()}. Current price: {current_price} KRW, Invested amount: {invested_amount} KRW.")
+
+def main():
+    global running, scheduler
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    print("Bot starting. Press Ctrl+C to stop.")
+    
+    initialize_bot()
+    ticker = "KRW-BTC"
+    interval = "minute30"
+    # wakes at the candle close and runs as soon as the exchange has the next candle open
+    scheduler = CandleScheduler(interval, probe=lambda boundary: data_manager.candle_closed(ticker, interval, boundary),
+                                metrics_manager=metrics_manager)
+
+    while running:
+        try:
+            with metrics_manager.cycle():
+                run_bot()
+        except Exception as x:
+            # a cycle that failed after the request retries is skipped; the bot carries on at the next candle
+            print(f"Cycle failed at {datetime.datetime.now()} ({x.__class__.__name__}: {x}); waiting for the next candle.")
+        print(f"Waiting for the candle closing at {datetime.datetime.fromtimestamp(scheduler.next_boundary())}. "
+              f"Current time: {datetime.datetime.now()}")
+        if scheduler.wait() is None:
+            break
+
+    journal.close()
+    slack_manager.close()
+    metrics_manager.dump()
+    print(f"Exchange data cache: {data_manager.cache_stats()}")
+    print(f"Candle buffer: {data_manager.candle_buffer.memory()['total'] / 2**20:.1f} MB")
+    print("Bot terminated.")
+
+def record_stream_trade(trade_log):
+    journal.create_trade_log(trade_log)
+    slack_manager.send_message(f"Stream {trade_log['type']} executed at {trade_log['timestamp']}. Price: {trade_log['price']} KRW, Quantity: {trade_log['quantity']}.")
+
+def main_stream():
+    # event-driven mode: stops are checked on every trade tick, signals on every candle close
+    global stream_manager
+    from classes.stream_manager import StreamManager, UpbitTradeFeed
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    print("Bot starting in streaming mode. Press Ctrl+C to stop.")
+
+    initialize_bot()
+
+    ticker = "KRW-BTC"
+    interval = "minute30"
+    count = 300
+    max_loss_pct = 0.05
+
+    # CONFIRM_INTERVAL (e.g. minute60) confirms long entries on a higher timeframe built from the same trades
+    confirm_interval = os.getenv("CONFIRM_INTERVAL") or None
+
+    snapshot = data_manager.get_snapshot([ticker], interval, count)
+    position_manager.ledger.reconcile(ticker, snapshot.coin_balance(ticker), snapshot.current_price(ticker))
+    stream_manager = StreamManager(data_manager, indicator_manager, strategy_manager, position_manager,
+                                   ticker=ticker, interval=interval, max_loss_pct=max_loss_pct,
+                                   on_trade=record_stream_trade, confirm_interval=confirm_interval)
+    # the higher timeframe's history is fetched once; afterwards it is aggregated from the trade feed
+    confirm_prices = data_manager.get_candles(ticker, confirm_interval, count) if confirm_interval else None
+    stream_manager.warm_up(snapshot.candles[ticker], snapshot, confirm_prices)
+    record_startup(snapshot, ticker)
+    stream_manager.run(UpbitTradeFeed(ticker))
+
+    print(f"Tick-to-order latency (ms): {stream_manager.latency_stats()}")
+    journal.close()
+    slack_manager.close()
+    print("Bot terminated.")
+
+def run_portfolio_cycle(portfolio_manager):
+    # evaluates and trades every ticker, then journals the signals and trades of the cycle
+    trade_logs = portfolio_manager.run_cycle()
+    cycle = portfolio_manager.last_cycle
+    if scheduler is not None and scheduler.boundary is not None:
+        metrics_manager.record("close_to_decision", (cycle['decided_at'] - scheduler.boundary) * 1000)
+    if startup_pending:
+        record_startup(cycle['snapshot'], portfolio_manager.tickers[0])
+    with metrics_manager.span("journal"):
+        for ticker, signal in cycle['evaluations'].items():
+            journal.record_signal(ticker, signal)
+        for ticker, trade_log in trade_logs.items():
+            journal.create_trade_log(trade_log)
+            if ticker in cycle['changed']:
+                position = position_manager.ledger.position(ticker)
+                position_manager.ledger.mark(ticker, cycle['snapshot'].current_price(ticker))
+                journal.create_position_log(position.to_log())
+    with metrics_manager.span("notify"):
+        slack_manager.send_message(f"Portfolio cycle completed at {datetime.datetime.now()}. "
+                                   f"{cycle['evaluated']}/{cycle['tickers']} tickers evaluated in {cycle['cycle_seconds']:.2f}s, "
+                                   f"signals: {cycle['signals']}")
+
+def main_portfolio():
+    # runs the strategy over every market in TICKERS (comma separated) on a shared request budget
+    global running, scheduler
+    from classes.portfolio_manager import PortfolioManager
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    print("Bot starting in portfolio mode. Press Ctrl+C to stop.")
+
+    initialize_bot()
+
+    tickers = [t.strip() for t in os.getenv("TICKERS", "KRW-BTC").split(",") if t.strip()]
+    # the first ticker's candle tells when the close is final; the others use the same boundary
+    scheduler = CandleScheduler("minute30", probe=lambda boundary: data_manager.candle_closed(tickers[0], "minute30", boundary),
+                                metrics_manager=metrics_manager)
+    portfolio_manager = PortfolioManager(data_manager, indicator_manager, strategy_manager, position_manager,
+                                         tickers=tickers, interval="minute30", count=300, max_loss_pct=0.05)
+    snapshot = data_manager.get_snapshot(tickers, candles=False)
+    for ticker in tickers:
+        position_manager.ledger.reconcile(ticker, snapshot.coin_balance(ticker), snapshot.current_price(ticker))
+
+    while running:
+        try:
+            with metrics_manager.cycle("portfolio_cycle"):
+                run_portfolio_cycle(portfolio_manager)
+        except Exception as x:
+            print(f"Portfolio cycle failed at {datetime.datetime.now()} ({x.__class__.__name__}: {x}); waiting for the next candle.")
+        if scheduler.wait() is None:
+            break
+
+    portfolio_manager.close()
+    journal.close()
+    slack_manager.close()
+    metrics_manager.dump()
+    print(f"Exchange data cache: {data_manager.cache_stats()}")
+    print(f"Candle buffer: {data_manager.candle_buffer.memory()['total'] / 2**20:.1f} MB")
+    print("Bot terminated.")
+
+def main_replay(ticks_path=None, days=30):
+    # paper trading: the polling loop runs against a SimulatedExchange at every candle boundary
+    global data_manager, indicator_manager, position_manager, strategy_manager, journal, slack_manager, metrics_manager
+    from classes.simulated_exchange import SimulatedExchange, SimulatedDataManager, PaperJournal
+
+    ticker = "KRW-BTC"
+    interval = "minute30"
+    count = 300
+    step = INTERVAL_SECONDS[interval]
+
+    if ticks_path:
+        exchange = SimulatedExchange.from_csv(ticks_path, ticker=ticker)
+    else:
+        # synthetic ticks: `count` candles of history before the replayed period
+        exchange = SimulatedExchange.synthetic([ticker], days=days + count * step / 86400)
+    start_equity = exchange.equity()
+
+    data_manager = SimulatedDataManager(exchange, ticker=ticker, interval=interval, count=count,
+                                        candle_buffer=CandleBuffer(dtype=os.getenv("CANDLE_DTYPE", "float64")))
+    indicator_manager = IndicatorManager(window=20,span=10,multiplier=2)
+    position_manager = PositionManager(execution_engine=ExecutionEngine(data_manager), ledger=PositionLedger(":memory:"),
+                                       sizer=KellySizer(seed=0))
+    strategy_manager = StrategyManager()
+    journal = TradeJournal(":memory:", clock=lambda: exchange.now)
+    slack_manager = PaperJournal()
+    metrics_manager = MetricsManager(path=os.path.join("logs","replay_metrics.jsonl"), dump_interval=float("inf"))
+
+    # first decision once `count` candles have closed, one second after every candle boundary
+    first = exchange.start(ticker) + count * step
+    boundary = (first + KST_OFFSET) // step * step - KST_OFFSET + step
+    started = time.perf_counter()
+    cycles = 0
+    while boundary + 1 <= exchange.end(ticker) and running:
+        exchange.advance(boundary + 1)
+        with metrics_manager.cycle():
+            run_bot()
+        cycles += 1
+        boundary += step
+    elapsed = time.perf_counter() - started
+
+    end_equity = exchange.equity()
+    print(f"Replayed {cycles} cycles ({cycles * step / 86400:.1f} days) in {elapsed:.1f}s "
+          f"({cycles / elapsed:.0f} cycles/s).")
+    print(f"Orders: {len(exchange.orders)}, trade logs: {len(journal.query('trades'))}, "
+          f"equity: {start_equity:,.0f} -> {end_equity:,.0f} KRW ({(end_equity / start_equity - 1) * 100:+.2f}%).")
+    ledger = position_manager.ledger
+    ledger.mark(ticker, exchange.get_current_price(ticker))
+    print(f"Ledger: {ledger.position(ticker)}, realized P&L {ledger.realized_pnl():,.0f} KRW, "
+          f"unrealized {ledger.unrealized_pnl():,.0f} KRW.")
+    print(f"Journal: {journal.summary()}")
+    print(f"Cycle latency (ms): {metrics_manager.summary(cumulative=True).get('cycle')}")
+    return exchange
+
+if __name__ == "__main__":
+    if "--stream" in sys.argv:
+        main_stream()
+    elif "--portfolio" in sys.argv:
+        main_portfolio()
+    elif "--replay" in sys.argv:
+        # python main.py --replay [ticks.csv]: a recorded KRW-BTC tick file, or 30 synthetic days
+        args = sys.argv[sys.argv.index("--replay") + 1:]
+        main_replay(args[0] if args else None)
+    else:
+        main()
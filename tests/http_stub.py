@@ -0,0 +1,36 @@
+# http_stub.py
+# requests adapter answering from a script, mounted on a session in place of a remote service.
+import json
+import requests
+from requests.adapters import BaseAdapter
+
+
+class ScriptedAdapter(BaseAdapter):
+    """Answers every request with the next (status, body, headers) of a script; the last one repeats."""
+    def __init__(self, script):
+        super().__init__()
+        self.script = list(script)
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        status, body, headers = self.script.pop(0) if len(self.script) > 1 else self.script[0]
+        if callable(body):
+            body = body(request)
+        response = requests.Response()
+        response.status_code = status
+        response._content = body if isinstance(body, bytes) else json.dumps(body).encode()
+        response.headers.update(headers or {})
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class UpbitClient:
+    """Stands in for pyupbit.Upbit where DataManager only needs the auth headers."""
+    @staticmethod
+    def _request_headers(query=None):
+        return {'Authorization': 'Bearer test'}
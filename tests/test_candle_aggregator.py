@@ -0,0 +1,72 @@
+# test_candle_aggregator.py
+import numpy as np
+import pandas as pd
+import pytest
+from classes.candle_aggregator import CandleAggregator
+from classes.candle_store import KST_OFFSET
+
+OHLCV = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+
+def minutes(start='2024-01-01 05:00', end='2024-01-04 09:00', seed=0):
+    """1-minute candles indexed by KST start time, from a time that is not on any day boundary."""
+    index = pd.date_range(start, end, freq='1min', inclusive='left', unit='ns')
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(len(index)).cumsum()
+    open_ = np.r_[close[0], close[:-1]]
+    spread = rng.random(len(index))
+    return pd.DataFrame({'open': open_, 'high': np.maximum(open_, close) + spread,
+                         'low': np.minimum(open_, close) - spread, 'close': close,
+                         'volume': rng.random(len(index))}, index=index)
+
+
+def epoch(index):
+    return index.values.astype('datetime64[s]').astype(np.int64) - KST_OFFSET
+
+
+@pytest.mark.parametrize("interval,rule,offset", [('minute5', '5min', None), ('minute30', '30min', None),
+                                                  ('minute60', '60min', None), ('day', '24h', '9h')])
+def test_minute_candles_aggregate_like_pandas_resample(interval, rule, offset):
+    df = minutes()
+    aggregator = CandleAggregator([interval], capacity=2000)
+    for start, row in zip(epoch(df.index), df.itertuples()):
+        aggregator.add_candle(start, row.open, row.high, row.low, row.close, row.volume)
+
+    # Upbit's day candle runs from 09:00 to 09:00 KST (midnight UTC)
+    expected = df.resample(rule, offset=offset).agg(OHLCV)
+    actual = aggregator.frame(interval, include_forming=False)
+    assert aggregator.forming[interval] is None
+    np.testing.assert_array_equal(actual.index.values, expected.index.values)
+    np.testing.assert_allclose(actual[list(OHLCV)].to_numpy(), expected[list(OHLCV)].to_numpy(), rtol=1e-12)
+
+
+def test_day_boundary_is_nine_in_the_morning_kst():
+    df = minutes()
+    aggregator = CandleAggregator(['day'])
+    for start, row in zip(epoch(df.index), df.itertuples()):
+        aggregator.add_candle(start, row.open, row.high, row.low, row.close, row.volume)
+    days = aggregator.frame('day', include_forming=False)
+    assert list(days.index.strftime('%Y-%m-%d %H:%M')) == ['2023-12-31 09:00', '2024-01-01 09:00',
+                                                          '2024-01-02 09:00', '2024-01-03 09:00']
+    # the 08:59 candle still belongs to the previous day, the 09:00 candle opens the next one
+    assert days['close'].iloc[1] == df.loc['2024-01-02 08:59', 'close']
+    assert days['open'].iloc[2] == df.loc['2024-01-02 09:00', 'open']
+
+
+def test_ticks_aggregate_like_pandas_resample():
+    rng = np.random.default_rng(1)
+    timestamps = np.sort(rng.uniform(0, 3 * 3600, 5000)) + 1704067200
+    prices = 100 + rng.standard_normal(5000).cumsum()
+    volumes = rng.random(5000)
+    aggregator = CandleAggregator(['minute5'], capacity=100)
+    for timestamp, price, volume in zip(timestamps, prices, volumes):
+        aggregator.add_tick(timestamp, price, volume)
+    aggregator.advance(timestamps[-1] + 300)
+
+    index = pd.to_datetime(timestamps + KST_OFFSET, unit='s')
+    ticks = pd.DataFrame({'open': prices, 'high': prices, 'low': prices, 'close': prices, 'volume': volumes},
+                         index=index)
+    expected = ticks.resample('5min').agg(OHLCV).dropna()
+    actual = aggregator.frame('minute5', include_forming=False)
+    np.testing.assert_array_equal(actual.index.values.astype('datetime64[s]'), expected.index.values.astype('datetime64[s]'))
+    np.testing.assert_allclose(actual[list(OHLCV)].to_numpy(), expected[list(OHLCV)].to_numpy(), rtol=1e-12)
@@ -0,0 +1,80 @@
+# test_candle_buffer.py
+import numpy as np
+import pandas as pd
+import pytest
+from classes.candle_buffer import CandleBuffer, CandleColumns
+from classes.candle_store import KST_OFFSET
+
+FIELDS = list(CandleColumns.fields)
+
+
+def ohlcv(n, start='2024-01-01 09:00', seed=0):
+    """get_ohlcv-shaped frame: n candles indexed by KST start time, the last one forming."""
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(n).cumsum()
+    index = pd.date_range(start, periods=n, freq='30min', unit='ns')
+    return pd.DataFrame({'open': close - 0.5, 'high': close + 1, 'low': close - 1, 'close': close,
+                         'volume': rng.random(n)}, index=index)
+
+
+def test_rows_stay_in_order_when_the_window_moves():
+    series = CandleColumns(capacity=10, slack=0.2)
+    for i in range(57):
+        series.append_row(i * 60, i, i + 1, i - 1, i + 0.5, 1.0)
+        assert list(series.column('open')) == list(range(max(0, i - 9), i + 1))
+    starts, values = series.arrays()
+    assert list(starts) == [i * 60 for i in range(47, 57)]
+    assert values.shape == (10, 5) and list(values[:, 0]) == list(range(47, 57))
+    assert list(series.column('close', n=3)) == [54.5, 55.5, 56.5]
+
+
+def test_views_are_zero_copy_and_see_the_forming_candle_close():
+    series = CandleColumns(capacity=10)
+    for i in range(5):
+        series.append_row(i * 60, i, i, i, i, 1.0)
+    series.set_forming(300, 5, 6, 4, 5.5, 0.5)
+    view = series.view(3, include_forming=True)
+    assert np.shares_memory(view['close'], series.values)
+    assert list(view['close']) == [3, 4, 5.5]
+    with pytest.raises(ValueError):
+        view['close'][0] = 0.0
+
+    # the forming candle closes with its final values and the open view shows them
+    series.append_row(300, 5, 7, 4, 6.5, 2.0)
+    assert list(view['close']) == [3, 4, 6.5] and view['high'][-1] == 7
+    # later appends show up in the next view; a view of the old window keeps its rows
+    for i in range(6, 30):
+        series.append_row(i * 60, i, i, i, i, 1.0)
+    assert list(series.view(3)['close']) == [27, 28, 29]
+    assert list(view['close']) == [3, 4, 6.5]
+
+
+def test_frames_match_the_dataframe_path():
+    buffer = CandleBuffer(capacity=200)
+    full = ohlcv(400)
+    # a bootstrap fetch, then overlapping delta fetches whose forming candle closes in the next one
+    buffer.update('KRW-BTC', 'minute30', full.iloc[:300])
+    for end in range(302, 401, 2):
+        assert buffer.update('KRW-BTC', 'minute30', full.iloc[end - 3:end]) == 2
+
+    view = buffer.view('KRW-BTC', 'minute30', count=150)
+    expected = full.iloc[-150:]
+    pd.testing.assert_frame_equal(view.to_frame(), expected[FIELDS], check_freq=False)
+    assert list(view.index) == list(expected.index)
+    assert len(view) == 150 and not view.empty
+    np.testing.assert_array_equal(view['close'], expected['close'].to_numpy())
+    # closed candles only: the forming one is left out
+    closed = buffer.view('KRW-BTC', 'minute30', count=5, include_forming=False).to_frame()
+    pd.testing.assert_frame_equal(closed, full.iloc[-6:-1][FIELDS], check_freq=False)
+
+
+def test_float32_buffer_stays_close_to_the_prices():
+    buffer = CandleBuffer(capacity=100, dtype='float32')
+    df = ohlcv(50) * 1000
+    df.index = ohlcv(50).index
+    buffer.update('KRW-BTC', 'minute30', df)
+    frame = buffer.view('KRW-BTC', 'minute30').to_frame()
+    assert frame['close'].dtype == np.float32
+    np.testing.assert_allclose(frame.to_numpy(), df[FIELDS].to_numpy(), rtol=1e-6)
+    starts = buffer.columns('KRW-BTC', 'minute30').arrays(include_forming=True)[0]
+    assert starts[0] == pd.Timestamp('2024-01-01 09:00').value // 10**9 - KST_OFFSET
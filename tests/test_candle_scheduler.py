@@ -0,0 +1,42 @@
+# test_candle_scheduler.py
+import threading
+import time
+import pytest
+from classes import candle_scheduler
+from classes.candle_scheduler import CandleScheduler
+
+
+class ShiftedClock:
+    """time module stand-in whose wall clock can be stepped; monotonic stays real."""
+
+    def __init__(self):
+        self.offset = 0.0
+        self.monotonic = time.monotonic
+
+    def time(self):
+        return time.time() + self.offset
+
+
+@pytest.mark.parametrize("step", [60.0, -60.0])
+def test_wall_clock_step_while_sleeping_does_not_move_the_wake_up(monkeypatch, step):
+    clock = ShiftedClock()
+    monkeypatch.setattr(candle_scheduler, "time", clock)
+    scheduler = CandleScheduler()
+    boundary = clock.time() + 0.3
+    threading.Timer(0.05, lambda: setattr(clock, "offset", step)).start()
+    started = time.monotonic()
+    assert scheduler._sleep_until(boundary)
+    assert 0.29 <= time.monotonic() - started < 2
+
+
+def test_past_boundary_returns_at_once():
+    scheduler = CandleScheduler()
+    assert scheduler._sleep_until(time.time() - 1)
+
+
+def test_stop_ends_the_wait():
+    scheduler = CandleScheduler()
+    threading.Timer(0.05, scheduler.stop).start()
+    started = time.monotonic()
+    assert scheduler.wait() is None
+    assert time.monotonic() - started < 5
@@ -0,0 +1,80 @@
+# test_candle_store.py
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from classes.candle_store import CandleStore
+
+
+def test_pyupbit_is_only_imported_on_first_fetch(tmp_path, monkeypatch):
+    # a None entry in sys.modules makes `import pyupbit` raise ImportError
+    monkeypatch.setitem(sys.modules, "pyupbit", None)
+    store = CandleStore(root=str(tmp_path))
+    assert store.count('KRW-BTC', 'minute30') == 0
+    with pytest.raises(ImportError):
+        store.update('KRW-BTC', 'minute30')
+
+
+class FakeExchange:
+    """pyupbit.get_ohlcv stand-in: the last `count` candles up to the forming one at self.now."""
+
+    def __init__(self, n=500):
+        rng = np.random.default_rng(1)
+        close = 100 + rng.standard_normal(n).cumsum()
+        index = pd.date_range('2024-01-01 09:00', periods=n, freq='30min', unit='ns')
+        self.candles = pd.DataFrame({'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+                                     'volume': rng.random(n), 'value': rng.random(n) * close}, index=index)
+        self.now = 100
+        self.requests = []
+
+    def __call__(self, ticker, interval, count):
+        self.requests.append(count)
+        return self.candles.iloc[max(0, self.now + 1 - count):self.now + 1].copy()
+
+
+@pytest.fixture
+def exchange():
+    return FakeExchange()
+
+
+def test_bootstrap_stores_the_closed_candles(tmp_path, exchange):
+    store = CandleStore(root=str(tmp_path), fetcher=exchange, bootstrap_count=50)
+    df = store.get_ohlcv('KRW-BTC', 'minute30', 20)
+    assert exchange.requests == [50]
+    assert store.count('KRW-BTC', 'minute30') == 49
+    pd.testing.assert_frame_equal(df, exchange.candles.iloc[81:101], check_freq=False)
+
+
+def test_delta_fetch_appends_only_new_closed_candles(tmp_path, exchange):
+    store = CandleStore(root=str(tmp_path), fetcher=exchange, bootstrap_count=50)
+    store.update('KRW-BTC', 'minute30')
+    # the forming candle is rewritten by the exchange until it closes; only its final version is kept
+    exchange.candles.iloc[exchange.now, 3] += 0.5
+    exchange.now += 1
+    df = store.get_ohlcv('KRW-BTC', 'minute30', 30)
+    assert exchange.requests == [50, 2]
+    assert store.count('KRW-BTC', 'minute30') == 50
+    pd.testing.assert_frame_equal(df, exchange.candles.iloc[72:102], check_freq=False)
+
+
+def test_a_gap_is_filled_with_one_sized_request(tmp_path, exchange):
+    store = CandleStore(root=str(tmp_path), fetcher=exchange, bootstrap_count=50)
+    store.update('KRW-BTC', 'minute30')
+    exchange.now += 40
+    store.update('KRW-BTC', 'minute30')
+    assert exchange.requests[:2] == [50, 2] and len(exchange.requests) == 3
+    stored = store.read('KRW-BTC', 'minute30')
+    pd.testing.assert_frame_equal(stored, exchange.candles.iloc[51:140], check_freq=False)
+    assert stored.index.is_unique
+
+
+def test_interrupted_append_is_trimmed(tmp_path, exchange):
+    store = CandleStore(root=str(tmp_path), fetcher=exchange, bootstrap_count=50)
+    store.update('KRW-BTC', 'minute30')
+    _, _, data_path = store._paths('KRW-BTC', 'minute30')
+    with open(data_path, 'ab') as f:
+        f.write(b'\0' * 24)  # half a row written before a crash
+    assert store.count('KRW-BTC', 'minute30') == 49
+    exchange.now += 1
+    store.update('KRW-BTC', 'minute30')
+    pd.testing.assert_frame_equal(store.read('KRW-BTC', 'minute30'), exchange.candles.iloc[51:101], check_freq=False)
@@ -0,0 +1,110 @@
+# test_data_manager.py
+from urllib.parse import urlsplit, parse_qsl
+import pytest
+import requests
+import pandas as pd
+from classes.candle_store import CandleStore
+from classes.data_manager import DataManager, RateLimited, UPBIT_API_URL
+from http_stub import ScriptedAdapter, UpbitClient
+
+
+def data_manager(script):
+    manager = DataManager(None, None, retry_delay=0.001)
+    manager.upbit = UpbitClient()
+    adapter = ScriptedAdapter(script)
+    manager._get_session().mount(UPBIT_API_URL, adapter)
+    return manager, adapter
+
+
+ACCOUNTS = [{'currency': 'KRW', 'balance': '1000000.0'}, {'currency': 'BTC', 'balance': '0.5'}]
+
+
+def test_balances_retry_a_429_and_honour_retry_after():
+    manager, adapter = data_manager([(429, {'error': {'name': 'too_many_requests'}}, {'Retry-After': '0.01'}),
+                                     (200, ACCOUNTS, None)])
+    assert manager._fetch_balances() == {'KRW': 1_000_000.0, 'BTC': 0.5}
+    assert len(adapter.requests) == 2
+
+
+def test_prices_retry_server_errors():
+    manager, adapter = data_manager([(502, b'<html>Bad Gateway</html>', None), (503, b'', None),
+                                     (200, [{'market': 'KRW-BTC', 'trade_price': 50_000_000.0}], None)])
+    assert manager._fetch_prices(['KRW-BTC']) == {'KRW-BTC': 50_000_000.0}
+    assert len(adapter.requests) == 3
+
+
+def test_persistent_errors_raise_after_the_retries():
+    manager, adapter = data_manager([(500, b'', None)])
+    with pytest.raises(requests.HTTPError):
+        manager._fetch_balances()
+    assert len(adapter.requests) == manager.max_retries + 1
+
+
+def test_client_errors_are_not_retried():
+    manager, adapter = data_manager([(401, {'error': {'name': 'invalid_access_key'}}, None)])
+    with pytest.raises(requests.HTTPError):
+        manager._fetch_balances()
+    assert len(adapter.requests) == 1
+
+
+def test_order_rate_limit_raises_rate_limited():
+    manager, _ = data_manager([(429, b'Too Many Requests', {'Retry-After': '1'})])
+    with pytest.raises(RateLimited) as raised:
+        manager.place_order('KRW-BTC', 'bid', 'price', price=10_000, identifier='a')
+    assert raised.value.retry_after == 1.0
+
+
+def test_non_json_rejection_becomes_an_error_payload():
+    manager, _ = data_manager([(400, b'<html>Bad Request</html>', None)])
+    result = manager.place_order('KRW-BTC', 'bid', 'price', price=10_000, identifier='a')
+    assert result['error']['name'] == 'http_400'
+    assert manager.get_order(uuid='x')['error']['name'] == 'http_400'
+
+
+def candles(request):
+    """/candles answer: `count` 30-minute candles before `to` (UTC, default 2024-01-02 00:00), newest first."""
+    query = dict(parse_qsl(urlsplit(request.url).query))
+    end = pd.Timestamp(query.get('to', '2024-01-02 00:00:00'))
+    starts = [end - pd.Timedelta(minutes=30 * i) for i in range(1, int(query['count']) + 1)]
+    return [{'market': query['market'],
+             'candle_date_time_utc': start.strftime("%Y-%m-%dT%H:%M:%S"),
+             'candle_date_time_kst': (start + pd.Timedelta(hours=9)).strftime("%Y-%m-%dT%H:%M:%S"),
+             'opening_price': 100.0, 'high_price': 110.0, 'low_price': 90.0, 'trade_price': float(start.value // 10**9),
+             'candle_acc_trade_volume': 1.0, 'candle_acc_trade_price': 100.0} for start in starts]
+
+
+def test_candles_page_through_the_session_oldest_first():
+    manager, adapter = data_manager([(200, candles, None)])
+    df = manager.get_historical_data('KRW-BTC', 'minute30', 450)
+    assert list(df.columns) == ['open', 'high', 'low', 'close', 'volume', 'value']
+    assert len(df) == 450 and df.index.is_monotonic_increasing and df.index.is_unique
+    assert df.index.dtype == 'datetime64[ns]'
+    assert df.index[-1] == pd.Timestamp('2024-01-02 08:30:00')
+    assert (df['close'].to_numpy() == (df.index.values.astype('datetime64[s]').astype(int) - 9 * 3600)).all()
+    queries = [dict(parse_qsl(urlsplit(request.url).query)) for request in adapter.requests]
+    assert [int(query['count']) for query in queries] == [200, 200, 50]
+    assert urlsplit(adapter.requests[0].url).path.endswith('/candles/minutes/30') and 'to' not in queries[0]
+    assert queries[1]['to'] == '2023-12-28 20:00:00'
+
+
+def test_candle_pages_are_retried():
+    manager, adapter = data_manager([(429, b'', {'Retry-After': '0.01'}), (502, b'', None), (200, candles, None)])
+    df = manager.fetch_ohlcv('KRW-BTC', 'minute30', 10)
+    assert len(df) == 10 and len(adapter.requests) == 3
+
+
+def test_failed_candle_requests_return_none_like_pyupbit():
+    manager, adapter = data_manager([(500, b'', None)])
+    assert manager.fetch_ohlcv('KRW-BTC', 'day', 10) is None
+    assert len(adapter.requests) == manager.max_retries + 1
+    assert urlsplit(adapter.requests[0].url).path.endswith('/candles/days')
+
+
+def test_candle_store_downloads_through_the_session(tmp_path):
+    store = CandleStore(str(tmp_path), bootstrap_count=300)
+    manager = DataManager(None, None, candle_store=store, retry_delay=0.001)
+    adapter = ScriptedAdapter([(200, candles, None)])
+    manager._get_session().mount(UPBIT_API_URL, adapter)
+    df = manager.get_historical_data('KRW-BTC', 'minute30', 100)
+    assert len(df) == 100 and df.index[-1] == pd.Timestamp('2024-01-02 08:30:00')
+    assert len(adapter.requests) == 2
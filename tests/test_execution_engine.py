@@ -0,0 +1,40 @@
+# test_execution_engine.py
+import json
+from classes.data_manager import DataManager, UPBIT_API_URL
+from classes.execution_engine import ExecutionEngine
+from http_stub import ScriptedAdapter, UpbitClient
+
+
+def order(request):
+    query = json.loads(request.body)
+    return {'uuid': 'u1', 'identifier': query['identifier'], 'side': 'bid', 'state': 'done', 'paid_fee': '5.0',
+            'trades': [{'volume': '0.0002', 'funds': '10000.0'}]}
+
+
+def engine(script):
+    data_manager = DataManager(None, None, retry_delay=0.001)
+    data_manager.upbit = UpbitClient()
+    adapter = ScriptedAdapter(script)
+    data_manager._get_session().mount(UPBIT_API_URL, adapter)
+    return ExecutionEngine(data_manager, retry_delay=0.001), adapter
+
+
+def test_rate_limited_submit_is_sent_again():
+    execution_engine, adapter = engine([(429, b'Too Many Requests', {'Retry-After': '0.01'}), (201, order, None)])
+    fill = execution_engine.buy('KRW-BTC', 10_000)
+    assert fill.status == 'filled' and fill.executed_volume == 0.0002
+    identifiers = {json.loads(request.body)['identifier'] for request in adapter.requests}
+    assert len(adapter.requests) == 2 and len(identifiers) == 1
+
+
+def test_plain_text_rejection_fails_the_fill_without_raising():
+    execution_engine, _ = engine([(400, b'Bad Request', None)])
+    fill = execution_engine.buy('KRW-BTC', 10_000)
+    assert fill.status == 'failed' and fill.errors == ['http_400']
+
+
+def test_rate_limit_on_every_attempt_gives_up():
+    execution_engine, adapter = engine([(429, b'{"error": {"name": "too_many_requests"}}', None)])
+    fill = execution_engine.buy('KRW-BTC', 10_000)
+    assert fill.status == 'failed'
+    assert len(adapter.requests) == execution_engine.max_retries + 1
@@ -0,0 +1,62 @@
+# test_indicator_manager.py
+import numpy as np
+import pandas as pd
+import pytest
+from classes.indicator_manager import IndicatorManager, IndicatorState, _ewm_mean
+
+
+def ohlc(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(n).cumsum()
+    return close + rng.random(n), close - rng.random(n), close
+
+
+def frame(n=300, seed=0):
+    high, low, close = ohlc(n, seed)
+    index = pd.date_range('2024-01-01 09:00', periods=n, freq='30min')
+    return pd.DataFrame({'high': high, 'low': low, 'close': close}, index=index)
+
+
+@pytest.mark.parametrize("span", [1, 2, 10, 2000])
+def test_ewm_mean_matches_pandas(span):
+    x = ohlc()[2]
+    expected = pd.Series(x).ewm(span=span).mean().to_numpy()
+    np.testing.assert_allclose(_ewm_mean(x, span), expected, rtol=1e-12)
+
+
+def test_window_and_span_of_one():
+    high, low, close = ohlc()
+    indicator_manager = IndicatorManager(window=1, span=1)
+    fused = indicator_manager.calculate_fused(high, low, close)
+    batch = indicator_manager.calculate_indicator_batch(high, low, close)
+    np.testing.assert_array_equal(fused['ma'], close)
+    for column in ('ma', 'YYL', 'YYL_slow'):
+        np.testing.assert_allclose(fused[column], batch[column][0])
+
+
+@pytest.mark.parametrize("window,span", [(20, 10), (5, 3), (1, 1)])
+def test_streaming_state_matches_batch(window, span):
+    prices = frame()
+    indicator_manager = IndicatorManager(window=window, span=span)
+    expected = indicator_manager.calculate_indicator(prices)
+    state = indicator_manager.create_state()
+    rows = {}
+    for timestamp, row in prices.iterrows():
+        if state.push(timestamp, row['high'], row['low'], row['close']) is not None:
+            rows[timestamp] = state.last
+    streamed = pd.DataFrame.from_dict(rows, orient='index')[IndicatorState.columns]
+    assert list(streamed.index) == list(expected.index)
+    np.testing.assert_allclose(streamed.to_numpy(), expected[IndicatorState.columns].to_numpy(),
+                               rtol=1e-9, atol=1e-9)
+
+
+def test_warmed_up_state_continues_like_a_full_recompute():
+    prices = frame()
+    indicator_manager = IndicatorManager()
+    state = indicator_manager.create_state(prices.iloc[:250])
+    for timestamp, row in prices.iloc[250:].iterrows():
+        state.push(timestamp, row['high'], row['low'], row['close'])
+    fused = indicator_manager.calculate_fused(prices['high'], prices['low'], prices['close'])
+    for column in ('ma', 'YYL', 'YYL_slow'):
+        assert state.last[column] == pytest.approx(fused[column][-1], rel=1e-9, abs=1e-9)
+    assert state.to_frame().index[0] == prices.index[-1]
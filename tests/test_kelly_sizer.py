@@ -0,0 +1,65 @@
+# test_kelly_sizer.py
+import numpy as np
+import pytest
+from classes.execution_engine import ExecutionEngine
+from classes.kelly_sizer import KellySizer
+from classes.position_ledger import PositionLedger
+from classes.position_manager import PositionManager
+from classes.simulated_exchange import SimulatedExchange, SimulatedDataManager
+from classes.signal_record import Signal
+
+
+def history(wins, losses, win=0.05, loss=0.02):
+    return np.array([win] * wins + [-loss] * losses)
+
+
+def test_no_size_before_min_trades():
+    assert KellySizer(min_trades=20).size(history(10, 9)) is None
+
+
+@pytest.mark.parametrize("returns", [history(30, 0), history(25, 5), history(15, 15), history(3, 27)])
+def test_fraction_stays_within_its_bounds(returns):
+    sizer = KellySizer(paths=2000, seed=0, min_fraction=0.01)
+    sizing = sizer.size(returns)
+    assert 0.01 <= sizing['fraction'] <= 1 / (1 + sizer.fee)
+
+
+def test_no_edge_falls_back_to_min_fraction():
+    assert KellySizer(seed=0).size(history(3, 27))['fraction'] == 0.0
+    assert KellySizer(seed=0, min_fraction=0.02).size(history(3, 27))['fraction'] == 0.02
+
+
+@pytest.mark.parametrize("fee", [0.0, 0.0005, 0.0025])
+def test_fraction_leaves_room_for_the_fee(fee):
+    # no losses: full Kelly is unbounded and only the caps apply
+    sizing = KellySizer(fee=fee, max_drawdown=1.0).size(history(30, 0))
+    balance = 10_000_000.0
+    invested = balance * sizing['fraction']
+    assert invested * (1 + fee) <= balance
+    assert sizing['fraction'] == pytest.approx(1 / (1 + fee))
+
+
+def test_buy_fills_once_the_sizer_is_active():
+    exchange = SimulatedExchange.synthetic(days=1, balances={'KRW': 10_000_000})
+    exchange.advance(exchange.end('KRW-BTC'))
+    ledger = PositionLedger(":memory:")
+    # 20 winning round trips: the sizer asks for everything the fee allows
+    for i in range(20):
+        ledger.record_fill('KRW-BTC', 'bid', 1.0, 100.0, trade_id=f"b{i}")
+        ledger.record_fill('KRW-BTC', 'ask', 1.0, 110.0, trade_id=f"a{i}")
+    data_manager = SimulatedDataManager(exchange)
+    engine = ExecutionEngine(data_manager, poll_interval=0.0)
+    position_manager = PositionManager(execution_engine=engine, ledger=ledger,
+                                       sizer=KellySizer(seed=0, max_drawdown=1.0, fee=exchange.fee))
+    try:
+        fraction = position_manager.kelly_fraction('KRW-BTC')
+        assert position_manager.sizing is not None
+        price = exchange.get_current_price('KRW-BTC')
+        signal = Signal('t', 't', price, price, 0.0, 0.0, 0.0, 0.0, 'neutral', 'neutral', 0, 'long',
+                        price * 0.9, price * 1.2, 1.0)
+        record = position_manager.execution_trade(data_manager, signal, None,
+                                                  exchange.get_balance('KRW') * fraction, 0.0, 0)
+    finally:
+        engine.close()
+    assert record.status == 'filled' and record.side == 'bid'
+    assert exchange.get_balance('KRW') >= 0.0
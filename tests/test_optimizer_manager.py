@@ -0,0 +1,78 @@
+# test_optimizer_manager.py
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from classes.indicator_manager import IndicatorManager
+from classes.optimizer_manager import OptimizerManager, _init_worker, _run_job, _worker, _key
+from classes.strategy_manager import StrategyManager
+
+SPACE = {'window': [10, 20], 'span': [5], 'multiplier': [2], 'sl_multiplier': [2], 'tp_multiplier': [3],
+         'yyl_threshold': [50], 'atr_period': [14]}
+
+
+@pytest.fixture(scope="module")
+def prices():
+    rng = np.random.default_rng(3)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 2000)))
+    return pd.DataFrame({'high': close * 1.005, 'low': close * 0.995, 'close': close},
+                        index=pd.date_range('2024-01-01', periods=len(close), freq='30min', unit='ns'))
+
+
+def lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_resume_after_an_interrupted_write(tmp_path, prices):
+    path = str(tmp_path / "results.jsonl")
+    optimizer = OptimizerManager(prices, results_path=path, processes=2)
+    params = optimizer.grid(SPACE)
+    assert len(optimizer.run(params)) == 2
+
+    # the sweep was killed in the middle of writing a result
+    with open(path, 'a') as f:
+        f.write('{"key": "{\\"window\\": 30')
+    assert len(optimizer.results()) == 2
+
+    more = optimizer.grid({**SPACE, 'window': [10, 20, 30]})
+    table = optimizer.run(more)
+    assert sorted(table['window']) == [10, 20, 30]
+    # the partial line was dropped and every line is a whole result
+    assert sorted(json.loads(line)['window'] for line in lines(path)) == [10, 20, 30]
+    # nothing left to run
+    assert len(optimizer.run(more)) == 3 and len(lines(path)) == 3
+
+
+def test_results_are_ranked_by_the_metric(tmp_path, prices):
+    path = tmp_path / "results.jsonl"
+    rows = [{'key': str(i), 'window': i, 'sharpe': sharpe} for i, sharpe in enumerate([0.5, None, 2.0, -1.0])]
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    table = OptimizerManager(prices, results_path=str(path), metric='sharpe').results()
+    assert list(table['window']) == [2, 0, 3, 1]
+
+
+def test_worker_reads_the_prices_from_shared_memory(prices):
+    from multiprocessing import shared_memory
+    columns = np.vstack([prices[field].to_numpy() for field in ('high', 'low', 'close')])
+    timestamps = prices.index.values.astype(np.int64)
+    shm = shared_memory.SharedMemory(create=True, size=columns.nbytes + timestamps.nbytes)
+    try:
+        np.ndarray(columns.shape, dtype=np.float64, buffer=shm.buf)[:] = columns
+        np.ndarray(timestamps.shape, dtype=np.int64, buffer=shm.buf, offset=columns.nbytes)[:] = timestamps
+        _init_worker(shm.name, len(timestamps), {'fee': 0.001})
+        params = OptimizerManager(prices).grid(SPACE)[0]
+        result = _run_job(params)
+        attached = _worker.pop('shm')
+        _worker.clear()
+        attached.close()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    indicator_manager = IndicatorManager(window=10, span=5, multiplier=2)
+    expected = StrategyManager(sl__multiplier=2, tp_multiplier=3, yyl_threshold=50, atr_period=14).backtest(
+        prices, indicator_manager=indicator_manager, fee=0.001)['stats']
+    assert result['key'] == _key(params) and 'error' not in result
+    for name, value in expected.items():
+        assert result[name] == pytest.approx(float(value), nan_ok=True)
@@ -0,0 +1,114 @@
+# test_outbox_manager.py
+import httpx
+import pytest
+from notion_client import APIResponseError
+from notion_client.errors import APIErrorCode, UnknownHTTPResponseError
+from classes.outbox_manager import OutboxManager, RetryableError
+from classes.notion_manager import NotionManager
+
+
+def outbox(tmp_path, handler, **kwargs):
+    manager = OutboxManager(str(tmp_path / "outbox.db"), handler, base_delay=0.01, max_delay=0.05, **kwargs)
+    manager.start()
+    return manager
+
+
+def test_retryable_error_is_retried_until_delivered(tmp_path):
+    calls = []
+
+    def handler(kind, payload, progress, save_progress):
+        calls.append(payload)
+        if len(calls) < 3:
+            raise RetryableError("503")
+
+    manager = outbox(tmp_path, handler)
+    manager.enqueue('trade_log', {'n': 1})
+    assert manager.flush(timeout=5)
+    manager.close()
+    assert len(calls) == 3
+    assert manager.delivered == 1 and manager.failed == 0
+
+
+def test_other_errors_are_parked_at_once(tmp_path):
+    calls = []
+
+    def handler(kind, payload, progress, save_progress):
+        calls.append(payload)
+        raise ValueError("bad record")
+
+    manager = outbox(tmp_path, handler)
+    manager.enqueue('trade_log', {'n': 1})
+    assert manager.flush(timeout=5)
+    manager.close()
+    assert len(calls) == 1
+    assert manager.failed == 1
+    state, error = manager.conn.execute("SELECT state, error FROM outbox").fetchone()
+    assert state == 'failed' and error.startswith("ValueError")
+
+
+def test_retryable_error_is_parked_after_max_retries(tmp_path):
+    def handler(kind, payload, progress, save_progress):
+        raise RetryableError("429")
+
+    manager = outbox(tmp_path, handler, max_retries=3)
+    manager.enqueue('trade_log', {'n': 1})
+    assert manager.flush(timeout=5)
+    manager.close()
+    assert manager.conn.execute("SELECT state, attempts FROM outbox").fetchone() == ('failed', 3)
+
+
+def test_progress_survives_a_retry(tmp_path):
+    steps = []
+
+    def handler(kind, payload, progress, save_progress):
+        if 'first' not in progress:
+            steps.append('first')
+            progress['first'] = True
+            save_progress()
+        if len(steps) == 1:
+            steps.append('retry')
+            raise RetryableError("timeout")
+        steps.append('second')
+
+    manager = outbox(tmp_path, handler)
+    manager.enqueue('account_balance', {})
+    assert manager.flush(timeout=5)
+    manager.close()
+    assert steps == ['first', 'retry', 'second']
+
+
+class FailingPages:
+    def __init__(self, error):
+        self.error = error
+
+    def create(self, **kwargs):
+        raise self.error
+
+
+def notion(error):
+    manager = NotionManager(requests_per_second=1000)
+    manager.notion.pages = FailingPages(error)
+    return manager
+
+
+@pytest.mark.parametrize("error", [
+    UnknownHTTPResponseError(502, raw_body_text="<html>Bad Gateway</html>"),
+    UnknownHTTPResponseError(504),
+    APIResponseError(APIErrorCode.RateLimited, 429, "rate limited", httpx.Headers({'retry-after': '0'}), ""),
+    APIResponseError(APIErrorCode.ServiceUnavailable, 503, "unavailable", httpx.Headers(), ""),
+])
+def test_notion_rate_limits_and_server_errors_are_retryable(error):
+    with pytest.raises(RetryableError):
+        notion(error)._create_page(parent={}, properties={})
+
+
+def test_notion_client_errors_are_not_retried():
+    error = APIResponseError(APIErrorCode.ValidationError, 400, "invalid", httpx.Headers(), "")
+    with pytest.raises(APIResponseError):
+        notion(error)._create_page(parent={}, properties={})
+
+
+def test_notion_without_outbox_does_not_raise_into_the_loop(capsys):
+    manager = notion(UnknownHTTPResponseError(503))
+    manager.create_trade_log({'trade_id': 't1', 'type': 'long', 'symbol': 'KRW-BTC'})
+    assert "Notion write failed" in capsys.readouterr().out
@@ -0,0 +1,74 @@
+# test_portfolio_manager.py
+import datetime
+from types import MappingProxyType
+import pytest
+from classes.data_manager import MarketSnapshot
+from classes.execution_engine import Fill
+from classes.portfolio_manager import PortfolioManager
+from classes.position_ledger import PositionLedger
+from classes.position_manager import PositionManager
+from classes.signal_record import Signal
+
+
+class StubDataManager:
+    rate_limiter = object()
+
+    def get_snapshot(self, tickers, candles=False):
+        return MarketSnapshot(datetime.datetime.now(), MappingProxyType({'KRW': 1_000_000.0}),
+                              MappingProxyType({ticker: 100.0 for ticker in tickers}), MappingProxyType({}), 0.0)
+
+
+class FakeEngine:
+    def _fill(self, ticker, side, volume):
+        fill = Fill(f"id-{ticker}-{side}", ticker, side, volume)
+        fill.executed_volume, fill.avg_price, fill.funds, fill.status = volume, 100.0, volume * 100.0, 'filled'
+        return fill
+
+    def buy(self, ticker, krw_amount):
+        return self._fill(ticker, 'bid', krw_amount / 100.0)
+
+    def sell(self, ticker, volume, price=None):
+        return self._fill(ticker, 'ask', volume)
+
+
+class ScriptedPortfolio(PortfolioManager):
+    entries = {}
+
+    def _evaluate(self, ticker):
+        return Signal('2024-01-01 09:30:00', '2024-01-01 09:00:00', 100.0, 100.0, 0.0, 0.0, 0.0, 0.0,
+                      'neutral', 'neutral', 0, self.entries[ticker], 90.0, 120.0, 1.0)
+
+
+class TickerKelly(PositionManager):
+    fractions = {'KRW-BTC': 0.5, 'KRW-ETH': 0.1}
+
+    def kelly_fraction(self, symbol=None):
+        assert symbol is not None, "each ticker is sized with its own fraction"
+        return self.fractions[symbol]
+
+
+def test_allocate_sizes_each_long_with_its_own_kelly_fraction():
+    tickers = ['KRW-BTC', 'KRW-ETH', 'KRW-XRP']
+    portfolio = PortfolioManager(StubDataManager(), None, None, TickerKelly(tickers=tickers), tickers, max_workers=1)
+    try:
+        allocation = portfolio.allocate(1_000_000, {'KRW-BTC': 'long', 'KRW-ETH': 'long', 'KRW-XRP': 'short'})
+    finally:
+        portfolio.close()
+    assert allocation['KRW-BTC'] == pytest.approx(250_000)
+    assert allocation['KRW-ETH'] == pytest.approx(50_000)
+    assert allocation['KRW-XRP'] == 0.0
+
+
+def test_run_cycle_reports_the_tickers_whose_position_changed():
+    tickers = ['KRW-BTC', 'KRW-ETH']
+    position_manager = PositionManager(tickers=tickers, execution_engine=FakeEngine(), ledger=PositionLedger(":memory:"))
+    portfolio = ScriptedPortfolio(StubDataManager(), None, None, position_manager, tickers, max_workers=2)
+    # the ETH sell finds nothing to sell, so only BTC has a fill, even though ETH was traded last
+    portfolio.entries = {'KRW-BTC': 'long', 'KRW-ETH': 'short'}
+    try:
+        trade_logs = portfolio.run_cycle()
+    finally:
+        portfolio.close()
+    assert portfolio.last_cycle['changed'] == ['KRW-BTC']
+    assert trade_logs['KRW-BTC'].side == 'bid' and trade_logs['KRW-ETH'].side is None
+    assert position_manager.ledger.quantity('KRW-BTC') == pytest.approx(4000.0)
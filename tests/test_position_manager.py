@@ -0,0 +1,46 @@
+# test_position_manager.py
+from classes.execution_engine import MIN_ORDER_KRW, Fill
+from classes.position_manager import PositionManager
+from classes.signal_record import Signal, TradeRecord
+
+
+class RecordingEngine:
+    def __init__(self):
+        self.orders = []
+
+    def buy(self, ticker, krw_amount):
+        self.orders.append((ticker, krw_amount))
+        raise AssertionError("no order should be sent")
+
+
+def signal(entry, close=100.0):
+    return Signal('2024-01-01 09:30:00', '2024-01-01 09:00:00', close, close, 0.0, 0.0, 0.0, 0.0,
+                  'neutral', 'neutral', 0, entry, close * 0.9, close * 1.2, 1.0)
+
+
+def test_buy_below_the_minimum_order_is_skipped():
+    engine = RecordingEngine()
+    position_manager = PositionManager(execution_engine=engine)
+    for amount in (0.0, MIN_ORDER_KRW - 1):
+        record = position_manager.execution_trade(None, signal('long'), None, amount, 0.0, 0)
+        assert record.status == 'skipped'
+        assert record.side is None and record.quantity == 0.0
+    assert engine.orders == []
+    assert not position_manager.position_changed
+
+
+class RejectingEngine:
+    def buy(self, ticker, krw_amount):
+        fill = Fill("id-rejected", ticker, 'bid', krw_amount)
+        fill.errors.append('insufficient_funds_bid')
+        return fill
+
+
+def test_only_executed_orders_count_as_executed():
+    skipped = PositionManager(execution_engine=RecordingEngine()).execution_trade(None, signal('long'), None, 0.0, 0.0, 0)
+    rejected = PositionManager(execution_engine=RejectingEngine()).execution_trade(None, signal('long'), None,
+                                                                                  10_000, 0.0, 0)
+    assert rejected.status == 'failed' and rejected.side is None
+    assert not skipped.executed and not rejected.executed
+    filled = TradeRecord('t', 'neutral', 'ts', 'KRW-BTC', 100.0, 0.0, 0.0, 1.0, 100.0, status='filled', side='ask')
+    assert filled.executed
@@ -0,0 +1,69 @@
+# test_simulated_exchange.py
+import numpy as np
+import pandas as pd
+import pytest
+from classes.execution_engine import ExecutionEngine
+from classes.simulated_exchange import SimulatedExchange, SimulatedDataManager
+
+# 2024-01-01 00:00 UTC, a minute30 boundary
+T0 = 1704067200
+
+
+def exchange(**kwargs):
+    # one tick a minute for two hours: candle k holds the prices 1000 + 30k ... 1000 + 30k + 29
+    ticks = pd.DataFrame({'timestamp': T0 + 60 * np.arange(120), 'price': 1000.0 + np.arange(120),
+                          'volume': np.ones(120)})
+    return SimulatedExchange({'KRW-BTC': ticks}, balances={'KRW': 1_000_000}, **kwargs)
+
+
+def test_candles_only_see_ticks_up_to_the_clock():
+    sim = exchange()
+    sim.advance(T0 + 60 * 44)
+    df = sim.get_ohlcv('KRW-BTC', 'minute30', count=10)
+    assert len(df) == 2
+    assert list(df['open']) == [1000.0, 1030.0]
+    assert list(df['close']) == [1029.0, 1044.0]
+    assert list(df['high']) == [1029.0, 1044.0]
+    assert list(df['volume']) == [30.0, 15.0]
+    # Upbit labels candles in KST
+    assert df.index[0] == pd.Timestamp('2024-01-01 09:00')
+    assert sim.get_current_price('KRW-BTC') == 1044.0
+
+
+def test_round_trip_pays_fees_and_slippage():
+    sim = exchange(fee=0.001, slippage=0.01)
+    sim.advance(T0)
+    bought = sim.buy_market_order('KRW-BTC', 100_000)
+    volume = float(bought['executed_volume'])
+    assert volume == pytest.approx(100_000 / 1010.0)
+    assert sim.get_balance('KRW') == pytest.approx(1_000_000 - 100_100)
+
+    sold = sim.sell_market_order('KRW-BTC', volume)
+    funds = volume * 990.0
+    assert float(sold['trades'][0]['funds']) == pytest.approx(funds)
+    assert sim.get_balance('KRW') == pytest.approx(1_000_000 - 100_100 + funds * 0.999)
+    assert sim.get_balance('KRW-BTC') == 0.0
+
+
+def test_orders_the_exchange_would_reject():
+    sim = exchange()
+    assert sim.buy_market_order('KRW-BTC', 4999)['error']['name'] == 'under_min_total_bid'
+    assert sim.buy_market_order('KRW-BTC', 2_000_000)['error']['name'] == 'insufficient_funds_bid'
+    assert sim.sell_market_order('KRW-BTC', 1.0)['error']['name'] == 'insufficient_funds_ask'
+    assert sim.orders == {}
+
+
+def test_execution_engine_fills_against_the_simulation():
+    sim = exchange()
+    sim.advance(T0 + 600)
+    engine = ExecutionEngine(SimulatedDataManager(sim), poll_interval=0.0)
+    try:
+        fill = engine.buy('KRW-BTC', 50_000)
+        assert fill.status == 'filled' and fill.side == 'bid'
+        assert fill.executed_volume == pytest.approx(sim.get_balance('KRW-BTC'))
+        assert fill.avg_price == pytest.approx(1010.0 * 1.0002)
+        fill = engine.sell('KRW-BTC', fill.executed_volume, 1010.0)
+        assert fill.status == 'filled' and sim.get_balance('KRW-BTC') == 0.0
+    finally:
+        engine.close()
+    assert len(sim.orders) == 2
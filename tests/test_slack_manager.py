@@ -0,0 +1,70 @@
+# test_slack_manager.py
+import json
+import pytest
+from classes import slack_manager
+from classes.slack_manager import SlackManager
+from http_stub import ScriptedAdapter
+
+WEBHOOK = "https://hooks.slack.test/services/T0/B0/x"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(slack_manager.time, "sleep", recorded.append)
+    return recorded
+
+
+def notifier(script, **kwargs):
+    manager = SlackManager(WEBHOOK, **kwargs)
+    adapter = ScriptedAdapter(script)
+    manager.session.mount("https://", adapter)
+    return manager, adapter
+
+
+def test_rate_limited_post_waits_for_retry_after(sleeps):
+    manager, adapter = notifier([(429, {}, {'Retry-After': '3'}), (200, b"ok", None)], asynchronous=False)
+    manager.send_message("hello")
+    assert len(adapter.requests) == 2
+    assert sleeps == [3.0]
+    assert manager.stats()['sent_messages'] == 1
+
+
+def test_server_errors_back_off_and_retry(sleeps):
+    manager, adapter = notifier([(500, b"", None), (502, b"", None), (200, b"ok", None)], asynchronous=False)
+    manager.send_message("hello")
+    assert len(adapter.requests) == 3
+    assert sleeps == [0.5, 1.0]
+    assert manager.sent_messages == 1
+
+
+def test_client_errors_are_not_retried(sleeps):
+    manager, adapter = notifier([(400, b"invalid_payload", None)], asynchronous=False)
+    manager.send_message("hello")
+    assert len(adapter.requests) == 1 and sleeps == []
+    assert manager.failed_messages == 1
+
+
+def test_gives_up_after_max_retries(sleeps):
+    manager, adapter = notifier([(503, b"", None)], asynchronous=False, max_retries=2)
+    manager.send_message("hello")
+    assert len(adapter.requests) == 3
+    assert manager.failed_messages == 1 and manager.sent_messages == 0
+
+
+def test_messages_within_the_digest_window_are_coalesced():
+    manager, adapter = notifier([(200, b"ok", None)], digest_window=0.2, requests_per_second=100)
+    for message in ("a", "b", "c"):
+        manager.send_message(message)
+    assert manager.close(timeout=5)
+    assert [json.loads(request.body)['text'] for request in adapter.requests] == ["a\nb\nc"]
+    assert manager.sent_posts == 1 and manager.sent_messages == 3
+
+
+def test_digest_size_is_capped():
+    manager, adapter = notifier([(200, b"ok", None)], digest_window=0.2, requests_per_second=100, max_digest=2)
+    for message in "abcde":
+        manager.send_message(message)
+    assert manager.close(timeout=5)
+    assert [json.loads(request.body)['text'] for request in adapter.requests] == ["a\nb", "c\nd", "e"]
+    assert manager.sent_messages == 5
@@ -0,0 +1,90 @@
+# test_strategy_manager.py
+import numpy as np
+import pandas as pd
+import pytest
+from classes.indicator_manager import IndicatorManager
+from classes.position_ledger import PositionLedger
+from classes.position_manager import PositionManager
+from classes.signal_record import Signal
+from classes.strategy_manager import StrategyManager
+
+FEE = 0.0005
+
+
+def scripted(close, atr, cross=3):
+    """Prices and indicators with one YYL long crossover at bar `cross` and none after it."""
+    n = len(close)
+    close = np.asarray(close, dtype=np.float64)
+    prices = pd.DataFrame({'high': close, 'low': close, 'close': close},
+                          index=pd.date_range('2024-01-01 09:00', periods=n, freq='30min'))
+    yyl = np.full(n, -80.0)
+    yyl_slow = np.where(np.arange(n) < cross, -70.0, -90.0)
+    return prices, {'YYL': yyl, 'YYL_slow': yyl_slow, 'atr': np.full(n, float(atr))}
+
+
+def backtest(close, atr, max_loss_pct=0.05):
+    prices, indicators = scripted(close, atr)
+    return StrategyManager().backtest(prices, IndicatorManager(window=2, span=2), fee=FEE,
+                                      max_loss_pct=max_loss_pct, indicators=indicators)
+
+
+def test_max_loss_exit_below_the_entry_price():
+    # stops are 200 away: only the 5% max-loss can close the trade, at the first close <= 95
+    result = backtest([100, 100, 100, 100, 99, 97, 94, 94, 93], atr=100)
+    trades = result['trades']
+    assert list(trades['exit_reason']) == ['max_loss']
+    assert (trades['entry_price'][0], trades['exit_price'][0]) == (100.0, 94.0)
+    assert trades['exit_time'][0] == result['equity'].index[6]
+    assert trades['return'][0] == pytest.approx(0.94 * (1 - FEE) ** 2 - 1)
+
+
+def test_take_profit_exit_and_stats():
+    # take profit at the previous close + 3 ATR
+    result = backtest([100, 100, 100, 100, 101, 104, 103, 103], atr=1)
+    trades = result['trades']
+    assert list(trades['exit_reason']) == ['take_profit']
+    assert trades['exit_price'][0] == 104.0
+    stats = result['stats']
+    expected = 10_000_000 * (1.04 * (1 - FEE) ** 2)
+    assert stats['n_trades'] == 1 and stats['win_rate'] == 1.0
+    assert stats['final_equity'] == pytest.approx(expected)
+    assert stats['total_return'] == pytest.approx(expected / 10_000_000 - 1)
+    assert result['equity'].iloc[-1] == pytest.approx(expected)
+
+
+def test_walk_trades_pairs_entries_with_exits():
+    close = np.array([100, 100, 100, 100, 100, 100, 100, 100.0])
+    long = np.array([0, 1, 0, 1, 0, 0, 1, 0], dtype=bool)
+    short = np.array([0, 0, 1, 0, 0, 0, 0, 0], dtype=bool)
+    hit_stop = np.array([0, 0, 0, 0, 1, 0, 0, 0], dtype=bool)
+    entries, closes, reasons = StrategyManager()._walk_trades(close, long, short, hit_stop, short | hit_stop, 0.05)
+    assert list(entries) == [1, 3, 6]
+    assert list(closes) == [2, 4, 7]
+    assert reasons == ['short', 'stop_loss', 'open']
+
+
+@pytest.mark.parametrize("price,sold", [(94.0, True), (96.0, False)])
+def test_live_max_loss_matches_the_backtest(price, sold):
+    ledger = PositionLedger(":memory:")
+    ledger.record_fill('KRW-BTC', 'bid', 1.0, 100.0, trade_id='entry')
+    position_manager = PositionManager(ledger=ledger)
+    assert position_manager.max_loss_price('KRW-BTC', 0.05) == pytest.approx(95.0)
+
+    class Exchange:
+        def __init__(self):
+            self.sold = []
+
+        def exectute_sell_market_price(self, ticker, volume):
+            self.sold.append(volume)
+
+    signal = Signal('t', 't', price, price, 0.0, 0.0, 0.0, 0.0, 'neutral', 'neutral', 0, 'neutral',
+                    0.0, 1000.0, 1.0)
+    exchange = Exchange()
+    position_manager.execution_trade(exchange, signal, None, 0.0, 1.0,
+                                     position_manager.max_loss_price('KRW-BTC', 0.05))
+    assert (exchange.sold == [1.0]) == sold
+
+
+def test_no_max_loss_without_an_open_position():
+    assert PositionManager(ledger=PositionLedger(":memory:")).max_loss_price('KRW-BTC', 0.05) == 0
+    assert PositionManager().max_loss_price('KRW-BTC', 0.05) == 0
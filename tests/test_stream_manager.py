@@ -0,0 +1,79 @@
+# test_stream_manager.py
+import datetime
+from types import MappingProxyType
+import pandas as pd
+import pytest
+from classes.candle_store import KST_OFFSET
+from classes.data_manager import MarketSnapshot
+from classes.execution_engine import Fill
+from classes.indicator_manager import IndicatorManager
+from classes.position_ledger import PositionLedger
+from classes.position_manager import PositionManager
+from classes.strategy_manager import StrategyManager
+from classes.stream_manager import StreamManager
+
+
+class FakeEngine:
+    def __init__(self, price):
+        self.price = price
+
+    def _fill(self, ticker, side, volume):
+        fill = Fill(f"id-{side}-{volume}", ticker, side, volume)
+        fill.executed_volume, fill.avg_price, fill.funds = volume, self.price, volume * self.price
+        fill.fee, fill.status = 0.0, 'filled'
+        return fill
+
+    def buy(self, ticker, krw_amount):
+        return self._fill(ticker, 'bid', krw_amount / self.price)
+
+    def sell(self, ticker, volume, price=None):
+        return self._fill(ticker, 'ask', volume)
+
+
+def candles(n=5, price=100.0):
+    index = pd.date_range('2024-01-01 09:00', periods=n, freq='30min')
+    return pd.DataFrame({'open': price, 'high': price + 1, 'low': price - 1, 'close': price, 'volume': 1.0},
+                        index=index)
+
+
+def snapshot(krw, coins):
+    return MarketSnapshot(datetime.datetime.now(), MappingProxyType({'KRW': krw, 'BTC': coins}),
+                          MappingProxyType({'KRW-BTC': 100.0}), MappingProxyType({}), 0.0)
+
+
+def stream(ledger, price=100.0):
+    position_manager = PositionManager(execution_engine=FakeEngine(price), ledger=ledger)
+    trades = []
+    manager = StreamManager(None, IndicatorManager(), StrategyManager(), position_manager, on_trade=trades.append)
+    return manager, trades
+
+
+def test_restart_restores_the_open_position_from_the_ledger():
+    ledger = PositionLedger(":memory:")
+    ledger.record_fill('KRW-BTC', 'bid', 2.0, 100.0, trade_id='entry')
+    ledger.set_levels('KRW-BTC', 90.0, 130.0)
+
+    manager, trades = stream(ledger, price=94.0)
+    manager.warm_up(candles(), snapshot(0.0, 2.0))
+    assert manager.entry_price == 100.0
+    assert (manager.stop_loss, manager.take_profit) == (90.0, 130.0)
+
+    # 94 is above the stop but 6% below the entry: the max-loss exit fires and reaches the ledger
+    manager.on_tick(candles().index[-1].timestamp() - KST_OFFSET + 60, 94.0)
+    assert [trade['notes'] for trade in trades] == ["Stream exit (max_loss)."]
+    assert ledger.quantity('KRW-BTC') == 0.0
+    assert ledger.realized_pnl('KRW-BTC') == pytest.approx(-12.0)
+    assert len(ledger.trade_returns('KRW-BTC')) == 1
+
+
+def test_stream_buy_is_booked_in_the_ledger():
+    ledger = PositionLedger(":memory:")
+    manager, trades = stream(ledger)
+    manager.krw_balance = 1_000_000.0
+    manager.stop_loss, manager.take_profit = 95.0, 110.0
+    manager._buy(100.0, 0.0)
+    position = ledger.position('KRW-BTC')
+    assert position.quantity == pytest.approx(4000.0)
+    assert (position.stop_loss, position.take_profit) == (95.0, 110.0)
+    assert manager.entry_price == 100.0 and manager.coin_balance == pytest.approx(4000.0)
+    assert manager.position_manager.position_changed
@@ -0,0 +1,122 @@
+# test_trade_journal.py
+import sqlite3
+import pytest
+from classes.trade_journal import TradeJournal
+from classes.position_manager import PositionManager
+from classes.execution_engine import Fill
+from classes.signal_record import Signal, TradeRecord
+
+
+def trade(trade_type, price, quantity, fee=0.0, side=None, status='successful', symbol='KRW-BTC'):
+    return TradeRecord(f"t-{trade_type}-{price}", trade_type, '2024-01-01 09:00:00', symbol, price, 0.0, 0.0,
+                       quantity, price * quantity, fee=fee, status=status, side=side)
+
+
+def test_average_cost_pnl_after_fees():
+    journal = TradeJournal(":memory:")
+    journal.create_trade_log(trade('long', 100.0, 1.0, fee=1.0, side='bid'))
+    journal.create_trade_log(trade('long', 200.0, 1.0, fee=1.0, side='bid'))
+    journal.create_trade_log(trade('short', 180.0, 1.0, fee=1.0, side='ask'))
+    journal.create_trade_log(trade('short', 120.0, 1.0, fee=1.0, side='ask'))
+    summary = journal.summary()
+    # average cost 150: +30 and -30 on the sells, 4 fees of 1
+    assert summary['realized_pnl'] == pytest.approx(-4.0)
+    assert summary['closed'] == 2 and summary['wins'] == 1 and summary['win_rate'] == 0.5
+    assert summary['bought'] == pytest.approx(300.0) and summary['sold'] == pytest.approx(300.0)
+    assert journal.holdings['KRW-BTC'] == (0.0, 0.0)
+
+
+def test_signals_without_an_order_and_failed_orders_realize_nothing():
+    journal = TradeJournal(":memory:")
+    journal.create_trade_log(trade('neutral', 100.0, 1.0))
+    journal.create_trade_log(trade('long', 100.0, 1.0, side=None, status='failed'))
+    journal.create_trade_log(trade('short', 100.0, 1.0))
+    # a long signal whose buy was skipped
+    journal.create_trade_log(trade('long', 100.0, 1.0))
+    assert journal.summary()['trades'] == 0
+    assert journal.holdings.get('KRW-BTC', (0.0, 0.0)) == (0.0, 0.0)
+    assert len(journal.query('trades')) == 4
+
+
+def test_records_without_a_side_field_use_the_type():
+    journal = TradeJournal(":memory:")
+    journal.create_trade_log({'type': 'long', 'symbol': 'KRW-BTC', 'price': 100.0, 'quantity': 1.0, 'status': 'filled'})
+    journal.create_trade_log({'type': 'short', 'symbol': 'KRW-BTC', 'price': 110.0, 'quantity': 1.0, 'status': 'filled'})
+    assert journal.summary()['realized_pnl'] == pytest.approx(10.0)
+
+
+def test_stop_exit_on_a_neutral_signal_is_a_closing_sell():
+    journal = TradeJournal(":memory:")
+    journal.create_trade_log(trade('long', 100.0, 2.0, side='bid'))
+    journal.create_trade_log(trade('neutral', 90.0, 2.0, side='ask'))
+    summary = journal.summary()
+    assert summary['closed'] == 1 and summary['wins'] == 0
+    assert summary['realized_pnl'] == pytest.approx(-20.0)
+    assert journal.holdings['KRW-BTC'] == (0.0, 0.0)
+    assert journal.daily_pnl()['closed'].sum() == 1
+
+
+class FakeEngine:
+    def __init__(self, price):
+        self.price = price
+
+    def _fill(self, ticker, side, volume):
+        fill = Fill(f"id-{side}", ticker, side, volume)
+        fill.executed_volume, fill.avg_price, fill.funds = volume, self.price, volume * self.price
+        fill.fee, fill.status = fill.funds * 0.0005, 'filled'
+        return fill
+
+    def buy(self, ticker, krw_amount):
+        return self._fill(ticker, 'bid', krw_amount / self.price)
+
+    def sell(self, ticker, volume, price=None):
+        return self._fill(ticker, 'ask', volume)
+
+
+def signal(entry, close, stop_loss, take_profit):
+    return Signal('2024-01-01 09:30:00', '2024-01-01 09:00:00', close, close, 0.0, 0.0, 0.0, 0.0,
+                  'neutral', 'neutral', 0, entry, stop_loss, take_profit, 1.0)
+
+
+def test_stop_loss_exit_from_execution_trade_is_journaled_as_a_sell():
+    journal = TradeJournal(":memory:")
+    position_manager = PositionManager(execution_engine=FakeEngine(100.0))
+    entry = position_manager.execution_trade(None, signal('long', 100.0, 90.0, 120.0), None, 10_000, 0.0, 0)
+    assert entry.side == 'bid'
+    journal.create_trade_log(entry)
+
+    position_manager.execution_engine.price = 85.0
+    exit_ = position_manager.execution_trade(None, signal('neutral', 85.0, 90.0, 120.0), None, 10_000,
+                                             entry.quantity, 0)
+    assert exit_.type == 'neutral' and exit_.side == 'ask'
+    journal.create_trade_log(exit_)
+
+    summary = journal.summary()
+    assert summary['closed'] == 1
+    assert summary['realized_pnl'] == pytest.approx(-1500.0 - entry.fee - exit_.fee)
+    assert journal.holdings['KRW-BTC'] == (0.0, 0.0)
+
+
+def test_holdings_are_rebuilt_on_reopen(tmp_path):
+    path = str(tmp_path / "journal.db")
+    journal = TradeJournal(path)
+    journal.create_trade_log(trade('long', 100.0, 2.0, side='bid'))
+    journal.close()
+    journal = TradeJournal(path)
+    journal.create_trade_log(trade('neutral', 110.0, 1.0, side='ask'))
+    assert journal.summary()['realized_pnl'] == pytest.approx(10.0)
+
+
+def test_journal_without_side_column_is_migrated(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE trades (id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL, trade_id TEXT, type TEXT, "
+                 "candle_time TEXT, symbol TEXT, price REAL, yyl REAL, yyl_slow REAL, quantity REAL, total_value REAL, "
+                 "fee REAL, status TEXT, stop_loss REAL, take_profit REAL, strategy TEXT, notes TEXT, realized_pnl REAL)")
+    conn.execute("INSERT INTO trades (ts, type, symbol, price, quantity, status, realized_pnl) "
+                 "VALUES (0, 'long', 'KRW-BTC', 100, 1, 'successful', 0)")
+    conn.commit()
+    conn.close()
+    journal = TradeJournal(path)
+    assert journal.holdings['KRW-BTC'] == (1.0, 100.0)
+    assert journal.query('trades')['side'].tolist() == ['bid']
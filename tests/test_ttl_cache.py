@@ -0,0 +1,115 @@
+# test_ttl_cache.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from classes import ttl_cache
+from classes.ttl_cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ttl_cache, "time", clock)
+    return clock
+
+
+class Loader:
+    """Counts its calls; blocks on `gate` so that callers pile up while it is in flight."""
+
+    def __init__(self, value=42, error=None):
+        self.value = value
+        self.error = error
+        self.calls = 0
+        self.gate = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_values_expire_after_their_ttl(clock):
+    cache = TTLCache({'ticker': 1.0})
+    loader = Loader()
+    loader.gate.set()
+    assert cache.get('ticker', 'KRW-BTC', loader) == 42
+    clock.now += 0.999
+    assert cache.get('ticker', 'KRW-BTC', loader) == 42 and loader.calls == 1
+    clock.now += 0.001
+    assert cache.lookup('ticker', 'KRW-BTC') is None
+    assert cache.get('ticker', 'KRW-BTC', loader) == 42 and loader.calls == 2
+    assert cache.stats()['ticker'] == {'hits': 1, 'misses': 2, 'shared': 0, 'errors': 0, 'hit_rate': 0.333}
+
+
+def test_endpoints_without_a_ttl_are_not_kept():
+    cache = TTLCache()
+    loader = Loader()
+    loader.gate.set()
+    cache.get('accounts', None, loader)
+    cache.get('accounts', None, loader)
+    assert loader.calls == 2
+
+
+def run_concurrently(cache, loader, callers=8):
+    pool = ThreadPoolExecutor(callers)
+    futures = [pool.submit(cache.get, 'candles', 'KRW-BTC', loader) for _ in range(callers)]
+    # every caller but the loading one is waiting for the same request
+    wait_for(lambda: cache.stats().get('candles', {}).get('shared') == callers - 1)
+    loader.gate.set()
+    pool.shutdown(wait=True)
+    return futures
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache({'candles': 60})
+    loader = Loader()
+    futures = run_concurrently(cache, loader)
+    assert [future.result() for future in futures] == [42] * 8
+    assert loader.calls == 1
+    assert cache.in_flight == {}
+
+
+def test_a_failed_load_reaches_every_waiting_caller_and_is_not_cached():
+    cache = TTLCache({'candles': 60})
+    loader = Loader(error=ConnectionError("upbit down"))
+    futures = run_concurrently(cache, loader)
+    for future in futures:
+        with pytest.raises(ConnectionError, match="upbit down"):
+            future.result()
+    assert loader.calls == 1
+    assert cache.stats()['candles']['errors'] == 1
+
+    retry = Loader(value=7)
+    retry.gate.set()
+    assert cache.get('candles', 'KRW-BTC', retry) == 7 and retry.calls == 1
+
+
+def test_a_load_overtaken_by_an_invalidation_is_not_kept():
+    cache = TTLCache({'accounts': 60})
+    loader = Loader(value='before the fill')
+    pool = ThreadPoolExecutor(1)
+    future = pool.submit(cache.get, 'accounts', None, loader)
+    wait_for(lambda: loader.calls == 1)
+    cache.invalidate('accounts')
+    loader.gate.set()
+    assert future.result() == 'before the fill'
+    pool.shutdown()
+    assert cache.lookup('accounts', None) is None